@@ -1,125 +1,1012 @@
 #!usr/bin/env python3
 
-from flask import Flask
-from flask_restful import Api, Resource, abort, fields, marshal_with, reqparse
-from flask_sqlalchemy import SQLAlchemy
+import json
+import threading
+import time
 
-MAX_DEPT_ID_LENGTH = 10
-MAX_DEPT_NAME_LENGTH = 100
-MAX_COURSE_ID_LENGTH = 20
-MAX_COURSE_NAME_LENGTH = 200
-MAX_COURSE_DESC_LENGTH = 1000
-MAX_COURSE_PREREQ_LENGTH = 200
+import click
+
+from flask import Flask, Response, g, has_request_context, request, stream_with_context
+from flask_restful import Api, Resource, abort, inputs, marshal, marshal_with, reqparse
+from sqlalchemy import bindparam, case, event, func, or_, select
+from sqlalchemy.engine import Engine
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.urls import url_encode
+
+from models import (MAX_PAGE_SIZE, STREAM_BATCH_SIZE, CourseModel, DepartmentLevelModel, DepartmentModel, DepartmentStatsModel,
+    PrerequisiteClosureModel, PrerequisiteModel, course_resource_fields, db, department_resource_fields)
+from utils.compression import MIN_COMPRESS_SIZE, available_encodings, compress, compress_stream
+from utils.database import configure_sqlite, create_read_engine, database_config, engine_options
+from utils.department_stats import StatsDelta, stats_json, summarize_courses
+from utils.metrics import COUNT_BUCKETS, MetricsRegistry, SamplingProfiler, profiler_config, write_folded
+from utils.payloads import MIMETYPES, ListEncoder, dumps
+from utils.prerequisites import build_closure, parse_prerequisites, referenced_courses
+from utils.read_cache import CatalogVersion, LRUCache
+from utils.search_index import SearchIndex
+from utils.snapshot import DEFAULT_SNAPSHOT_FILE, CatalogSnapshot, write_snapshot
+
+BULK_CHUNK_SIZE = 500 # Rows per executemany statement in bulk uploads
+RESOURCE_CACHE_SIZE = 10000 # Serialized single departments/courses kept in memory
+LIST_CACHE_SIZE = 64 # Serialized list responses kept in memory
+LIST_CACHE_BYTES = 32 * 1024 * 1024 # Total size of the cached list responses, compressed variants included
+MAX_CACHED_LIST_BYTES = 1024 * 1024 # Larger list bodies (the whole catalog, say) are streamed out without being kept
+MAX_SEARCH_RESULTS = 100 # Largest 'limit' accepted by /search
 
 app = Flask(__name__)
 api = Api(app)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
-db = SQLAlchemy(app)
-
-department_resource_fields = {
-    'id': fields.String,
-    'name': fields.String,
-    'num_of_courses': fields.Integer
-}
-
-course_resource_fields = {
-    'id': fields.String,
-    'course_num': fields.Integer,
-    'name': fields.String,
-    'description': fields.String,
-    'num_of_hours': fields.Integer,
-    'prerequisites': fields.String,
-    'tccn_id': fields.String,
-    'department_model_id': fields.String
-}
-
-class DepartmentModel(db.Model):
-    id = db.Column(db.String(MAX_DEPT_ID_LENGTH), primary_key=True)
-    name = db.Column(db.String(MAX_DEPT_NAME_LENGTH), nullable=False)
-    num_of_courses = db.Column(db.Integer, nullable=False)
-    courses = db.relationship('CourseModel', backref='department_model') # One-to-many relationship
-
-    def __repr__(self):
-        return f'Department name = {self.name}, number of courses = {self.num_of_courses}'
-
-    def to_json(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'num_of_courses': int(self.num_of_courses)
-        }
-
-class CourseModel(db.Model):
-    id = db.Column(db.String(MAX_COURSE_ID_LENGTH), primary_key=True)
-    course_num = db.Column(db.Integer, nullable=False)
-    name = db.Column(db.String(MAX_COURSE_NAME_LENGTH), nullable=False)
-    description = db.Column(db.String(MAX_COURSE_DESC_LENGTH), nullable=False)
-    num_of_hours = db.Column(db.Integer, nullable=False)
-    prerequisites = db.Column(db.String(MAX_COURSE_PREREQ_LENGTH), nullable=False)
-    tccn_id = db.Column(db.String(MAX_COURSE_ID_LENGTH), nullable=False)
-    department_model_id = db.Column(db.String(MAX_DEPT_ID_LENGTH), db.ForeignKey('department_model.id'), nullable=False)
-    # Table name of DepartmentModel -> department_model
-    
-    def __repr__(self):
-        return f'Course name = {self.name}'
-
-    def to_json(self):
-        return {
-            'id': self.id,
-            'course_num': int(self.course_num),
-            'name': self.name,
-            'description': self.description,
-            'num_of_hours': int(self.num_of_hours),
-            'prerequisites': self.prerequisites,
-            'tccn_id': self.tccn_id,
-            'department_model_id': self.department_model_id
-        }
-
-# Only do first time/when a column is added, will rewrite database if done again
-# Try if 'OperationalError: no such column' happens
-db.create_all()
+
+# Database - URI and pool settings come from CATALOG_* environment variables (see utils/database.py)
+database = database_config()
+configure_sqlite(database)
+app.config['SQLALCHEMY_DATABASE_URI'] = database['uri']
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database['uri'], database)
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+db.init_app(app)
+
+# GET handlers read through read_db(), which is bound to the read-only engine when one is configured
+read_engine = create_read_engine(database)
+if read_engine is not None:
+    # Empty 'binds' so the session doesn't map every table back to the primary engine
+    read_session = db.create_scoped_session(options={'bind': read_engine, 'binds': {}})
+
+    @app.teardown_appcontext
+    def remove_read_session(exception=None):
+        read_session.remove()
+else:
+    read_session = db.session
+
+# Instrumentation - per-route latency, SQL statements per request and read cache hit rates, served at /metrics.
+# Values are per process.
+metrics = MetricsRegistry()
+request_count = metrics.counter('catalog_http_requests_total', 'Requests handled, by route, method and status.')
+request_latency = metrics.histogram('catalog_http_request_duration_seconds', 'Time from the start of a request until its whole body was sent.')
+request_queries = metrics.histogram('catalog_db_queries_per_request', 'SQL statements run while serving one request.', COUNT_BUCKETS)
+request_db_time = metrics.histogram('catalog_db_time_per_request_seconds', 'Time spent in SQL statements while serving one request.')
+metrics.callback('catalog_cache_hits_total', 'Read cache hits.', 'counter',
+    lambda: [({'cache': 'resource'}, resource_cache.hits), ({'cache': 'list'}, list_cache.hits)])
+metrics.callback('catalog_cache_misses_total', 'Read cache misses.', 'counter',
+    lambda: [({'cache': 'resource'}, resource_cache.misses), ({'cache': 'list'}, list_cache.misses)])
+metrics.callback('catalog_cache_entries', 'Responses held in the read cache.', 'gauge',
+    lambda: [({'cache': 'resource'}, len(resource_cache.entries)), ({'cache': 'list'}, len(list_cache.entries))])
+metrics.callback('catalog_cache_bytes', 'Size of the list responses held in the read cache, compressed variants included.', 'gauge',
+    lambda: [({'cache': 'list'}, list_cache.total_bytes)])
+
+# Opt-in - with CATALOG_PROFILE_SLOW_MS set, every request is sampled and the slow ones are saved as folded stacks
+profiling = profiler_config()
+profiler = SamplingProfiler(profiling['interval_ms'] / 1000) if profiling['slow_ms'] is not None else None
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    # Streamed responses keep the request context while their rows are read, so those queries count too
+    stats = g.get('request_stats') if has_request_context() else None
+    if stats is not None:
+        stats['queries'] += 1
+        stats['db_seconds'] += elapsed
+
+@app.before_request
+def start_request_timer():
+    g.request_stats = {'start': time.perf_counter(), 'queries': 0, 'db_seconds': 0.0}
+    if profiler is not None:
+        profiler.start()
+
+@app.after_request
+def record_request(response):
+    stats = g.get('request_stats')
+    if stats is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    method = request.method
+
+    def finish():
+        # Runs once the body was sent, which for streamed lists is long after this hook returned
+        elapsed = time.perf_counter() - stats['start']
+        request_count.inc(route=route, method=method, status=response.status_code)
+        request_latency.observe(elapsed, route=route, method=method)
+        request_queries.observe(stats['queries'], route=route)
+        request_db_time.observe(stats['db_seconds'], route=route)
+        if profiler is not None:
+            stacks = profiler.stop()
+            if elapsed * 1000 >= profiling['slow_ms'] and stacks:
+                write_folded(profiling['directory'], f'{method}-{route}-{int(elapsed * 1000)}ms', stacks)
+
+    response.call_on_close(finish)
+    return response
+
+""" Create indexes that were added to the models after their tables already existed
+Parameters: None
+Return: None
+"""
+def ensure_indexes():
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {i['name'] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+
+""" Create missing tables and indexes
+Parameters: None
+Return: None
+"""
+def init_db():
+    # Pooled SQLite connections can answer schema PRAGMAs from before another connection's DDL (a drop_all(), say),
+    # so the checks below start from fresh connections
+    db.engine.dispose()
+    # Only creates what's missing, existing tables aren't touched
+    # Try if 'OperationalError: no such column' happens
+    db.create_all()
+    # create_all() only builds indexes along with brand new tables
+    ensure_indexes()
+    # A catalog loaded before the aggregate tables existed gets them computed once
+    if DepartmentStatsModel.query.first() is None and CourseModel.query.first() is not None:
+        rebuild_department_stats()
+    # Likewise the prerequisite graph, which later writes only update
+    if PrerequisiteModel.query.first() is None and CourseModel.query.filter(CourseModel.prerequisites != '').first() is not None:
+        build_prerequisite_graph()
+
+# Read-only mode - a precompiled snapshot answers the hot GETs without touching the database, and writes are refused
+snapshot = CatalogSnapshot(database['snapshot']) if database['snapshot'] else None
+
+@app.before_request
+def reject_writes():
+    if snapshot is not None and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        abort(405, message="The API is read-only while it's serving a catalog snapshot.")
 
 # Argument Parsers - Validates POST/PUT requests and ensures necessary info is sent with the request
 department_put_args = reqparse.RequestParser()
 course_put_args = reqparse.RequestParser()
 
-# Necessary arguments for department and course POST requests
-department_put_args.add_argument('id', type=str, required=True, help='Department initials cannot be blank.')
-department_put_args.add_argument('name', type=str, required=True, help='Department name cannot be blank.')
-department_put_args.add_argument('num_of_courses', type=int, required=True, help='Number of courses cannot be blank.')
+# Necessary arguments for department and course POST requests - every column is NOT NULL, so null is rejected like a missing value
+department_put_args.add_argument('id', type=str, required=True, nullable=False, help='Department initials cannot be blank.')
+department_put_args.add_argument('name', type=str, required=True, nullable=False, help='Department name cannot be blank.')
+# Accepted for compatibility with scraped records, the stored count is maintained from the department's courses
+department_put_args.add_argument('num_of_courses', type=int)
+
+course_put_args.add_argument('id', type=str, required=True, nullable=False, help='Course ID cannot be blank.')
+course_put_args.add_argument('course_num', type=int, required=True, nullable=False, help='Course number cannot be blank.')
+course_put_args.add_argument('name', type=str, required=True, nullable=False, help='Course name cannot be blank.')
+course_put_args.add_argument('description', type=str, required=True, nullable=False)
+course_put_args.add_argument('num_of_hours', type=int, required=True, nullable=False, help='Course number of hours cannot be blank.')
+course_put_args.add_argument('prerequisites', type=str, required=True, nullable=False)
+course_put_args.add_argument('tccn_id', type=str, required=True, nullable=False)
+course_put_args.add_argument('department_model_id', type=str, required=True, nullable=False)
+
+# PATCH requests only update the fields that were sent, so nothing is required and missing fields aren't stored.
+# A field that is sent can't be null, like in a PUT.
+department_patch_args = reqparse.RequestParser()
+course_patch_args = reqparse.RequestParser()
+
+department_patch_args.add_argument('name', type=str, store_missing=False, nullable=False)
+
+course_patch_args.add_argument('course_num', type=int, store_missing=False, nullable=False)
+course_patch_args.add_argument('name', type=str, store_missing=False, nullable=False)
+course_patch_args.add_argument('description', type=str, store_missing=False, nullable=False)
+course_patch_args.add_argument('num_of_hours', type=int, store_missing=False, nullable=False)
+course_patch_args.add_argument('prerequisites', type=str, store_missing=False, nullable=False)
+course_patch_args.add_argument('tccn_id', type=str, store_missing=False, nullable=False)
+course_patch_args.add_argument('department_model_id', type=str, store_missing=False, nullable=False)
+
+# Read cache - every write bumps the catalog version, which invalidates every cached response and ETag at once
+catalog_version = CatalogVersion()
+resource_cache = LRUCache(RESOURCE_CACHE_SIZE)
+list_cache = LRUCache(LIST_CACHE_SIZE, LIST_CACHE_BYTES)
+
+""" Commit a write to the catalog and invalidate the read cache
+Parameters: None
+Return: None
+"""
+def commit_catalog():
+    db.session.commit()
+    catalog_version.bump()
+
+""" Session the current GET request reads through
+Right after a write the read cache is refilled from the primary: a replica that hasn't caught up yet would otherwise
+cache rows from before the write under the new catalog version, until the next write
+Parameters: None
+Return: scoped session, the same one for the whole request
+"""
+def read_db():
+    if read_engine is None:
+        return db.session
+    if 'read_db' not in g:
+        g.read_db = db.session if catalog_version.changed_within(database['read_after_write']) else read_session
+    return g.read_db
+
+""" Key identifying the representation the current request asks for
+Built from the parsed arguments, query parameters the parsers ignore don't change the response and don't get their own entry
+Parameters: args -> dict: parsed arguments of the request, None if it takes none
+Return: str
+"""
+def request_cache_key(args=None):
+    # url_encode() leaves out the arguments that weren't sent (None)
+    return f"{request.path}?{url_encode(args or {})}|{list_format()}"
+
+""" 304 response if the client already has the representation with this ETag
+Parameters: etag -> str: current ETag of the requested representation
+Return: flask.Response or None
+"""
+def not_modified(etag):
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+""" Serve a single department/course from the LRU cache, serializing it on a miss
+Parameters: build -> function returning the JSON-ready dict of the resource (may abort)
+            args -> dict: parsed arguments of the request, None if it takes none
+Return: flask.Response with a strong ETag, or a 304
+"""
+def cached_resource(build, args=None):
+    version = catalog_version.value
+    key = request_cache_key(args)
+    etag = catalog_version.etag(key, version)
+
+    response = not_modified(etag)
+    if response is not None:
+        return response
+
+    body = resource_cache.get((key, version))
+    if body is None:
+        body = dumps(build())
+        resource_cache.put((key, version), body)
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+""" Content encoding to compress a list response with, from the client's Accept-Encoding
+Parameters: None, reads the current request
+Return: 'br', 'gzip' or None to send the body as it is
+"""
+def response_encoding():
+    return request.accept_encodings.best_match(available_encodings())
+
+""" Size of a list cache entry
+Parameters: body -> bytes: uncompressed body
+            variants -> dict of encoding -> compressed body
+Return: int
+"""
+def list_entry_size(body, variants):
+    return len(body) + sum(len(v) for v in variants.values())
+
+""" Serve a list endpoint from pre-serialized bytes, building (and capturing) the response on a miss
+Compressed variants are kept next to the uncompressed body, so each is only compressed once per catalog version.
+Bodies over MAX_CACHED_LIST_BYTES aren't kept, they're built again on every request (still with an ETag, so 304s work)
+Parameters: build -> function returning a flask.Response, possibly streamed
+            args -> dict: parsed arguments of the request, None if it takes none
+Return: flask.Response with a strong ETag, or a 304
+"""
+def cached_list(build, args=None):
+    version = catalog_version.value
+    key = request_cache_key(args)
+    encoding = response_encoding()
+    # Every encoding is its own representation, with its own strong ETag
+    etag = catalog_version.etag(f'{key}|{encoding}' if encoding else key, version)
+
+    response = not_modified(etag)
+    if response is None:
+        cached = list_cache.get((key, version))
+        if cached is not None:
+            body, mimetype, headers, variants = cached
+            # A variant stored from a streamed response is sent even for a small body, so the bytes under an ETag never change
+            if encoding and (encoding in variants or len(body) >= MIN_COMPRESS_SIZE):
+                if encoding not in variants:
+                    variants[encoding] = compress(body, encoding)
+                    list_cache.put((key, version), cached, list_entry_size(body, variants)) # Counted at its new size
+                response = Response(variants[encoding], mimetype=mimetype, headers=headers)
+                response.headers['Content-Encoding'] = encoding
+            else:
+                response = Response(body, mimetype=mimetype, headers=headers)
+        else:
+            response = build()
+            headers = {k: v for k, v in response.headers.items() if k == 'Link'}
+            if response.is_streamed:
+                variants = {}
+                store = lambda body: list_cache.put((key, version), (body, response.mimetype, headers, variants), list_entry_size(body, variants))
+                if encoding:
+                    # The compressed chunks are kept as the variant (compressing the whole body again gives other bytes),
+                    # and the entry is only stored once both copies are complete
+                    bodies = []
+                    def store_variant(compressed):
+                        if bodies: # Left empty when the uncompressed body was too big to keep
+                            variants[encoding] = compressed
+                            store(bodies[0])
+                    response.response = capture_stream(response.response, bodies.append)
+                    response.response = capture_stream(compress_stream(response.response, encoding), store_variant)
+                    response.headers['Content-Encoding'] = encoding
+                else:
+                    # Keep a copy of the chunks as they go out, stored once the whole body has been sent
+                    response.response = capture_stream(response.response, store)
+            else:
+                body = response.get_data()
+                variants = {}
+                if encoding and len(body) >= MIN_COMPRESS_SIZE:
+                    variants[encoding] = compress(body, encoding)
+                    response.set_data(variants[encoding])
+                    response.headers['Content-Encoding'] = encoding
+                if len(body) <= MAX_CACHED_LIST_BYTES:
+                    list_cache.put((key, version), (body, response.mimetype, headers, variants), list_entry_size(body, variants))
+        response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+""" Pass a streamed body through unchanged while collecting it, unless it grows too big to cache
+Parameters: chunks -> iterable of str/bytes chunks
+            on_complete -> function called with the full body as bytes once every chunk was sent
+Return: generator of the same chunks
+"""
+def capture_stream(chunks, on_complete):
+    collected = []
+    size = 0
+    for chunk in chunks:
+        if collected is not None:
+            data = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            size += len(data)
+            # Past the limit the copy is dropped, so a long stream's memory stays flat
+            if size > MAX_CACHED_LIST_BYTES:
+                collected = None
+            else:
+                collected.append(data)
+        yield chunk
+    if collected is not None:
+        on_complete(b''.join(collected))
+
+""" Serve pre-encoded JSON from the snapshot
+Parameters: body -> bytes: JSON read from the snapshot
+            args -> dict: parsed arguments of the request, None if it takes none
+Return: flask.Response with an ETag derived from the snapshot contents, or a 304
+"""
+def snapshot_response(body, args=None):
+    etag = snapshot.etag(request_cache_key(args))
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+# Department aggregates - course writes collect a StatsDelta and apply it just before they commit
+""" Apply the aggregate changes of some course writes, inside the caller's transaction
+Parameters: delta -> StatsDelta
+Return: None
+"""
+def apply_stats_delta(delta):
+    stats = DepartmentStatsModel.__table__
+    levels = DepartmentLevelModel.__table__
+    departments = DepartmentModel.__table__
+    changes = dict(delta.items())
+    if not changes:
+        return
+    db.session.flush() # Course changes made through the ORM have to be visible to the min/max lookup below
+
+    # A removed course may have been the min or max, those departments get both looked up again (department_model_id is indexed)
+    removed = [id for id, change in changes.items() if change['removed']]
+    bounds = {}
+    if removed:
+        query = db.session.query(CourseModel.department_model_id, func.min(CourseModel.num_of_hours), func.max(CourseModel.num_of_hours))
+        bounds = {id: (low, high) for id, low, high in query.filter(CourseModel.department_model_id.in_(removed)).group_by(CourseModel.department_model_id)}
+
+    # Existing rows get relative updates, so concurrent writers to a department don't overwrite each other's counts.
+    # Every statement runs once as an executemany, however many departments the write touched.
+    existing = {id for (id,) in db.session.query(DepartmentStatsModel.department_id).filter(DepartmentStatsModel.department_id.in_(changes))}
+    widened, replaced, inserted = [], [], []
+    for id, change in changes.items():
+        if change['removed']:
+            low, high = bounds.get(id, (None, None))
+        else:
+            low, high = min(change['added_hours']), max(change['added_hours'])
+        row = {'b_id': id, 'b_count': change['course_count'], 'b_hours': change['total_hours'],
+            'b_prerequisites': change['with_prerequisites'], 'b_low': low, 'b_high': high}
+        if id not in existing:
+            inserted.append({'department_id': id, 'course_count': change['course_count'], 'total_hours': change['total_hours'],
+                'with_prerequisites': change['with_prerequisites'], 'min_hours': low, 'max_hours': high})
+        elif change['removed']:
+            replaced.append(row)
+        else:
+            widened.append(row)
+
+    update = stats.update().where(stats.c.department_id == bindparam('b_id')).values(
+        course_count=stats.c.course_count + bindparam('b_count'),
+        total_hours=stats.c.total_hours + bindparam('b_hours'),
+        with_prerequisites=stats.c.with_prerequisites + bindparam('b_prerequisites'))
+    if widened:
+        db.session.execute(update.values(
+            min_hours=case([(or_(stats.c.min_hours.is_(None), stats.c.min_hours > bindparam('b_low')), bindparam('b_low'))], else_=stats.c.min_hours),
+            max_hours=case([(or_(stats.c.max_hours.is_(None), stats.c.max_hours < bindparam('b_high')), bindparam('b_high'))], else_=stats.c.max_hours)), widened)
+    if replaced:
+        db.session.execute(update.values(min_hours=bindparam('b_low'), max_hours=bindparam('b_high')), replaced)
+    if inserted:
+        db.session.execute(stats.insert(), inserted)
+
+    existing_levels = set(db.session.query(DepartmentLevelModel.department_id, DepartmentLevelModel.level)
+        .filter(DepartmentLevelModel.department_id.in_(changes)))
+    level_updates, level_inserts = [], []
+    for id, change in changes.items():
+        for level, count in change['levels'].items():
+            if not count:
+                continue
+            if (id, level) in existing_levels:
+                level_updates.append({'b_id': id, 'b_level': level, 'b_count': count})
+            else:
+                level_inserts.append({'department_id': id, 'level': level, 'course_count': count})
+    if level_updates:
+        db.session.execute(levels.update().where((levels.c.department_id == bindparam('b_id')) & (levels.c.level == bindparam('b_level')))
+            .values(course_count=levels.c.course_count + bindparam('b_count')), level_updates)
+    if level_inserts:
+        db.session.execute(levels.insert(), level_inserts)
+
+    counts = [{'b_id': id, 'b_count': change['course_count']} for id, change in changes.items() if change['course_count']]
+    if counts:
+        db.session.execute(departments.update().where(departments.c.id == bindparam('b_id'))
+            .values(num_of_courses=departments.c.num_of_courses + bindparam('b_count')), counts)
+
+""" Number of courses each department has, as maintained in the aggregates
+Parameters: department_ids -> list of str
+Return: dict of department ID -> number of courses (departments without courses are left out)
+"""
+def department_course_counts(department_ids):
+    query = db.session.query(DepartmentStatsModel.department_id, DepartmentStatsModel.course_count)
+    return dict(query.filter(DepartmentStatsModel.department_id.in_(department_ids)))
+
+""" Compare the aggregate tables (and every num_of_courses) against the courses, then optionally rebuild them
+Parameters: check_only -> bool: report the differences without writing anything
+Return: report dict
+"""
+def rebuild_department_stats(check_only=False):
+    by_department = {}
+    query = db.session.query(CourseModel.department_model_id, CourseModel.course_num, CourseModel.num_of_hours, CourseModel.prerequisites)
+    for row in query.yield_per(STREAM_BATCH_SIZE):
+        by_department.setdefault(row.department_model_id, []).append(row._asdict())
+    expected = {}
+    for department_id, courses in by_department.items():
+        expected[department_id] = summarize_courses(courses)
+
+    stored = {s.department_id: (s.to_json(), {}) for s in DepartmentStatsModel.query if s.course_count}
+    for l in DepartmentLevelModel.query.filter(DepartmentLevelModel.course_count != 0):
+        stored.setdefault(l.department_id, (None, {}))[1][l.level] = l.course_count
+    mismatches = [{'id': id, 'expected': stats_json(id, *expected[id]) if id in expected else None,
+        'stored': stats_json(id, *stored[id]) if id in stored else None}
+        for id in sorted(set(expected) | set(stored)) if expected.get(id) != stored.get(id)]
+
+    count_mismatches = []
+    for department_id, num_of_courses in db.session.query(DepartmentModel.id, DepartmentModel.num_of_courses).order_by(DepartmentModel.id):
+        count = expected[department_id][0]['course_count'] if department_id in expected else 0
+        if num_of_courses != count:
+            count_mismatches.append({'id': department_id, 'expected': count, 'stored': num_of_courses})
+
+    if not check_only and (mismatches or count_mismatches):
+        try:
+            DepartmentStatsModel.query.delete()
+            DepartmentLevelModel.query.delete()
+            db.session.bulk_insert_mappings(DepartmentStatsModel, [dict(stats, department_id=id) for id, (stats, _) in expected.items()])
+            db.session.bulk_insert_mappings(DepartmentLevelModel, [{'department_id': id, 'level': level, 'course_count': count}
+                for id, (_, levels) in expected.items() for level, count in levels.items()])
+            db.session.bulk_update_mappings(DepartmentModel, [{'id': m['id'], 'num_of_courses': m['expected']} for m in count_mismatches])
+            commit_catalog()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return {
+        'departments': len(expected),
+        'courses': sum(stats['course_count'] for stats, _ in expected.values()),
+        'mismatches': mismatches,
+        'num_of_courses_mismatches': count_mismatches,
+        'rebuilt': not check_only and bool(mismatches or count_mismatches)
+    }
+
+# Query string arguments of the list endpoints
+department_list_args = reqparse.RequestParser()
+course_list_args = reqparse.RequestParser()
+
+# Keyset pagination - 'after' is the last ID of the previous page, pages are ordered by ID
+department_list_args.add_argument('limit', type=inputs.positive, location='args', help='Limit must be a positive integer.')
+department_list_args.add_argument('after', type=str, location='args')
+department_list_args.add_argument('fields', type=str, location='args')
+department_list_args.add_argument('expand', type=str, location='args', choices=('courses',), help="Expand must be 'courses'.")
+
+course_list_args.add_argument('limit', type=inputs.positive, location='args', help='Limit must be a positive integer.')
+course_list_args.add_argument('after', type=str, location='args')
+course_list_args.add_argument('fields', type=str, location='args')
+course_list_args.add_argument('department', type=str, location='args')
+course_list_args.add_argument('min_hours', type=int, location='args')
+course_list_args.add_argument('max_hours', type=int, location='args')
+course_list_args.add_argument('min_course_num', type=int, location='args')
+course_list_args.add_argument('max_course_num', type=int, location='args')
+
+# /department/<id>/course - the department comes from the URL
+department_course_list_args = course_list_args.copy()
+department_course_list_args.remove_argument('department')
+
+graph_args = reqparse.RequestParser()
+graph_args.add_argument('transitive', type=inputs.boolean, location='args', default=False)
+
+search_args = reqparse.RequestParser()
+search_args.add_argument('q', type=str, location='args', required=True, help='Search query cannot be blank.')
+search_args.add_argument('limit', type=inputs.positive, location='args', default=10, help='Limit must be a positive integer.')
+search_args.add_argument('offset', type=inputs.natural, location='args', default=0, help='Offset must be a non-negative integer.')
+
+# Bulk uploads - validate every row with the same rules as PUT, then upsert them all in one transaction
+""" Stands in for flask.request so a RequestParser can validate one row of a bulk upload
+Parameters: row -> dict: one decoded row
+"""
+class BulkRow:
+    def __init__(self, row):
+        self.json = row
+        self.values = MultiDict()
+
+""" Read the rows of a bulk upload, either a JSON array or NDJSON (one object per line)
+Parameters: None, reads the current request
+Return: iterator of decoded rows
+"""
+def read_bulk_rows():
+    if request.mimetype == 'application/x-ndjson':
+        # Decode line by line so the whole body is never held as one string
+        return (json.loads(line) for line in request.stream if line.strip())
+    rows = request.get_json(force=True, silent=True)
+    if not isinstance(rows, list):
+        abort(400, message="Bulk uploads must be a JSON array or NDJSON.")
+    return rows
+
+""" Validate bulk rows against a PUT argument parser
+Parameters: rows -> iterable of decoded rows
+            parser -> reqparse.RequestParser: rules a single PUT of the same resource uses
+Return: dict of valid rows keyed by ID (a later row replaces an earlier one), list of per-row errors
+"""
+def validate_bulk_rows(rows, parser):
+    valid = {}
+    errors = []
+    try:
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors.append({'index': index, 'id': None, 'message': 'Row must be a JSON object.'})
+                continue
+            try:
+                args = dict(parser.parse_args(req=BulkRow(row)))
+                valid[args['id']] = args
+            except HTTPException as e:
+                errors.append({'index': index, 'id': row.get('id'), 'message': getattr(e, 'data', {}).get('message', str(e))})
+    except ValueError:
+        abort(400, message=f"Row {len(valid) + len(errors)} is not valid JSON.")
+    return valid, errors
+
+""" Insert or update rows in chunks, inside the caller's transaction
+Parameters: model -> db.Model: DepartmentModel or CourseModel
+            rows -> dict: validated rows keyed by ID
+Return: number of inserted rows, number of updated rows
+"""
+def bulk_upsert(model, rows):
+    inserted = 0
+    updated = 0
+    graph_changes = {} # Course ID -> prerequisites, of courses that are new or have other prerequisites
+    ids = list(rows)
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        chunk = ids[start:start + BULK_CHUNK_SIZE]
+        # One IN query per chunk instead of a filter_by(id=...) lookup per row
+        if model is CourseModel:
+            # The replaced values are needed to take them out of the department aggregates
+            query = db.session.query(CourseModel.id, CourseModel.department_model_id, CourseModel.course_num, CourseModel.num_of_hours, CourseModel.prerequisites)
+            previous = {row.id: row._asdict() for row in query.filter(CourseModel.id.in_(chunk))}
+            existing = set(previous)
+        else:
+            existing = {id for (id,) in db.session.query(model.id).filter(model.id.in_(chunk))}
+        new_rows = [rows[id] for id in chunk if id not in existing]
+        old_rows = [rows[id] for id in chunk if id in existing]
+        if model is DepartmentModel:
+            # Course counts come from the courses already loaded, not from the upload
+            counts = department_course_counts(chunk)
+            new_rows = [dict(row, num_of_courses=counts.get(row['id'], 0)) for row in new_rows]
+            old_rows = [dict(row, num_of_courses=counts.get(row['id'], 0)) for row in old_rows]
+        # bulk_*_mappings skip the ORM unit of work and run as executemany
+        db.session.bulk_insert_mappings(model, new_rows)
+        db.session.bulk_update_mappings(model, old_rows)
+        if model is CourseModel:
+            # One set of relative updates per department in the chunk, not per row
+            delta = StatsDelta()
+            for id in chunk:
+                if id in previous:
+                    delta.remove(previous[id])
+                delta.add(rows[id])
+            apply_stats_delta(delta)
+            graph_changes.update((id, rows[id]['prerequisites']) for id in chunk if id not in previous or previous[id]['prerequisites'] != rows[id]['prerequisites'])
+        inserted += len(new_rows)
+        updated += len(old_rows)
+    update_prerequisite_graph(graph_changes)
+    return inserted, updated
+
+""" Handle a whole bulk upload for one model
+Parameters: model -> db.Model: DepartmentModel or CourseModel
+            parser -> reqparse.RequestParser: PUT rules for that model
+Return: summary dict with insert/update counts and per-row errors
+"""
+def bulk_load(model, parser):
+    rows, errors = validate_bulk_rows(read_bulk_rows(), parser)
+    try:
+        inserted, updated = bulk_upsert(model, rows)
+        commit_catalog()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {'inserted': inserted, 'updated': updated, 'errors': errors}
+
+# Streaming list responses - rows are serialized while they're read from the DB, so the full list is never built in memory
+""" Whether the client asked for NDJSON (one object per line) instead of a JSON array
+Parameters: None, reads the current request
+Return: bool
+"""
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+""" Body format the client asked for on a list endpoint
+Parameters: None, reads the current request
+Return: str: one of utils.payloads.LIST_FORMATS
+"""
+def list_format():
+    if request.args.get('format') == 'columnar':
+        return 'columnar'
+    return 'ndjson' if wants_ndjson() else 'json'
+
+""" Columns to SELECT for a list endpoint
+Parameters: model -> db.Model: DepartmentModel or CourseModel
+            requested -> str: comma separated column names from 'fields=', None for every column
+Return: list of model columns, always including 'id' (needed for the pagination cursor)
+"""
+def selected_columns(model, requested):
+    names = [c.name for c in model.__table__.columns]
+    if requested:
+        wanted = {f.strip() for f in requested.split(',') if f.strip()}
+        unknown = wanted - set(names)
+        if unknown:
+            abort(400, message=f"Unknown fields: {', '.join(sorted(unknown))}.")
+        names = [n for n in names if n in wanted or n == 'id']
+    return [getattr(model, n) for n in names]
+
+""" Build the SELECT behind a list endpoint
+Parameters: model -> db.Model: DepartmentModel or CourseModel
+            args -> dict: parsed list arguments ('fields' and 'after' are used here)
+            filters -> list: extra SQL filter expressions
+Return: query of column tuples ordered by ID
+"""
+def list_query(model, args, filters=()):
+    query = read_db().query(*selected_columns(model, args.get('fields'))).filter(*filters)
+    if args.get('after') is not None:
+        query = query.filter(model.id > args['after'])
+    return query.order_by(model.id)
+
+""" Turn a batch of rows into the dicts that are sent
+Parameters: rows -> list of column tuples
+            prepare -> function turning the rows into the dicts to send, None to send the columns as they are
+Return: list of dicts
+"""
+def row_dicts(rows, prepare=None):
+    return prepare(rows) if prepare else [r._asdict() for r in rows]
+
+""" Stream the rows of one or more queries as a chunked response
+Parameters: queries -> list of queries, streamed one after the other
+            prepare -> function run on every batch of column tuples, returning the dicts to send instead
+Return: flask.Response with a JSON array, NDJSON or columnar body
+"""
+def stream_rows(queries, prepare=None):
+    format = list_format()
+
+    def generate():
+        encoder = ListEncoder(format, [c['name'] for c in queries[0].column_descriptions])
+        yield encoder.start()
+        for query in queries:
+            # yield_per() reads the cursor in batches (stream_results on drivers with server-side cursors)
+            batch = []
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                batch.append(row)
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield encoder.batch(row_dicts(batch, prepare))
+                    batch = []
+            if batch:
+                yield encoder.batch(row_dicts(batch, prepare))
+        yield encoder.end()
 
-course_put_args.add_argument('id', type=str, required=True, help='Course ID cannot be blank.')
-course_put_args.add_argument('course_num', type=int, required=True, help='Course number cannot be blank.')
-course_put_args.add_argument('name', type=str, required=True, help='Course name cannot be blank.')
-course_put_args.add_argument('description', type=str, required=True)
-course_put_args.add_argument('num_of_hours', type=int, required=True, help='Course number of hours cannot be blank.')
-course_put_args.add_argument('prerequisites', type=str, required=True)
-course_put_args.add_argument('tccn_id', type=str, required=True)
-course_put_args.add_argument('department_model_id', type=str, required=True)
+    return Response(stream_with_context(generate()), mimetype=MIMETYPES[format])
+
+""" Return one page of a query, with a Link header pointing at the next page
+Parameters: query -> query of column tuples ordered by ID
+            args -> dict: parsed list arguments, 'limit' is the page size
+            prepare -> function run on the column tuples, returning the dicts to send instead
+Return: flask.Response with a JSON array, NDJSON or columnar body
+"""
+def page_rows(query, args, prepare=None):
+    format = list_format()
+    limit = min(args['limit'], MAX_PAGE_SIZE)
+
+    # One extra row tells whether there's a next page without a COUNT(*)
+    rows = query.limit(limit + 1).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        # Parameters the endpoint doesn't take are left out like in the cache key, so the cached Link suits every request sharing it
+        next_args = MultiDict((k, v) for k, v in request.args.items(multi=True) if k in args or k == 'format')
+        next_args['after'] = rows[-1].id
+        next_args['limit'] = limit
+        headers['Link'] = f'<{request.base_url}?{url_encode(next_args)}>; rel="next"'
+
+    body = ListEncoder(format, [c['name'] for c in query.column_descriptions]).encode(row_dicts(rows, prepare))
+    return Response(body, mimetype=MIMETYPES[format], headers=headers)
+
+""" Page through a list query if 'limit' was given, otherwise stream all of it
+Parameters: query -> query of column tuples ordered by ID
+            args -> dict: parsed list arguments
+            prepare -> function run on every batch of column tuples, returning the dicts to send instead
+Return: flask.Response
+"""
+def list_response(query, args, prepare=None):
+    if args.get('limit'):
+        return page_rows(query, args, prepare)
+    return stream_rows([query], prepare)
+
+""" Add each department's courses to a batch of department rows, for ?expand=courses - one IN query per batch instead
+of a lazy load per department, and read as column tuples like every other list (no ORM objects to build)
+Parameters: rows -> list of department column tuples
+Return: list of department dicts with a 'courses' list
+"""
+def attach_courses(rows):
+    departments = [r._asdict() for r in rows]
+    courses = {d['id']: [] for d in departments}
+    ids = list(courses)
+    columns = [getattr(CourseModel, name) for name in course_resource_fields]
+    for start in range(0, len(ids), STREAM_BATCH_SIZE):
+        query = read_db().query(*columns).filter(CourseModel.department_model_id.in_(ids[start:start + STREAM_BATCH_SIZE]))
+        for course in query.order_by(CourseModel.id):
+            courses[course.department_model_id].append(course._asdict())
+    for d in departments:
+        d['courses'] = courses[d['id']]
+    return departments
+
+""" SQL filters for the course list arguments
+Parameters: args -> dict: parsed course list arguments
+Return: list of filter expressions
+"""
+def course_list_filters(args):
+    filters = []
+    if args.get('department') is not None:
+        filters.append(CourseModel.department_model_id == args['department'])
+    if args['min_hours'] is not None:
+        filters.append(CourseModel.num_of_hours >= args['min_hours'])
+    if args['max_hours'] is not None:
+        filters.append(CourseModel.num_of_hours <= args['max_hours'])
+    if args['min_course_num'] is not None:
+        filters.append(CourseModel.course_num >= args['min_course_num'])
+    if args['max_course_num'] is not None:
+        filters.append(CourseModel.course_num <= args['max_course_num'])
+    return filters
+
+# Course search - an inverted index over name/description/prerequisites, rebuilt the first time it's used after a write
+search_index = None
+search_index_version = None
+search_index_lock = threading.Lock()
+
+""" Get the search index for the current catalog version, building it if needed
+Parameters: None
+Return: utils.search_index.SearchIndex
+"""
+def get_search_index():
+    global search_index, search_index_version
+
+    with search_index_lock:
+        version = catalog_version.value
+        if search_index is None or search_index_version != version:
+            query = read_db().query(CourseModel.id, CourseModel.course_num, CourseModel.name, CourseModel.description,
+                CourseModel.prerequisites, CourseModel.department_model_id).order_by(CourseModel.id)
+            search_index = SearchIndex(row._asdict() for row in query.yield_per(STREAM_BATCH_SIZE))
+            search_index_version = version
+        return search_index
+
+class Search(Resource):
+    def get(self):
+        args = search_args.parse_args()
+
+        def build():
+            total, results = get_search_index().search(args['q'], min(args['limit'], MAX_SEARCH_RESULTS), args['offset'])
+            body = {'query': args['q'], 'total': total, 'offset': args['offset'], 'results': results}
+            return Response(dumps(body), mimetype='application/json')
+        return cached_list(build, args)
+
+# Prerequisite graph - updated in the same transaction as every course write, so the GET handlers only look rows up
+""" Rebuild the prerequisite edge and closure tables from the courses' prerequisite text
+Parameters: None
+Return: report dict with edge/closure counts, cycles and dangling references
+"""
+def build_prerequisite_graph():
+    edges = {}
+    for course_id, text in db.session.query(CourseModel.id, CourseModel.prerequisites).yield_per(STREAM_BATCH_SIZE):
+        edges[course_id] = referenced_courses(parse_prerequisites(text))
+    closure, cycles, dangling = build_closure(edges)
+
+    edge_rows = [{'course_id': c, 'prerequisite_id': p} for c, prereqs in edges.items() for p in prereqs]
+    closure_rows = [{'course_id': c, 'ancestor_id': a, 'depth': d} for c, ancestors in closure.items() for a, d in ancestors.items()]
+    try:
+        PrerequisiteModel.query.delete()
+        PrerequisiteClosureModel.query.delete()
+        for start in range(0, len(edge_rows), BULK_CHUNK_SIZE):
+            db.session.bulk_insert_mappings(PrerequisiteModel, edge_rows[start:start + BULK_CHUNK_SIZE])
+        for start in range(0, len(closure_rows), BULK_CHUNK_SIZE):
+            db.session.bulk_insert_mappings(PrerequisiteClosureModel, closure_rows[start:start + BULK_CHUNK_SIZE])
+        db.session.commit() # Derived data only, the catalog itself (and its version) is unchanged
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        'courses': len(edges),
+        'edges': len(edge_rows),
+        'closure_rows': len(closure_rows),
+        'cycles': cycles,
+        'dangling': [{'course_id': c, 'prerequisite_id': p} for c, p in dangling]
+    }
+
+""" Shortest distance from each course to every course it requires, directly or not, walking the edge table
+The courses are walked breadth first together, so each level is one IN query per chunk of courses not seen yet
+Parameters: course_ids -> list of str
+            known_edges -> dict of course ID -> direct prerequisites already at hand, not looked up again
+Return: dict of course ID -> {ancestor ID: depth}
+"""
+def prerequisite_distances(course_ids, known_edges=None):
+    table = PrerequisiteModel.__table__
+    select_edges = table.select().where(table.c.course_id.in_(bindparam('b_ids', expanding=True)))
+
+    edges = dict(known_edges or {}) # course ID -> direct prerequisites, loaded as the walk reaches them
+    distances = {c: {} for c in course_ids}
+    frontiers = {c: [c] for c in course_ids}
+    depth = 0
+    while frontiers:
+        depth += 1
+        missing = list({node for frontier in frontiers.values() for node in frontier if node not in edges})
+        for node in missing:
+            edges[node] = []
+        for start in range(0, len(missing), BULK_CHUNK_SIZE):
+            for course_id, prerequisite_id in db.session.execute(select_edges, {'b_ids': missing[start:start + BULK_CHUNK_SIZE]}):
+                edges[course_id].append(prerequisite_id)
+
+        next_frontiers = {}
+        for course, frontier in frontiers.items():
+            next_frontier = []
+            for node in frontier:
+                for p in edges[node]:
+                    if p not in distances[course]:
+                        distances[course][p] = depth
+                        next_frontier.append(p)
+            if next_frontier:
+                next_frontiers[course] = next_frontier
+        frontiers = next_frontiers
+    return distances
+
+""" Bring the prerequisite tables up to date after some courses were written, inside the caller's transaction
+Only the changed courses' prerequisites are parsed again, and only they and the courses requiring them get a new closure
+Parameters: prerequisites -> dict of course ID -> its new prerequisites text, None for a deleted course,
+                for every course inserted, deleted or given other prerequisites
+Return: None
+"""
+def update_prerequisite_graph(prerequisites):
+    if not prerequisites:
+        return
+
+    # Core statements with an expanding IN, a 1000 ID in_() list is slow to build in the ORM
+    edges = PrerequisiteModel.__table__
+    closure = PrerequisiteClosureModel.__table__
+    ids = bindparam('b_ids', expanding=True)
+
+    new_edges = {id: referenced_courses(parse_prerequisites(text)) if text is not None else [] for id, text in prerequisites.items()}
+    changed = list(new_edges)
+    affected = set(changed)
+    for start in range(0, len(changed), BULK_CHUNK_SIZE):
+        chunk = {'b_ids': changed[start:start + BULK_CHUNK_SIZE]}
+        # Courses requiring a changed one reach its prerequisites through it, the closure lists them already
+        affected.update(id for (id,) in db.session.execute(select([closure.c.course_id]).where(closure.c.ancestor_id.in_(ids)), chunk))
+        db.session.execute(edges.delete().where(edges.c.course_id.in_(ids)), chunk)
+    edge_rows = [{'course_id': c, 'prerequisite_id': p} for c, prereqs in new_edges.items() for p in prereqs]
+    if edge_rows:
+        db.session.execute(edges.insert(), edge_rows)
+
+    affected = list(affected)
+    distances = prerequisite_distances(affected, new_edges)
+    for start in range(0, len(affected), BULK_CHUNK_SIZE):
+        db.session.execute(closure.delete().where(closure.c.course_id.in_(ids)), {'b_ids': affected[start:start + BULK_CHUNK_SIZE]})
+    closure_rows = [{'course_id': c, 'ancestor_id': a, 'depth': d} for c in affected for a, d in distances[c].items()]
+    if closure_rows:
+        db.session.execute(closure.insert(), closure_rows)
+
+""" Direct or transitive neighbours of a course in the prerequisite graph
+Parameters: course_id -> str
+            column -> model column matched against course_id
+            other -> model column holding the neighbour's ID
+            transitive -> bool: follow the closure table instead of direct edges
+Return: list of {'id', 'depth'} dicts, nearest first
+"""
+def graph_neighbours(course_id, column, other, transitive):
+    if transitive:
+        query = read_db().query(other, PrerequisiteClosureModel.depth).filter(column == course_id)
+        return [{'id': id, 'depth': depth} for id, depth in query.order_by(PrerequisiteClosureModel.depth, other)]
+    return [{'id': id, 'depth': 1} for (id,) in read_db().query(other).filter(column == course_id).order_by(other)]
+
+class CoursePrerequisites(Resource):
+    def get(self, course_id):
+        args = graph_args.parse_args()
+
+        def build():
+            result = read_db().query(CourseModel).filter_by(id=course_id).first()
+            if not result:
+                abort(409, message="Course ID doesn't exist.")
+            if args['transitive']:
+                courses = graph_neighbours(course_id, PrerequisiteClosureModel.course_id, PrerequisiteClosureModel.ancestor_id, True)
+            else:
+                courses = graph_neighbours(course_id, PrerequisiteModel.course_id, PrerequisiteModel.prerequisite_id, False)
+            return {
+                'id': course_id,
+                'prerequisites': result.prerequisites,
+                'tree': parse_prerequisites(result.prerequisites),
+                'courses': courses
+            }
+        return cached_resource(build, args)
+
+class CourseUnlocks(Resource):
+    def get(self, course_id):
+        args = graph_args.parse_args()
+
+        def build():
+            if not read_db().query(CourseModel).filter_by(id=course_id).first():
+                abort(409, message="Course ID doesn't exist.")
+            if args['transitive']:
+                courses = graph_neighbours(course_id, PrerequisiteClosureModel.ancestor_id, PrerequisiteClosureModel.course_id, True)
+            else:
+                courses = graph_neighbours(course_id, PrerequisiteModel.prerequisite_id, PrerequisiteModel.course_id, False)
+            return {'id': course_id, 'courses': courses}
+        return cached_resource(build, args)
+
+class Metrics(Resource):
+    def get(self):
+        return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 class HomePage(Resource):
     def get(self):
-        result_departments = DepartmentModel.query.all()
-        result_courses = CourseModel.query.all()
-        return [r.to_json() for r in result_departments] + [r.to_json() for r in result_courses]
+        if list_format() == 'columnar':
+            abort(400, message="format=columnar needs rows of one kind, use /department or /course.")
+        return cached_list(lambda: stream_rows([list_query(DepartmentModel, {}), list_query(CourseModel, {})]))
 
 class DepartmentList(Resource):
     def get(self):
-        result = DepartmentModel.query.all()
-        return [r.to_json() for r in result]
+        args = department_list_args.parse_args()
+        prepare = attach_courses if args['expand'] == 'courses' else None
+        return cached_list(lambda: list_response(list_query(DepartmentModel, args), args, prepare), args)
 
 class CourseList(Resource):
     def get(self):
-        result = CourseModel.query.all()
-        return [r.to_json() for r in result]
+        args = course_list_args.parse_args()
+        if snapshot is not None and set(request.args) == {'department'} and not wants_ndjson():
+            # A plain department listing is stored in the snapshot as one JSON array
+            return snapshot_response(snapshot.department_courses(args['department']) or b'[]', args)
+        filters = course_list_filters(args)
+        return cached_list(lambda: list_response(list_query(CourseModel, args, filters), args), args)
 
 class Department(Resource):
-    @marshal_with(department_resource_fields) # Decorator that serializes result with given fields into JSON format
     def get(self, department_id):
-        result = DepartmentModel.query.filter_by(id=department_id).first() # Returns DepartmentModel instance
-        if not result:
-            abort(409, message="Department ID doesn't exist.")
-        return result, 200
+        if snapshot is not None:
+            body = snapshot.department(department_id)
+            if body is None:
+                abort(409, message="Department ID doesn't exist.")
+            return snapshot_response(body)
+
+        def build():
+            result = read_db().query(DepartmentModel).filter_by(id=department_id).first() # Returns DepartmentModel instance
+            if not result:
+                abort(409, message="Department ID doesn't exist.")
+            return marshal(result, department_resource_fields) # Serializes result with given fields into JSON format
+        return cached_resource(build)
 
     @marshal_with(department_resource_fields)
     def put(self, department_id):
@@ -127,26 +1014,101 @@ class Department(Resource):
         result = DepartmentModel.query.filter_by(id=department_id).first()
         if result:
             abort(409, message="Department ID taken.")
-        department = DepartmentModel(id=department_id, name=args['name'], num_of_courses=args['num_of_courses'])
+        num_of_courses = department_course_counts([department_id]).get(department_id, 0) # Courses may have been loaded first
+        department = DepartmentModel(id=department_id, name=args['name'], num_of_courses=num_of_courses)
         db.session.add(department)
-        db.session.commit()
+        commit_catalog()
         return department, 201
-        
+
+    @marshal_with(department_resource_fields)
+    def patch(self, department_id):
+        args = department_patch_args.parse_args()
+        result = DepartmentModel.query.filter_by(id=department_id).first()
+        if not result:
+            abort(409, message="Department ID doesn't exist.")
+        for key, value in args.items():
+            setattr(result, key, value)
+        commit_catalog()
+        return result, 200
+
     def delete(self, department_id):
         result = DepartmentModel.query.filter_by(id=department_id).first()
         if not result:
             abort(409, message="Department ID doesn't exist.")
         db.session.delete(result)
-        db.session.commit()
+        commit_catalog()
         return '', 204
 
+class DepartmentStats(Resource):
+    def get(self, department_id):
+        if snapshot is not None:
+            if snapshot.department(department_id) is None:
+                abort(409, message="Department ID doesn't exist.")
+            # The snapshot has no aggregate tables, the department's course list is small enough to summarize
+            stats, levels = summarize_courses(json.loads(snapshot.department_courses(department_id) or b'[]'))
+            return snapshot_response(dumps(stats_json(department_id, stats, levels)))
+
+        def build():
+            if not read_db().query(DepartmentModel.id).filter_by(id=department_id).first():
+                abort(409, message="Department ID doesn't exist.")
+            stats = read_db().query(DepartmentStatsModel).get(department_id)
+            levels = read_db().query(DepartmentLevelModel.level, DepartmentLevelModel.course_count).filter_by(department_id=department_id)
+            return stats_json(department_id, stats.to_json() if stats else None, dict(levels))
+        return cached_resource(build)
+
+class DepartmentCourseList(Resource):
+    def get(self, department_id):
+        args = department_course_list_args.parse_args()
+        if snapshot is not None and not request.args and not wants_ndjson():
+            body = snapshot.department_courses(department_id)
+            if body is None:
+                abort(409, message="Department ID doesn't exist.")
+            return snapshot_response(body)
+        filters = course_list_filters(args) + [CourseModel.department_model_id == department_id]
+
+        def build():
+            # Unlike /course?department=, an unknown department is an error rather than an empty list
+            if not read_db().query(DepartmentModel.id).filter_by(id=department_id).first():
+                abort(409, message="Department ID doesn't exist.")
+            return list_response(list_query(CourseModel, args, filters), args)
+        return cached_list(build, args)
+
+class DepartmentCourse(Resource):
+    def get(self, department_id, course_num):
+        if snapshot is not None:
+            body = snapshot.department_courses(department_id)
+            if body is None:
+                abort(409, message="Department ID doesn't exist.")
+            for course in json.loads(body):
+                if course['course_num'] == course_num:
+                    return snapshot_response(snapshot.course(course['id']))
+            abort(409, message="Course number doesn't exist in this department.")
+
+        def build():
+            # One lookup on the (department_model_id, course_num) index, the department is only checked on a miss
+            result = read_db().query(CourseModel).filter_by(department_model_id=department_id, course_num=course_num) \
+                .order_by(CourseModel.id).first()
+            if not result:
+                if not read_db().query(DepartmentModel.id).filter_by(id=department_id).first():
+                    abort(409, message="Department ID doesn't exist.")
+                abort(409, message="Course number doesn't exist in this department.")
+            return marshal(result, course_resource_fields)
+        return cached_resource(build)
+
 class Course(Resource):
-    @marshal_with(course_resource_fields)
     def get(self, course_id):
-        result = CourseModel.query.filter_by(id=course_id).first() # Returns CourseModel instance
-        if not result:
-            abort(409, message="Course ID doesn't exist.")
-        return result, 200
+        if snapshot is not None:
+            body = snapshot.course(course_id)
+            if body is None:
+                abort(409, message="Course ID doesn't exist.")
+            return snapshot_response(body)
+
+        def build():
+            result = read_db().query(CourseModel).filter_by(id=course_id).first() # Returns CourseModel instance
+            if not result:
+                abort(409, message="Course ID doesn't exist.")
+            return marshal(result, course_resource_fields)
+        return cached_resource(build)
     
     @marshal_with(course_resource_fields)
     def put(self, course_id):
@@ -158,23 +1120,98 @@ class Course(Resource):
             name=args['name'], description=args['description'], num_of_hours=args['num_of_hours'], 
             prerequisites=args['prerequisites'], tccn_id=args['tccn_id'], department_model_id=args['department_model_id'])
         db.session.add(course)
-        db.session.commit()
+        delta = StatsDelta()
+        delta.add(course.to_json())
+        apply_stats_delta(delta)
+        update_prerequisite_graph({course_id: course.prerequisites}) # Courses that listed it while it didn't exist now reach its prerequisites
+        commit_catalog()
         return course, 201
 
+    @marshal_with(course_resource_fields)
+    def patch(self, course_id):
+        args = course_patch_args.parse_args()
+        result = CourseModel.query.filter_by(id=course_id).first()
+        if not result:
+            abort(409, message="Course ID doesn't exist.")
+        delta = StatsDelta()
+        delta.remove(result.to_json())
+        for key, value in args.items():
+            setattr(result, key, value)
+        delta.add(result.to_json())
+        apply_stats_delta(delta)
+        if 'prerequisites' in args:
+            update_prerequisite_graph({course_id: result.prerequisites})
+        commit_catalog()
+        return result, 200
+
     def delete(self, course_id):
         result = CourseModel.query.filter_by(id=course_id).first()
         if not result:
             abort(409, message="Course ID doesn't exist.")
+        delta = StatsDelta()
+        delta.remove(result.to_json())
         db.session.delete(result)
-        db.session.commit()
+        apply_stats_delta(delta)
+        update_prerequisite_graph({course_id: None})
+        commit_catalog()
         return '', 204
 
+class DepartmentBulk(Resource):
+    def post(self):
+        return bulk_load(DepartmentModel, department_put_args), 200
+
+class CourseBulk(Resource):
+    def post(self):
+        return bulk_load(CourseModel, course_put_args), 200
+
 api.add_resource(HomePage, '/')
 api.add_resource(DepartmentList, '/department')
 api.add_resource(Department, '/department/<string:department_id>')
+api.add_resource(DepartmentStats, '/department/<string:department_id>/stats')
+api.add_resource(DepartmentCourseList, '/department/<string:department_id>/course')
+api.add_resource(DepartmentCourse, '/department/<string:department_id>/course/<int:course_num>')
 api.add_resource(CourseList, '/course')
 api.add_resource(Course, '/course/<string:course_id>')
+api.add_resource(CoursePrerequisites, '/course/<string:course_id>/prerequisites')
+api.add_resource(CourseUnlocks, '/course/<string:course_id>/unlocks')
+api.add_resource(Search, '/search')
+api.add_resource(Metrics, '/metrics')
+api.add_resource(DepartmentBulk, '/department/_bulk')
+api.add_resource(CourseBulk, '/course/_bulk')
+
+# A snapshot deployment may not have a writable database (or any) behind it, so the schema is left alone
+if database['auto_create'] and snapshot is None:
+    with app.app_context():
+        init_db()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """ Create missing tables and indexes (for deployments running with CATALOG_AUTO_CREATE=0) """
+    init_db()
+
+@app.cli.command('build-prerequisites')
+def build_prerequisites_command():
+    """ Rebuild the prerequisite graph and report cycles and references to courses that don't exist """
+    print(json.dumps(build_prerequisite_graph(), indent=4))
+
+@app.cli.command('rebuild-department-stats')
+@click.option('--check', is_flag=True, help='Only report differences, leave the tables as they are.')
+def rebuild_department_stats_command(check):
+    """ Recompute the department aggregates and num_of_courses from the courses, reporting where they had drifted """
+    report = rebuild_department_stats(check_only=check)
+    print(json.dumps(report, indent=4))
+    if check and (report['mismatches'] or report['num_of_courses_mismatches']):
+        raise SystemExit(1)
+
+@app.cli.command('export-snapshot')
+@click.option('--output', default=DEFAULT_SNAPSHOT_FILE, show_default=True, help='Snapshot file to write.')
+def export_snapshot_command(output):
+    """ Compile the catalog into a memory-mapped snapshot for read-only API workers (CATALOG_SNAPSHOT=<file>) """
+    # Records are marshalled like the GET handlers do, so the snapshot serves byte for byte the same JSON
+    departments = (marshal(d, department_resource_fields) for d in read_session.query(DepartmentModel).yield_per(STREAM_BATCH_SIZE))
+    courses = (marshal(c, course_resource_fields) for c in read_session.query(CourseModel).yield_per(STREAM_BATCH_SIZE))
+    print(json.dumps(write_snapshot(output, departments, courses), indent=4))
 
 if __name__ == '__main__':
+    # Development server (threaded by default) - see async_api.py for serving many concurrent clients
     app.run(debug=True)
-        # Flask - "threaded=True" added into params
\ No newline at end of file
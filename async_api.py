@@ -0,0 +1,426 @@
+#!usr/bin/env python3
+
+import argparse
+import asyncio
+import contextlib
+import json
+import operator
+from urllib.parse import urlencode
+
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine.url import make_url
+
+from models import MAX_PAGE_SIZE, STREAM_BATCH_SIZE, CourseModel, DepartmentModel, course_resource_fields, department_resource_fields
+from utils.compression import GZIP_LEVEL, MIN_COMPRESS_SIZE
+from utils.database import database_config
+from utils.payloads import MIMETYPES, ListEncoder, dumps
+
+try:
+    import aiosqlite
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.middleware import Middleware
+    from starlette.middleware.gzip import GZipMiddleware
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Route
+except ImportError: # Only needed for the async server, api.py runs without them
+    raise SystemError("The async API needs starlette, uvicorn and aiosqlite, install them with "
+        "'pip install starlette uvicorn aiosqlite'.")
+
+# Statements are built with SQLAlchemy Core from the same tables as api.py, compiled for SQLite and run through aiosqlite
+SQLITE_DIALECT = sqlite.dialect(paramstyle='qmark')
+
+""" Error response in the same shape Flask-RESTful's abort() produces
+Parameters: status -> int: HTTP status
+            message -> str or dict
+"""
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+    def response(self):
+        return Response(json.dumps({'message': self.message}) + '\n', status_code=self.status, media_type='application/json')
+
+""" Filename and connect() arguments for the SQLite database behind a URI
+Parameters: uri -> str: SQLAlchemy database URI
+Return: str, dict
+"""
+def sqlite_target(uri):
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        raise SystemError(f"The async API only supports SQLite databases, not '{url.get_backend_name()}'.")
+    if not url.database or url.database == ':memory:':
+        raise SystemError('The async API needs a SQLite database file, in-memory databases are private to one connection.')
+    query = dict(url.query)
+    if query.pop('uri', None) == 'true':
+        # sqlite:///file:catalog.db?mode=ro&uri=true, as in CATALOG_READ_DATABASE_URI
+        return url.database + ('?' + urlencode(query) if query else ''), {'uri': True}
+    return url.database, {}
+
+""" Fixed set of aiosqlite connections shared by every request
+Parameters: uri -> str: SQLAlchemy SQLite URI
+            size -> int: number of connections
+            busy_timeout -> int: milliseconds to wait on a locked database
+"""
+class ConnectionPool:
+    def __init__(self, uri, size, busy_timeout):
+        self.filename, self.connect_args = sqlite_target(uri)
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self.idle = None
+
+    async def open(self):
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            # Every aiosqlite connection runs its queries on its own thread, the event loop never blocks on the file
+            connection = await aiosqlite.connect(self.filename, **self.connect_args)
+            await connection.execute(f'PRAGMA busy_timeout={self.busy_timeout}')
+            self.idle.put_nowait(connection)
+
+    async def close(self):
+        while not self.idle.empty():
+            await self.idle.get_nowait().close()
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        connection = await self.idle.get()
+        try:
+            yield connection
+        finally:
+            self.idle.put_nowait(connection)
+
+database = database_config() # The same CATALOG_* settings as api.py
+pool = ConnectionPool(database['read_uri'] or database['uri'], database['pool_size'], database['busy_timeout'])
+
+""" Compile a Core statement into SQL and positional parameters for sqlite3
+Parameters: statement -> sqlalchemy select
+Return: str, list
+"""
+def compile_statement(statement):
+    compiled = statement.compile(dialect=SQLITE_DIALECT)
+    params = compiled.construct_params()
+    return str(compiled), [params[name] for name in compiled.positiontup]
+
+""" Run a statement and return every row as a dict
+Parameters: statement -> sqlalchemy select
+Return: list of dicts keyed by column name, in SELECT order
+"""
+async def fetch_all(statement):
+    sql, params = compile_statement(statement)
+    async with pool.connection() as connection:
+        async with connection.execute(sql, params) as cursor:
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in await cursor.fetchall()]
+
+""" Run a statement and yield its rows in batches, holding one pooled connection until the last batch
+Parameters: statement -> sqlalchemy select
+Return: async generator of lists of dicts
+"""
+async def fetch_batches(statement):
+    sql, params = compile_statement(statement)
+    async with pool.connection() as connection:
+        async with connection.execute(sql, params) as cursor:
+            names = [d[0] for d in cursor.description]
+            while True:
+                rows = await cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield [dict(zip(names, row)) for row in rows]
+
+""" Quality a client's Accept header gives a mimetype, the way werkzeug ranks them
+Parameters: accept -> str: Accept header
+            mimetype -> str
+Return: float
+"""
+def accept_quality(accept, mimetype):
+    best = (-1, 0.0)
+    for part in accept.split(','):
+        pieces = [p.strip() for p in part.split(';')]
+        value = pieces[0].lower()
+        quality = 1.0
+        for p in pieces[1:]:
+            if p.startswith('q='):
+                try:
+                    quality = float(p[2:])
+                except ValueError:
+                    quality = 0.0
+        # A more specific match wins over a wildcard, whatever their qualities
+        specificity = 2 if value == mimetype else (1 if value == mimetype.split('/')[0] + '/*' else (0 if value == '*/*' else -1))
+        if specificity > best[0]:
+            best = (specificity, quality)
+    return best[1]
+
+""" Whether the client asked for NDJSON (one object per line) instead of a JSON array
+Parameters: request -> starlette Request
+Return: bool
+"""
+def wants_ndjson(request):
+    if request.query_params.get('format') == 'ndjson':
+        return True
+    accept = request.headers.get('accept')
+    if not accept:
+        return False
+    return accept_quality(accept, 'application/x-ndjson') > accept_quality(accept, 'application/json')
+
+""" Body format the client asked for on a list endpoint, like list_format() in api.py
+Parameters: request -> starlette Request
+Return: str: one of utils.payloads.LIST_FORMATS
+"""
+def list_format(request):
+    if request.query_params.get('format') == 'columnar':
+        return 'columnar'
+    return 'ndjson' if wants_ndjson(request) else 'json'
+
+""" Read one query string argument, with the same messages as the RequestParsers in api.py
+Parameters: request -> starlette Request
+            name -> str
+            type -> function converting the string, raising ValueError when it's invalid
+            help -> str: message on a conversion error, the error itself if None
+Return: converted value, None if the argument wasn't sent
+"""
+def query_arg(request, name, type=str, help=None):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    try:
+        return type(value)
+    except ValueError as e:
+        raise APIError(400, {name: help or str(e)})
+
+""" Positive integer, like flask_restful.inputs.positive
+Parameters: value -> str
+Return: int
+"""
+def positive(value):
+    number = int(value)
+    if number < 1:
+        raise ValueError(f'Invalid argument: {value}. argument must be a positive integer.')
+    return number
+
+""" 'expand' argument, like the choices=('courses',) RequestParser argument in api.py
+Parameters: value -> str
+Return: str
+"""
+def expansion(value):
+    if value != 'courses':
+        raise ValueError(value)
+    return value
+
+""" Columns to SELECT for a list endpoint
+Parameters: model -> db.Model: DepartmentModel or CourseModel
+            requested -> str: comma separated column names from 'fields=', None for every column
+Return: list of model columns, always including 'id' (needed for the pagination cursor)
+"""
+def selected_columns(model, requested):
+    names = [c.name for c in model.__table__.columns]
+    if requested:
+        wanted = {f.strip() for f in requested.split(',') if f.strip()}
+        unknown = wanted - set(names)
+        if unknown:
+            raise APIError(400, f"Unknown fields: {', '.join(sorted(unknown))}.")
+        names = [n for n in names if n in wanted or n == 'id']
+    return [model.__table__.c[n] for n in names]
+
+""" Build the SELECT behind a list endpoint
+Parameters: model -> db.Model: DepartmentModel or CourseModel
+            fields -> str: 'fields=' argument
+            after -> str: 'after=' argument
+            filters -> list: extra SQL filter expressions
+Return: sqlalchemy select ordered by ID
+"""
+def list_statement(model, fields=None, after=None, filters=()):
+    statement = select(selected_columns(model, fields))
+    for f in filters:
+        statement = statement.where(f)
+    if after is not None:
+        statement = statement.where(model.__table__.c.id > after)
+    return statement.order_by(model.__table__.c.id)
+
+""" Add each department's courses to department rows, one IN query per STREAM_BATCH_SIZE departments (like selectinload)
+Parameters: rows -> list of department dicts
+Return: the same rows
+"""
+async def attach_courses(rows):
+    table = CourseModel.__table__
+    courses = {row['id']: [] for row in rows}
+    ids = list(courses)
+    for start in range(0, len(ids), STREAM_BATCH_SIZE):
+        statement = select([table.c[name] for name in course_resource_fields]) \
+            .where(table.c.department_model_id.in_(ids[start:start + STREAM_BATCH_SIZE])).order_by(table.c.id)
+        for course in await fetch_all(statement):
+            courses[course['department_model_id']].append(course)
+    for row in rows:
+        row['courses'] = courses[row['id']]
+    return rows
+
+""" Stream the rows of one or more statements as a chunked response
+Parameters: request -> starlette Request
+            statements -> list of selects, streamed one after the other
+Return: StreamingResponse with a JSON array, NDJSON or columnar body
+"""
+def stream_rows(request, statements):
+    format = list_format(request)
+
+    async def generate():
+        encoder = ListEncoder(format, [c.name for c in statements[0].c])
+        yield encoder.start()
+        for statement in statements:
+            async for batch in fetch_batches(statement):
+                yield encoder.batch(batch)
+        yield encoder.end()
+
+    return StreamingResponse(generate(), media_type=MIMETYPES[format])
+
+""" Return one page of a statement, with a Link header pointing at the next page
+Parameters: request -> starlette Request
+            statement -> select ordered by ID
+            limit -> int: page size
+            prepare -> async function run on the rows before they're serialized, None to send them as they are
+Return: Response with a JSON array, NDJSON or columnar body
+"""
+async def page_rows(request, statement, limit, prepare=None):
+    format = list_format(request)
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    # One extra row tells whether there's a next page without a COUNT(*)
+    rows = await fetch_all(statement.limit(limit + 1))
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        # Same argument order as werkzeug's MultiDict in api.py - replaced in place, new ones at the end
+        next_args = {}
+        for key, value in request.query_params.multi_items():
+            next_args.setdefault(key, []).append(value)
+        next_args['after'] = [rows[-1]['id']]
+        next_args['limit'] = [limit]
+        query = urlencode([(key, value) for key, values in next_args.items() for value in values])
+        headers['Link'] = f'<{request.url.replace(query=query)}>; rel="next"'
+
+    if prepare is not None and rows:
+        rows = await prepare(rows)
+    body = ListEncoder(format, [c.name for c in statement.c]).encode(rows)
+    return Response(body, media_type=MIMETYPES[format], headers=headers)
+
+""" Return every row of a statement in one response, for rows that need more queries before they're sent
+Parameters: request -> starlette Request
+            statement -> select ordered by ID
+            prepare -> async function run on the rows before they're serialized
+Return: Response with a JSON array, NDJSON or columnar body
+"""
+async def prepared_rows(request, statement, prepare):
+    format = list_format(request)
+    # Read in full rather than streamed - a stream holds its pooled connection while prepare() needs another one,
+    # enough concurrent requests would wait on each other forever
+    rows = await prepare(await fetch_all(statement))
+    body = ListEncoder(format, [c.name for c in statement.c]).encode(rows)
+    return Response(body, media_type=MIMETYPES[format])
+
+""" Page through a list statement if 'limit' was given, otherwise stream all of it
+Parameters: request -> starlette Request
+            statement -> select ordered by ID
+            limit -> int or None
+            prepare -> async function run on the rows before they're serialized, None to send them as they are
+Return: Response
+"""
+async def list_response(request, statement, limit, prepare=None):
+    if limit:
+        return await page_rows(request, statement, limit, prepare)
+    if prepare is not None:
+        return await prepared_rows(request, statement, prepare)
+    return stream_rows(request, [statement])
+
+""" Wrap a handler so APIErrors turn into Flask-RESTful style error responses
+Parameters: handler -> async function taking a starlette Request
+Return: async function
+"""
+def endpoint(handler):
+    async def wrapped(request):
+        try:
+            return await handler(request)
+        except APIError as e:
+            return e.response()
+    return wrapped
+
+@endpoint
+async def home_page(request):
+    if list_format(request) == 'columnar':
+        raise APIError(400, "format=columnar needs rows of one kind, use /department or /course.")
+    return stream_rows(request, [list_statement(DepartmentModel), list_statement(CourseModel)])
+
+@endpoint
+async def department_list(request):
+    limit = query_arg(request, 'limit', positive, 'Limit must be a positive integer.')
+    expand = query_arg(request, 'expand', expansion, "Expand must be 'courses'.")
+    statement = list_statement(DepartmentModel, query_arg(request, 'fields'), query_arg(request, 'after'))
+    return await list_response(request, statement, limit, attach_courses if expand == 'courses' else None)
+
+@endpoint
+async def course_list(request):
+    limit = query_arg(request, 'limit', positive, 'Limit must be a positive integer.')
+    columns = CourseModel.__table__.c
+    filters = []
+    department = query_arg(request, 'department')
+    if department is not None:
+        filters.append(columns.department_model_id == department)
+    for name, column, compare in (('min_hours', columns.num_of_hours, operator.ge), ('max_hours', columns.num_of_hours, operator.le),
+            ('min_course_num', columns.course_num, operator.ge), ('max_course_num', columns.course_num, operator.le)):
+        value = query_arg(request, name, int)
+        if value is not None:
+            filters.append(compare(column, value))
+    statement = list_statement(CourseModel, query_arg(request, 'fields'), query_arg(request, 'after'), filters)
+    return await list_response(request, statement, limit)
+
+""" Fetch one department/course and serialize it like marshal() does in api.py
+Parameters: model -> db.Model: DepartmentModel or CourseModel
+            resource_fields -> dict: api.py's marshal fields, decides the keys and their order
+            id -> str
+            missing -> str: error message when the ID doesn't exist
+Return: Response
+"""
+async def single_resource(model, resource_fields, id, missing):
+    table = model.__table__
+    rows = await fetch_all(select([table.c[name] for name in resource_fields]).where(table.c.id == id))
+    if not rows:
+        raise APIError(409, missing)
+    return Response(dumps(rows[0]), media_type='application/json')
+
+@endpoint
+async def department(request):
+    return await single_resource(DepartmentModel, department_resource_fields, request.path_params['department_id'],
+        "Department ID doesn't exist.")
+
+@endpoint
+async def course(request):
+    return await single_resource(CourseModel, course_resource_fields, request.path_params['course_id'],
+        "Course ID doesn't exist.")
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await pool.open()
+    yield
+    await pool.close()
+
+app = Starlette(routes=[
+    Route('/', home_page),
+    Route('/department', department_list),
+    Route('/department/{department_id}', department),
+    Route('/course', course_list),
+    Route('/course/{course_id}', course)
+], middleware=[
+    # gzip only, the pre-compressed (and brotli) variants are kept by api.py's response cache
+    Middleware(GZipMiddleware, minimum_size=MIN_COMPRESS_SIZE, compresslevel=GZIP_LEVEL)
+], lifespan=lifespan)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the read-only endpoints of the API on an ASGI server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes, each with its own connection pool.')
+    parser.add_argument('--log-level', default='warning')
+    args = parser.parse_args()
+
+    # The app is passed by import string so every worker process imports its own copy
+    uvicorn.run('async_api:app', host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
@@ -0,0 +1,200 @@
+#!usr/bin/env python3
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_catalog
+
+COURSES_PER_DEPARTMENT = 50
+DEFAULT_CONCURRENCY = [10, 100, 1000]
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUEST_TIMEOUT = 30 # Seconds before a request counts as an error
+
+""" Fill a SQLite file with a synthetic catalog through api.py's bulk upsert
+Parameters: path -> str: database file
+            size -> int: number of courses
+Return: list of departments, list of courses
+"""
+def build_database(path, size):
+    departments, courses = generate_catalog(max(size // COURSES_PER_DEPARTMENT, 1), COURSES_PER_DEPARTMENT)
+    # api reads its settings at import time
+    os.environ['CATALOG_DATABASE_URI'] = f'sqlite:///{path}'
+    import api
+    with api.app.app_context():
+        api.bulk_upsert(api.DepartmentModel, {d['id']: d for d in departments})
+        api.bulk_upsert(api.CourseModel, {c['id']: c for c in courses})
+        api.db.session.commit()
+    return departments, courses
+
+""" Mix of single record and paged list requests, like a catalog front end makes
+Parameters: departments -> list of department dicts
+            courses -> list of course dicts
+            count -> int: number of paths
+Return: list of request paths
+"""
+def request_paths(departments, courses, count):
+    rng = random.Random(0)
+    paths = []
+    for i in range(count):
+        kind = i % 5
+        if kind < 3:
+            paths.append(f"/course/{rng.choice(courses)['id']}")
+        elif kind == 3:
+            paths.append(f"/department/{rng.choice(departments)['id']}")
+        else:
+            paths.append(f"/course?department={rng.choice(departments)['id']}&limit=50")
+    return paths
+
+""" Start one of the servers and wait until it answers
+Parameters: command -> list: process arguments
+            port -> int
+            environ -> dict: process environment
+Return: subprocess.Popen
+"""
+def start_server(command, port, environ):
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=environ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as s:
+                s.sendall(b'GET /department?limit=1 HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n')
+                if s.recv(12).startswith(b'HTTP/1.'):
+                    return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f"Server didn't start: {' '.join(command)}")
+
+""" Read one HTTP/1.1 response (Content-Length, chunked, or until the server closes the connection)
+Parameters: reader -> asyncio.StreamReader
+Return: status code, whether the connection can be reused
+"""
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by the server.')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    reusable = headers.get('connection') != 'close' and not status_line.startswith(b'HTTP/1.0')
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        reusable = False
+    return status, reusable
+
+""" Keep-alive clients sending requests back to back for a fixed time
+Parameters: port -> int
+            paths -> list of request paths
+            connections -> int: concurrent connections
+            seconds -> float: run time
+Return: result dict
+"""
+async def load(port, paths, connections, seconds):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(number):
+        nonlocal errors
+        rng = random.Random(number)
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), REQUEST_TIMEOUT)
+                writer.write(f'GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n'.encode('ascii'))
+                status, reusable = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+                if status != 200:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+                errors += 1
+                reusable = False
+                await asyncio.sleep(0.05)
+            if not reusable and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'connections': connections,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p99_ms': round(latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000, 2) if latencies else None,
+        'errors': errors
+    }
+
+""" Compare the Flask server against the ASGI server at each concurrency level
+Parameters: size -> int: number of courses
+            concurrency -> list of int: concurrent connections to test
+            seconds -> float: run time per level
+            workers -> int: ASGI worker processes
+Return: list of result dicts
+"""
+def run(size, concurrency, seconds, workers):
+    directory = tempfile.mkdtemp()
+    departments, courses = build_database(os.path.join(directory, 'bench.db'), size)
+    paths = request_paths(departments, courses, 2000)
+
+    environ = dict(os.environ, CATALOG_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'bench.db')}", CATALOG_AUTO_CREATE='0',
+        FLASK_APP='api.py', PYTHONPATH=REPO_ROOT)
+    servers = [
+        # What 'python api.py' runs, without the debugger and reloader
+        ('flask', [sys.executable, '-m', 'flask', 'run', '--port', '8701', '--no-reload', '--with-threads'], 8701),
+        ('asgi', [sys.executable, 'async_api.py', '--port', '8702', '--workers', str(workers)], 8702)
+    ]
+
+    results = []
+    for name, command, port in servers:
+        process = start_server(command, port, environ)
+        try:
+            for connections in concurrency:
+                result = asyncio.run(load(port, paths, connections, seconds))
+                results.append(dict(server=name, **result))
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latency and throughput of the Flask and ASGI servers under concurrent clients.')
+    parser.add_argument('--size', type=int, default=5000, help='Catalog size in courses.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_CONCURRENCY, help='Concurrent connections to test.')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Run time per server and concurrency level.')
+    parser.add_argument('--workers', type=int, default=1, help='ASGI worker processes.')
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'async', 'size': args.size, 'workers': args.workers,
+        'results': run(args.size, args.concurrency, args.seconds, args.workers)}, indent=4))
@@ -0,0 +1,120 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.synthetic import generate_catalog
+from utils.database import configure_sqlite, database_config, engine_options
+
+""" Engine for one of the compared setups
+Parameters: path -> str: SQLite file
+            tuned -> bool: False for the old setup (default journal, no engine options), True for utils.database
+Return: sqlalchemy Engine
+"""
+def make_engine(path, tuned):
+    uri = f'sqlite:///{path}'
+    if not tuned:
+        return create_engine(uri)
+    config = database_config({})
+    engine = create_engine(uri, **engine_options(uri, config))
+    configure_sqlite(config, engine)
+    return engine
+
+""" Create and fill the course table
+Parameters: engine -> sqlalchemy Engine
+            courses -> list of course dicts
+Return: list of course IDs
+"""
+def load_courses(engine, courses):
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE course_model (id VARCHAR(20) PRIMARY KEY, course_num INTEGER NOT NULL, name VARCHAR(200) NOT NULL, '
+            'description VARCHAR(1000) NOT NULL, num_of_hours INTEGER NOT NULL, department_model_id VARCHAR(10) NOT NULL)'))
+        conn.execute(text('CREATE INDEX ix_course_model_department_model_id ON course_model (department_model_id)'))
+        conn.execute(text('INSERT INTO course_model VALUES (:id, :course_num, :name, :description, :num_of_hours, :department_model_id)'),
+            [{k: c[k] for k in ('id', 'course_num', 'name', 'description', 'num_of_hours', 'department_model_id')} for c in courses])
+    return [c['id'] for c in courses]
+
+""" Run readers and writers against one setup for a fixed time
+Parameters: tuned -> bool: which setup to measure
+            readers, writers -> int: thread counts
+            seconds -> float: how long to run
+            courses -> list of course dicts
+Return: result dict
+"""
+def run(tuned, readers, writers, seconds, courses):
+    directory = tempfile.mkdtemp()
+    engine = make_engine(os.path.join(directory, 'bench.db'), tuned)
+    ids = load_courses(engine, courses)
+    departments = sorted({c['department_model_id'] for c in courses})
+
+    counts = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def reader(seed):
+        rng = random.Random(seed)
+        done = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT * FROM course_model WHERE id = :id'), {'id': rng.choice(ids)}).fetchall()
+                    conn.execute(text('SELECT id, name FROM course_model WHERE department_model_id = :d'), {'d': rng.choice(departments)}).fetchall()
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts['reads'] += done
+            counts['read_errors'] += errors
+
+    def writer(seed):
+        rng = random.Random(seed)
+        done = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                with engine.begin() as conn:
+                    for _ in range(10):
+                        conn.execute(text('UPDATE course_model SET num_of_hours = :h WHERE id = :id'),
+                            {'h': rng.randint(1, 4), 'id': rng.choice(ids)})
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts['writes'] += done
+            counts['write_errors'] += errors
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    return {
+        'setup': 'tuned (WAL, synchronous=NORMAL, busy timeout)' if tuned else 'baseline (default journal)',
+        'reads_per_second': round(counts['reads'] / seconds, 1),
+        'write_transactions_per_second': round(counts['writes'] / seconds, 1),
+        'read_errors': counts['read_errors'],
+        'write_errors': counts['write_errors']
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent read/write throughput of the SQLite setups.')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5.0, help='Run time per setup.')
+    parser.add_argument('--courses', type=int, default=5000)
+    args = parser.parse_args()
+
+    _, courses = generate_catalog(max(args.courses // 50, 1), 50)
+    results = [run(tuned, args.readers, args.writers, args.seconds, courses) for tuned in (False, True)]
+    print(json.dumps({'benchmark': 'db_concurrency', 'readers': args.readers, 'writers': args.writers, 'results': results}, indent=4))
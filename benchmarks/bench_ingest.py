@@ -0,0 +1,107 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_scaled_catalog
+from utils.catalog_io import batched, read_records, write_ndjson_record
+
+DEFAULT_SCALES = [1, 10]
+DEFAULT_BATCH_SIZES = [100, 1000]
+DEFAULT_PUT_ROWS = 1000 # One request per course is slow, the PUT baseline only loads this many
+
+""" Write a catalog the way 'uta_scraper.py --format ndjson' does
+Parameters: directory -> str
+            departments -> list of department dicts
+            courses -> list of course dicts
+Return: path of departments.ndjson, path of courses.ndjson
+"""
+def write_catalog(directory, departments, courses):
+    paths = []
+    for name, records in (('departments.ndjson', departments), ('courses.ndjson', courses)):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as f:
+            for r in records:
+                write_ndjson_record(f, r)
+        paths.append(path)
+    return paths
+
+""" Empty the database between runs
+Parameters: api -> the api module
+Return: None
+"""
+def reset_database(api):
+    with api.app.app_context():
+        api.db.drop_all()
+        api.init_db()
+    api.catalog_version.bump()
+
+""" Load a catalog file the way the load scripts do, through the bulk endpoint
+Parameters: client -> Flask test client
+            path -> str: .ndjson catalog file
+            key -> str: 'departments' or 'courses'
+            endpoint -> str: bulk endpoint
+            batch_size -> int: rows per request
+Return: number of rows loaded
+"""
+def bulk_load(client, path, key, endpoint, batch_size):
+    rows = 0
+    for batch in batched(read_records(path, key), batch_size):
+        r = client.post(endpoint, json=batch)
+        if r.status_code != 200 or r.get_json()['errors']:
+            raise SystemExit(f"Bulk load failed: {r.data[:500]}")
+        rows += len(batch)
+    return rows
+
+""" Rows per second loaded into CourseModel, through one PUT per course and through the bulk endpoint
+Parameters: scales -> list of float: synthetic catalog sizes
+            batch_sizes -> list of int: bulk request sizes
+            put_rows -> int: courses loaded one request at a time for the baseline
+Return: list of result dicts
+"""
+def run(scales, batch_sizes, put_rows):
+    directory = tempfile.mkdtemp()
+    # api reads its settings at import time
+    os.environ['CATALOG_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ.pop('CATALOG_SNAPSHOT', None)
+    import api
+    client = api.app.test_client()
+
+    results = []
+    for scale in scales:
+        departments, courses = generate_scaled_catalog(scale)
+        departments_path, courses_path = write_catalog(directory, departments, courses)
+
+        # Baseline - what the load scripts did before the bulk endpoints, one PUT per course
+        reset_database(api)
+        bulk_load(client, departments_path, 'departments', '/department/_bulk', max(batch_sizes))
+        start = time.perf_counter()
+        for c in courses[:put_rows]:
+            r = client.put(f"/course/{c['id']}", json=c)
+            if r.status_code != 201:
+                raise SystemExit(f"PUT failed: {r.data[:500]}")
+        seconds = time.perf_counter() - start
+        results.append({'scale': scale, 'method': 'put', 'batch_size': 1, 'rows': min(put_rows, len(courses)),
+            'seconds': round(seconds, 3), 'rows_per_second': round(min(put_rows, len(courses)) / seconds, 1)})
+
+        for batch_size in batch_sizes:
+            reset_database(api)
+            bulk_load(client, departments_path, 'departments', '/department/_bulk', batch_size)
+            start = time.perf_counter()
+            rows = bulk_load(client, courses_path, 'courses', '/course/_bulk', batch_size)
+            seconds = time.perf_counter() - start
+            results.append({'scale': scale, 'method': 'bulk', 'batch_size': batch_size, 'rows': rows,
+                'seconds': round(seconds, 3), 'rows_per_second': round(rows / seconds, 1)})
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Course ingest rate through the API, per row PUT against bulk uploads.')
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES, help='Catalog sizes as multiples of the real catalog.')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES, help='Rows per bulk request.')
+    parser.add_argument('--put-rows', type=int, default=DEFAULT_PUT_ROWS, help='Courses loaded one PUT at a time for the baseline.')
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'ingest', 'results': run(args.scales, args.batch_sizes, args.put_rows)}, indent=4))
@@ -0,0 +1,109 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.recorded import load_department_pages
+from benchmarks.synthetic import generate_catalog, render_department_page
+from utils.extractors import EXTRACTORS, get_extractor
+from utils.scraper_functions import extract_course_records
+
+""" The original extraction path, a full html.parser tree with no strainer - the baseline every backend must match
+Parameters: None
+"""
+class FullSoupExtractor:
+    name = 'full-soup'
+
+    def extract(self, html, id):
+        return extract_course_records(BeautifulSoup(html, 'html.parser'), id)
+
+""" Recorded catalog pages plus synthetic department pages
+Parameters: synthetic_departments -> int: synthetic pages to add
+            courses_per_department -> int: courses on each synthetic page
+Return: list of (name, department ID, html) tuples
+"""
+def load_pages(synthetic_departments, courses_per_department):
+    pages = load_department_pages()
+
+    departments, courses = generate_catalog(synthetic_departments, courses_per_department)
+    for d in departments:
+        department_courses = [c for c in courses if c['department_model_id'] == d['id']]
+        pages.append((f"synthetic-{d['id']}", d['id'], render_department_page(d, department_courses)))
+    return pages
+
+""" Available backends, the baseline first
+Parameters: None
+Return: list of extractors
+"""
+def load_extractors():
+    extractors = [FullSoupExtractor()]
+    for name in sorted(EXTRACTORS):
+        try:
+            extractors.append(get_extractor(name))
+        except SystemError as e:
+            print(f"Skipping {name}: {e}")
+    return extractors
+
+""" Check that every backend extracts exactly the same records as the baseline
+Parameters: pages -> list from load_pages()
+            extractors -> list from load_extractors()
+Return: list of mismatch dicts, empty when every backend agrees
+"""
+def check_parity(pages, extractors):
+    mismatches = []
+    baseline = extractors[0]
+    for name, id, html in pages:
+        expected = baseline.extract(html, id)
+        for extractor in extractors[1:]:
+            if extractor.extract(html, id) != expected:
+                mismatches.append({'page': name, 'backend': extractor.name})
+    return mismatches
+
+""" Pages and courses per second for each backend
+Parameters: pages -> list from load_pages()
+            extractors -> list from load_extractors()
+            rounds -> int: times every page is extracted per backend
+Return: list of result dicts
+"""
+def measure_throughput(pages, extractors, rounds):
+    results = []
+    total_bytes = sum(len(html.encode('utf-8')) for _, _, html in pages)
+    for extractor in extractors:
+        courses = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for _, id, html in pages:
+                courses += len(extractor.extract(html, id))
+        seconds = time.perf_counter() - start
+        results.append({
+            'backend': extractor.name,
+            'seconds': round(seconds, 3),
+            'pages_per_second': round(len(pages) * rounds / seconds, 1),
+            'courses_per_second': round(courses / seconds, 1),
+            'megabytes_per_second': round(total_bytes * rounds / seconds / 1e6, 2)
+        })
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parity and parse throughput of the department page backends.')
+    parser.add_argument('--departments', type=int, default=10, help='Synthetic department pages added to the fixtures.')
+    parser.add_argument('--courses', type=int, default=100, help='Courses per synthetic department page.')
+    parser.add_argument('--rounds', type=int, default=3, help='Times every page is extracted per backend.')
+    args = parser.parse_args()
+
+    pages = load_pages(args.departments, args.courses)
+    extractors = load_extractors()
+    mismatches = check_parity(pages, extractors)
+
+    print(json.dumps({
+        'benchmark': 'parse',
+        'pages': len(pages),
+        'parity_mismatches': mismatches,
+        'results': measure_throughput(pages, extractors, args.rounds)
+    }, indent=4))
+
+    if mismatches:
+        raise SystemExit("Backends disagree with the original extraction code.")
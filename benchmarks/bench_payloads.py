@@ -0,0 +1,103 @@
+#!usr/bin/env python3
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_routes import load_catalog
+from benchmarks.synthetic import generate_scaled_catalog
+from utils.compression import available_encodings
+from utils.payloads import dumps, orjson
+
+DEFAULT_SCALES = [1, 10]
+FORMATS = ['json', 'ndjson', 'columnar']
+PATHS = ['/course', '/department?expand=courses'] # The two full catalog downloads bulk consumers make
+
+""" Time GET requests to one path with one format and encoding
+Parameters: api -> the api module
+            client -> Flask test client
+            path -> str
+            encoding -> str: 'identity', 'gzip' or 'br'
+            cold -> bool: invalidate the read cache before every request, so the body is serialized (and compressed) again
+            repeats -> int
+Return: bytes sent, median milliseconds
+"""
+def time_path(api, client, path, encoding, cold, repeats):
+    headers = {'Accept-Encoding': encoding}
+    latencies = []
+    size = 0
+    for _ in range(repeats):
+        if cold:
+            api.catalog_version.bump()
+        start = time.perf_counter()
+        r = client.get(path, headers=headers)
+        size = len(r.get_data())
+        latencies.append(time.perf_counter() - start)
+        if r.status_code != 200:
+            raise SystemExit(f"GET {path} failed: {r.status}")
+        r.close()
+    return size, round(statistics.median(latencies) * 1000, 3)
+
+""" Serialization rate of single course records, the old per-row json.dumps against the compact encoder
+Parameters: courses -> list of course dicts
+Return: list of result dicts
+"""
+def time_encoders(courses):
+    encoders = [('json', lambda r: json.dumps(r).encode('utf-8')), ('json_compact', lambda r: json.dumps(r, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))]
+    if orjson is not None:
+        encoders.append(('orjson', dumps))
+    results = []
+    for name, encode in encoders:
+        start = time.perf_counter()
+        size = sum(len(encode(c)) for c in courses)
+        seconds = time.perf_counter() - start
+        results.append({'encoder': name, 'rows': len(courses), 'bytes': size, 'rows_per_second': round(len(courses) / seconds, 1)})
+    return results
+
+""" Response size and time of the full catalog downloads in every format and content encoding
+Parameters: scales -> list of float: synthetic catalog sizes
+            repeats -> int: requests per case
+Return: dict with the response and encoder results
+"""
+def run(scales, repeats):
+    directory = tempfile.mkdtemp()
+    # api reads its settings at import time
+    os.environ['CATALOG_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ.pop('CATALOG_SNAPSHOT', None)
+    import api
+    client = api.app.test_client()
+
+    responses = []
+    encoders = []
+    for scale in scales:
+        load_catalog(api, scale)
+        for path in PATHS:
+            # What the endpoint sent before this suite had formats or compression - spaced JSON, uncompressed
+            body = client.get(path).get_data()
+            legacy = len(json.dumps(json.loads(body)).encode('utf-8'))
+            responses.append({'scale': scale, 'path': path, 'format': 'legacy', 'encoding': 'identity', 'bytes': legacy,
+                'gzip_bytes': len(gzip.compress(json.dumps(json.loads(body)).encode('utf-8')))})
+
+            for format in FORMATS:
+                formatted = path + ('&' if '?' in path else '?') + f'format={format}'
+                for encoding in ['identity'] + available_encodings():
+                    size, cold_ms = time_path(api, client, formatted, encoding, True, repeats)
+                    _, warm_ms = time_path(api, client, formatted, encoding, False, repeats)
+                    responses.append({'scale': scale, 'path': path, 'format': format, 'encoding': encoding, 'bytes': size,
+                        'ratio': round(legacy / size, 1), 'cold_ms': cold_ms, 'warm_ms': warm_ms})
+
+        _, courses = generate_scaled_catalog(scale)
+        encoders.extend(dict(scale=scale, **r) for r in time_encoders(courses))
+    return {'responses': responses, 'encoders': encoders}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Size and serialization/compression time of the full catalog downloads.')
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES, help='Catalog sizes as multiples of the real catalog.')
+    parser.add_argument('--repeats', type=int, default=5, help='Requests per format and encoding.')
+    args = parser.parse_args()
+
+    print(json.dumps(dict({'benchmark': 'payloads'}, **run(args.scales, args.repeats)), indent=4))
@@ -0,0 +1,150 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+
+from benchmarks.synthetic import WORDS, generate_scaled_catalog
+
+DEFAULT_SCALES = [1, 10]
+SAMPLE_IDS = 50 # Distinct departments/courses requested per route, so the warm runs mostly hit the read cache
+
+# Query strings tried on each route ('' is the bare route), {department_id}, {word} and {prefix} are filled in per request
+ROUTE_QUERIES = {
+    '/department': ['', '?limit=50', '?expand=courses', '?expand=courses&limit=10'],
+    '/department/<string:department_id>/course': ['', '?limit=20', '?min_course_num=3000&fields=name'],
+    '/course': ['', '?limit=100', '?department={department_id}', '?min_hours=3&max_course_num=2000&limit=100'],
+    '/search': ['?q={word}', '?q={word}+{word}', '?q={prefix}'],
+    '/course/<string:course_id>/prerequisites': ['', '?transitive=1'],
+    '/course/<string:course_id>/unlocks': ['', '?transitive=1']
+}
+
+""" Fill a SQLite file with a synthetic catalog through api.py's bulk upsert
+Parameters: api -> the api module, already pointed at the benchmark database
+            scale -> float: catalog size as a multiple of the real catalog
+Return: list of departments, list of courses
+"""
+def load_catalog(api, scale):
+    departments, courses = generate_scaled_catalog(scale)
+    with api.app.app_context():
+        api.db.drop_all()
+        api.init_db()
+        api.bulk_upsert(api.DepartmentModel, {d['id']: d for d in departments})
+        api.bulk_upsert(api.CourseModel, {c['id']: c for c in courses})
+        api.commit_catalog()
+    return departments, courses
+
+""" Every GET route of the API, the URL map is read so new routes can't be left out
+Parameters: app -> Flask app
+Return: list of werkzeug Rules
+"""
+def get_routes(app):
+    rules = [r for r in app.url_map.iter_rules() if 'GET' in r.methods and r.endpoint != 'static']
+    return sorted(rules, key=lambda r: r.rule)
+
+""" Request paths for one route
+Parameters: rule -> werkzeug Rule
+            departments -> list of department dicts
+            courses -> list of course dicts
+            count -> int: number of paths
+            rng -> random.Random
+Return: list of paths
+"""
+def route_paths(rule, departments, courses, count, rng):
+    department_ids = [d['id'] for d in rng.sample(departments, min(SAMPLE_IDS, len(departments)))]
+    sampled_courses = rng.sample(courses, min(SAMPLE_IDS, len(courses)))
+    course_ids = [c['id'] for c in sampled_courses]
+    queries = ROUTE_QUERIES.get(rule.rule, [''])
+
+    paths = []
+    for i in range(count):
+        values = {}
+        # Routes addressing a course by department and number take both from one sampled course
+        course = rng.choice(sampled_courses) if 'course_num' in rule.arguments else None
+        for argument in rule.arguments:
+            if argument == 'department_id':
+                values[argument] = course['department_model_id'] if course else rng.choice(department_ids)
+            elif argument == 'course_id':
+                values[argument] = rng.choice(course_ids)
+            elif argument == 'course_num':
+                values[argument] = str(course['course_num'])
+            else:
+                raise SystemExit(f"No example value for <{argument}> in {rule.rule}, add one to bench_routes.py.")
+        path = re.sub(r'<(?:[^:<>]+:)?([^<>]+)>', lambda m: values[m.group(1)], rule.rule)
+        word = rng.choice(WORDS)
+        paths.append(path + queries[i % len(queries)].format(department_id=rng.choice(department_ids), word=word, prefix=word[:3]))
+    return paths
+
+""" Time requests to one route
+Parameters: api -> the api module
+            client -> Flask test client
+            paths -> list of request paths
+            cold -> bool: invalidate the read cache (and the search index/prerequisite graph) before every request
+Return: result dict
+"""
+def time_requests(api, client, paths, cold):
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for path in paths:
+        if cold:
+            api.catalog_version.bump()
+        request_start = time.perf_counter()
+        r = client.get(path)
+        r.get_data() # Streamed bodies are only produced while they're read
+        latencies.append(time.perf_counter() - request_start)
+        if r.status_code != 200:
+            errors += 1
+        r.close()
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(paths),
+        'requests_per_second': round(len(paths) / seconds, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p99_ms': round(latencies[max(math.ceil(len(latencies) * 0.99) - 1, 0)] * 1000, 3),
+        'errors': errors
+    }
+
+""" GET latency of every route, cold (right after a write) and warm (served from the read cache)
+Parameters: scales -> list of float: synthetic catalog sizes
+            warm_requests -> int: requests per route with the cache warm
+            cold_requests -> int: requests per route with the cache invalidated before each one
+Return: list of result dicts
+"""
+def run(scales, warm_requests, cold_requests):
+    directory = tempfile.mkdtemp()
+    # api reads its settings at import time
+    os.environ['CATALOG_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ.pop('CATALOG_SNAPSHOT', None)
+    import api
+    client = api.app.test_client()
+
+    results = []
+    for scale in scales:
+        departments, courses = load_catalog(api, scale)
+        for rule in get_routes(api.app):
+            rng = random.Random(rule.rule)
+            cold = time_requests(api, client, route_paths(rule, departments, courses, cold_requests, rng), True)
+            warm_paths = route_paths(rule, departments, courses, warm_requests, rng)
+            time_requests(api, client, warm_paths, False) # Fill the cache first
+            warm = time_requests(api, client, warm_paths, False)
+            results.append(dict(scale=scale, route=rule.rule, mode='cold', **cold))
+            results.append(dict(scale=scale, route=rule.rule, mode='warm', **warm))
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GET latency and throughput of every API route, in process.')
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES, help='Catalog sizes as multiples of the real catalog.')
+    parser.add_argument('--warm-requests', type=int, default=200, help='Requests per route served from a warm cache.')
+    parser.add_argument('--cold-requests', type=int, default=5, help='Requests per route right after a write.')
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'routes', 'results': run(args.scales, args.warm_requests, args.cold_requests)}, indent=4))
@@ -0,0 +1,109 @@
+#!usr/bin/env python3
+
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+
+import utils.scraper_functions as scraper_functions
+from benchmarks.recorded import load_department_pages, load_index_page
+from benchmarks.synthetic import generate_scaled_catalog, render_department_page, render_index_page
+from uta_scraper import scrape_all
+from utils.extractors import EXTRACTORS, get_extractor
+from utils.page_cache import PageCache
+
+DEFAULT_SCALES = [1, 10]
+
+# Recorded pages that aren't at the lowercase department URL, like get_department_html() expects
+FIXTURE_URLS = {
+    'BSAD/BUSA': 'bsad'
+}
+
+""" Fill a page cache with a whole catalog, so the scraper can replay it with --offline
+Parameters: directory -> str: cache folder
+            scale -> float: synthetic catalog size, 0 for the recorded pages only
+Return: number of department pages
+"""
+def record_catalog(directory, scale):
+    cache = PageCache(directory)
+    base = scraper_functions.BASE
+
+    recorded = load_department_pages()
+    for _, id, html in recorded:
+        cache.save(base + FIXTURE_URLS.get(id, id.lower()), html)
+
+    if not scale:
+        cache.save(base, load_index_page())
+        return len(recorded)
+
+    departments, courses = generate_scaled_catalog(scale)
+    by_department = {}
+    for c in courses:
+        by_department.setdefault(c['department_model_id'], []).append(c)
+    for d in departments:
+        cache.save(base + d['id'].lower(), render_department_page(d, by_department.get(d['id'], [])))
+
+    # The recorded departments are listed along with the synthetic ones
+    listed = [{'id': id, 'name': name} for name, id, _ in recorded] + departments
+    cache.save(base, render_index_page(listed))
+    return len(listed)
+
+""" Run the scraper's own pipeline (index, department list, concurrent department scrape) over a recorded catalog
+Parameters: directory -> str: cache folder from record_catalog()
+            parser -> str: extraction backend
+            workers -> int: concurrent department scrapes
+Return: number of departments, number of courses, seconds
+"""
+def replay(directory, parser, workers):
+    scraper_functions.configure_session(pool_size=workers, requests_per_second=0)
+    scraper_functions.configure_cache(directory, offline=True)
+    extractor = get_extractor(parser)
+
+    start = time.perf_counter()
+    # The scraper prints a line per department, keep it out of the JSON output
+    with contextlib.redirect_stdout(io.StringIO()):
+        departments = scraper_functions.get_departments_list(scraper_functions.setup_department_catalogs())
+        courses = sum(len(department_courses) for _, department_courses in scrape_all(departments, workers, extractor))
+    return len(departments), courses, time.perf_counter() - start
+
+""" Scrape throughput for every backend at every catalog size, all replayed offline from a page cache
+Parameters: scales -> list of float: synthetic catalog sizes, 0 is the recorded pages alone
+            workers -> int: concurrent department scrapes
+Return: list of result dicts
+"""
+def run(scales, workers):
+    parsers = []
+    for name in sorted(EXTRACTORS):
+        try:
+            get_extractor(name)
+            parsers.append(name)
+        except SystemError:
+            pass
+
+    results = []
+    for scale in scales:
+        directory = tempfile.mkdtemp()
+        record_catalog(directory, scale)
+        for parser in parsers:
+            departments, courses, seconds = replay(directory, parser, workers)
+            results.append({
+                'scale': scale,
+                'parser': parser,
+                'departments': departments,
+                'courses': courses,
+                'seconds': round(seconds, 3),
+                'departments_per_second': round(departments / seconds, 1),
+                'courses_per_second': round(courses / seconds, 1)
+            })
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='End to end scrape throughput, replaying recorded and synthetic catalogs offline.')
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES,
+        help='Catalog sizes as multiples of the real catalog, 0 for the recorded pages only.')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'scrape', 'workers': args.workers, 'results': run(args.scales, args.workers)}, indent=4))
@@ -0,0 +1,54 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.synthetic import WORDS, generate_catalog
+from utils.search_index import SearchIndex
+
+COURSES_PER_DEPARTMENT = 50
+DEFAULT_SIZES = [1000, 5000, 20000, 100000]
+
+""" Time index builds and queries over synthetic catalogs of growing size
+Parameters: sizes -> list of int: number of courses in each catalog
+            queries -> int: queries timed per catalog
+Return: list of result dicts, one per catalog size
+"""
+def run(sizes, queries):
+    results = []
+    for size in sizes:
+        _, courses = generate_catalog(max(size // COURSES_PER_DEPARTMENT, 1), COURSES_PER_DEPARTMENT)
+
+        start = time.perf_counter()
+        index = SearchIndex(courses)
+        build_seconds = time.perf_counter() - start
+
+        # Mix of one word, two word and prefix queries
+        terms = [WORDS[i % len(WORDS)] for i in range(queries)]
+        query_texts = [t if i % 3 == 0 else (t + ' ' + WORDS[(i * 7) % len(WORDS)] if i % 3 == 1 else t[:3]) for i, t in enumerate(terms)]
+
+        latencies = []
+        for q in query_texts:
+            start = time.perf_counter()
+            index.search(q, limit=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        results.append({
+            'courses': len(index),
+            'build_seconds': round(build_seconds, 3),
+            'query_p50_ms': round(statistics.median(latencies), 3),
+            'query_p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 3),
+            'query_max_ms': round(latencies[-1], 3)
+        })
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Search latency against catalog size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Catalog sizes in courses.')
+    parser.add_argument('--queries', type=int, default=200, help='Queries timed per catalog size.')
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'search', 'results': run(args.sizes, args.queries)}, indent=4))
@@ -0,0 +1,74 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_catalog
+
+COURSES_PER_DEPARTMENT = 50
+
+""" Time serving single courses through the ORM against reading them from a snapshot
+Parameters: size -> int: number of courses in the synthetic catalog
+            lookups -> int: lookups timed for each path
+Return: result dict
+"""
+def run(size, lookups):
+    directory = tempfile.mkdtemp()
+    # api reads its settings at import time
+    os.environ['CATALOG_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    os.environ.pop('CATALOG_SNAPSHOT', None)
+    import api
+    from flask_restful import marshal
+    from utils.snapshot import CatalogSnapshot, write_snapshot
+
+    departments, courses = generate_catalog(max(size // COURSES_PER_DEPARTMENT, 1), COURSES_PER_DEPARTMENT)
+    snapshot_path = os.path.join(directory, 'catalog.snapshot')
+    ids = [random.Random(i).choice(courses)['id'] for i in range(lookups)]
+
+    with api.app.app_context():
+        api.bulk_upsert(api.DepartmentModel, {d['id']: d for d in departments})
+        api.bulk_upsert(api.CourseModel, {c['id']: c for c in courses})
+        api.db.session.commit()
+
+        start = time.perf_counter()
+        export = write_snapshot(snapshot_path,
+            (marshal(d, api.department_resource_fields) for d in api.DepartmentModel.query),
+            (marshal(c, api.course_resource_fields) for c in api.CourseModel.query))
+        export_seconds = time.perf_counter() - start
+
+        # What Course.get does on a cache miss
+        start = time.perf_counter()
+        for id in ids:
+            result = api.read_session.query(api.CourseModel).filter_by(id=id).first()
+            json.dumps(marshal(result, api.course_resource_fields)).encode('utf-8')
+        orm_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = CatalogSnapshot(snapshot_path)
+    open_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for id in ids:
+        snapshot.course(id)
+    snapshot_seconds = time.perf_counter() - start
+
+    return {
+        'courses': export['courses'],
+        'snapshot_bytes': os.path.getsize(snapshot_path),
+        'export_seconds': round(export_seconds, 3),
+        'snapshot_open_ms': round(open_seconds * 1000, 3),
+        'orm_lookups_per_second': round(lookups / orm_seconds),
+        'snapshot_lookups_per_second': round(lookups / snapshot_seconds)
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Single course lookups, ORM against the memory-mapped snapshot.')
+    parser.add_argument('--size', type=int, default=20000, help='Catalog size in courses.')
+    parser.add_argument('--lookups', type=int, default=5000, help='Lookups timed for each path.')
+    args = parser.parse_args()
+
+    print(json.dumps({'benchmark': 'snapshot', 'results': run(args.size, args.lookups)}, indent=4))
@@ -0,0 +1,94 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+
+DEFAULT_THRESHOLD = 0.10 # Relative change ignored as noise
+
+# Fields that say which case a result is for rather than how it went, used to match results between two runs
+IDENTITY_FIELDS = ('scale', 'batch_size', 'connections', 'courses', 'size')
+
+""" Whether a bigger value of a metric is better, worse, or not comparable
+Parameters: name -> str: metric name
+Return: 1 if higher is better, -1 if lower is better, 0 otherwise
+"""
+def direction(name):
+    if name.endswith('_per_second'):
+        return 1
+    if name.endswith('_ms') or name.endswith('seconds') or name.endswith('bytes') or name == 'errors':
+        return -1
+    return 0
+
+""" Label of one entry of a result list, from its identifying fields
+Parameters: item -> dict
+            index -> int: position in the list, used when nothing identifies the entry
+Return: str
+"""
+def item_label(item, index):
+    parts = [f'{k}={v}' for k, v in item.items() if isinstance(v, str) or k in IDENTITY_FIELDS]
+    return ','.join(parts) if parts else str(index)
+
+""" Flatten benchmark output into metric path -> value
+Parameters: value -> JSON value
+            path -> str: path so far
+            out -> dict: filled in
+Return: dict
+"""
+def flatten(value, path='', out=None):
+    out = {} if out is None else out
+    if isinstance(value, dict):
+        for k, v in value.items():
+            flatten(v, f'{path}/{k}' if path else k, out)
+    elif isinstance(value, list):
+        for i, v in enumerate(value):
+            flatten(v, f'{path}[{item_label(v, i) if isinstance(v, dict) else i}]', out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[path] = value
+    return out
+
+""" Metrics that moved by more than the threshold between two result files
+Parameters: old -> dict: earlier run_all output
+            new -> dict: later run_all output
+            threshold -> float: relative change ignored as noise
+Return: list of regressions, list of improvements (dicts with the metric, both values and the change)
+"""
+def compare(old, new, threshold):
+    old_metrics = flatten(old['benchmarks'])
+    new_metrics = flatten(new['benchmarks'])
+    regressions = []
+    improvements = []
+    for path, new_value in new_metrics.items():
+        sign = direction(path.rsplit('/', 1)[-1])
+        old_value = old_metrics.get(path)
+        if not sign or old_value is None:
+            continue
+        if old_value == 0:
+            # Only errors can start from zero, any new ones are a regression
+            if new_value > 0 and sign < 0:
+                regressions.append({'metric': path, 'old': old_value, 'new': new_value, 'change': None})
+            continue
+        change = (new_value - old_value) / abs(old_value)
+        entry = {'metric': path, 'old': old_value, 'new': new_value, 'change': round(change, 3)}
+        if change * sign < -threshold:
+            regressions.append(entry)
+        elif change * sign > threshold:
+            improvements.append(entry)
+    return regressions, improvements
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files, e.g. from before and after a change.')
+    parser.add_argument('old', help='Results of the baseline commit.')
+    parser.add_argument('new', help='Results of the commit being checked.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Relative change ignored as noise (default: 0.10).')
+    args = parser.parse_args()
+
+    with open(args.old, 'r') as f:
+        old = json.load(f)
+    with open(args.new, 'r') as f:
+        new = json.load(f)
+    regressions, improvements = compare(old, new, args.threshold)
+
+    print(json.dumps({'old': old.get('commit'), 'new': new.get('commit'), 'threshold': args.threshold,
+        'regressions': regressions, 'improvements': improvements}, indent=4))
+    if regressions:
+        raise SystemExit(f"{len(regressions)} metrics got worse by more than {args.threshold:.0%}.")
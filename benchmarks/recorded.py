@@ -0,0 +1,35 @@
+#!usr/bin/env python3
+
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+INDEX_FIXTURE = 'index'
+
+# Recorded department pages and the department ID each belongs to, the ID changes how a page is read (ASL, BSAD/BUSA)
+FIXTURE_DEPARTMENTS = {
+    'asl': 'ASL',
+    'bsad': 'BSAD/BUSA',
+    'cse': 'CSE'
+}
+
+""" Read one recorded catalog page
+Parameters: name -> str: file name in benchmarks/fixtures without '.html'
+Return: str of HTML
+"""
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name + '.html'), 'r') as f:
+        return f.read()
+
+""" Recorded department pages
+Parameters: None
+Return: list of (name, department ID, html) tuples
+"""
+def load_department_pages():
+    return [(name, id, read_fixture(name)) for name, id in sorted(FIXTURE_DEPARTMENTS.items())]
+
+""" Recorded catalog index (the sitemap linking every department page)
+Parameters: None
+Return: str of HTML
+"""
+def load_index_page():
+    return read_fixture(INDEX_FIXTURE)
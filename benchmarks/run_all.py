@@ -0,0 +1,86 @@
+#!usr/bin/env python3
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = 'benchmark_results.json'
+DEFAULT_SCALES = ['1', '10']
+
+""" Command line of every benchmark in the suite
+Parameters: scales -> list of str: catalog sizes for the benchmarks that take them
+            include_async -> bool: also run bench_async (needs starlette/uvicorn/aiosqlite, starts two servers)
+Return: list of (name, argument list)
+"""
+def suite(scales, include_async):
+    benchmarks = [
+        ('parse', ['benchmarks.bench_parse']),
+        ('scrape', ['benchmarks.bench_scrape', '--scales', '0'] + scales),
+        ('ingest', ['benchmarks.bench_ingest', '--scales'] + scales),
+        ('routes', ['benchmarks.bench_routes', '--scales'] + scales),
+        ('payloads', ['benchmarks.bench_payloads', '--scales'] + scales),
+        ('search', ['benchmarks.bench_search']),
+        ('snapshot', ['benchmarks.bench_snapshot']),
+        ('db_concurrency', ['benchmarks.bench_db_concurrency'])
+    ]
+    if include_async:
+        benchmarks.append(('async', ['benchmarks.bench_async']))
+    return benchmarks
+
+""" Commit the benchmarks ran against, so result files can be told apart
+Parameters: None
+Return: str or None outside of a git checkout
+"""
+def current_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT, capture_output=True, text=True).stdout
+        return commit + ('-dirty' if dirty.strip() else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+""" Run every benchmark in its own process (several import api.py with their own database settings)
+Parameters: benchmarks -> list from suite()
+Return: dict of benchmark name -> its JSON output
+"""
+def run(benchmarks):
+    results = {}
+    environ = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    for name, arguments in benchmarks:
+        print(f"Running {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-m'] + arguments, cwd=REPO_ROOT, env=environ, capture_output=True, text=True)
+        if completed.returncode != 0:
+            results[name] = {'error': completed.stderr.strip().splitlines()[-1:] or ['exit code ' + str(completed.returncode)]}
+        else:
+            results[name] = json.loads(completed.stdout)
+        print(f"  {name} took {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the whole benchmark suite offline and save the results as one JSON file.')
+    parser.add_argument('--scales', nargs='+', default=DEFAULT_SCALES,
+        help='Synthetic catalog sizes, as multiples of the real catalog, for the scrape/ingest/routes benchmarks.')
+    parser.add_argument('--include-async', action='store_true', help='Also compare the Flask and ASGI servers under load.')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f'Results file (default: {DEFAULT_OUTPUT}).')
+    args = parser.parse_args()
+
+    report = {
+        'commit': current_commit(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'benchmarks': run(suite(args.scales, args.include_async))
+    }
+    with open(args.output, 'w') as outfile:
+        outfile.write(json.dumps(report, indent=4))
+    print(f"Results written to {args.output}.", file=sys.stderr)
+
+    failed = [name for name, result in report['benchmarks'].items() if 'error' in result]
+    if failed:
+        raise SystemExit(f"Failed: {', '.join(failed)}.")
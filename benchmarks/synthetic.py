@@ -0,0 +1,131 @@
+#!usr/bin/env python3
+
+import html
+import random
+import re
+import string
+
+# Words course names and descriptions are built from
+WORDS = (
+    'introduction advanced principles theory applied analysis design systems programming data structures algorithms '
+    'networks security databases software engineering computer architecture operating compilers languages graphics '
+    'machine learning statistics probability calculus linear algebra differential equations discrete mathematics '
+    'physics chemistry biology genetics ecology accounting finance marketing management economics policy ethics '
+    'history literature writing rhetoric philosophy psychology sociology anthropology music theatre art studio '
+    'laboratory seminar research methods topics special independent study project capstone practicum internship '
+    'communication media culture society health nursing kinesiology nutrition environment energy materials '
+    'mechanics thermodynamics circuits signals control robotics manufacturing quality optimization modeling'
+).split()
+
+# Rough size of the real catalog, the unit for scale factors ("10x UTA")
+UTA_DEPARTMENTS = 120
+UTA_COURSES_PER_DEPARTMENT = 45
+
+""" Make up a department ID that looks like a real one
+Parameters: number -> int: index of the department
+Return: str, e.g. 'ABCD'
+"""
+def department_id(number):
+    letters = string.ascii_uppercase
+    id = ''
+    number += 26 * 26 # Start at three letters, like most real departments
+    while number:
+        number, digit = divmod(number, 26)
+        id = letters[digit] + id
+    return id
+
+""" Generate a catalog shaped like the scraper's output, for benchmarks
+Parameters: num_departments -> int
+            courses_per_department -> int
+            seed -> int: same seed, same catalog
+Return: list of department dicts, list of course dicts
+"""
+def generate_catalog(num_departments, courses_per_department, seed=0):
+    rng = random.Random(seed)
+    departments = []
+    courses = []
+
+    for d in range(num_departments):
+        dept_id = department_id(d)
+        course_nums = sorted(rng.sample(range(1000, 5000), min(courses_per_department, 4000)))
+        departments.append({
+            'id': dept_id,
+            'name': ' '.join(rng.choice(WORDS) for _ in range(3)).title(),
+            'num_of_courses': len(course_nums)
+        })
+
+        for i, num in enumerate(course_nums):
+            # Prerequisites point at lower numbered courses of the same department, sometimes with an OR group
+            prerequisites = ''
+            if i > 0 and rng.random() < 0.6:
+                earlier = [f'{dept_id} {n}' for n in rng.sample(course_nums[:i], min(i, 3))]
+                if len(earlier) == 3:
+                    prerequisites = f'{earlier[0]} and ({earlier[1]} or {earlier[2]})'
+                else:
+                    prerequisites = ' and '.join(earlier)
+
+            courses.append({
+                'id': f'{dept_id}{num}',
+                'course_num': num,
+                'name': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).upper(),
+                'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(15, 60))).capitalize() + '.',
+                'num_of_hours': rng.choice((1, 2, 3, 3, 3, 4)),
+                'prerequisites': prerequisites,
+                'tccn_id': '',
+                'department_model_id': dept_id
+            })
+
+    return departments, courses
+
+""" Render a department page with the same markup as the UTA catalog
+Parameters: department -> dict: department record
+            courses -> list: course records of that department
+Return: str of HTML
+"""
+def render_department_page(department, courses):
+    blocks = []
+    for c in courses:
+        prerequisites = ''
+        if c['prerequisites']:
+            # Course references are links on the real pages
+            linked = re.sub(r'([A-Z]{2,5}) (\d{4})', r'<a href="/search/?P=\1%20\2" class="bubblelink code">\1&#160;\2</a>', c['prerequisites'])
+            prerequisites = f' Prerequisite: C or better in {linked}.'
+        blocks.append(
+            '<div class="courseblock">\n'
+            f'<p class="courseblocktitle"><strong>{c["department_model_id"]}&#160;{c["course_num"]}.&#160;&#160;{html.escape(c["name"])}.'
+            f'&#160;&#160;{c["num_of_hours"]} Hours.&#160;&#160;</strong></p>\n'
+            f'<p class="courseblockdesc">\n{html.escape(c["description"])}{prerequisites}<br/>\n</p>\n'
+            '</div>'
+        )
+    # Navigation and footer padding, like the real pages have around the courses
+    navigation = '\n'.join(f'<li><a href="/coursedescriptions/{w}/">{w.title()}</a></li>' for w in WORDS)
+    return (
+        '<!DOCTYPE html>\n<html lang="en">\n'
+        f'<head><title>{html.escape(department["name"])} ({department["id"]})</title></head>\n<body>\n'
+        f'<div id="header"><ul class="nav">\n{navigation}\n</ul></div>\n'
+        '<div id="content">\n<div id="textcontainer" class="page_content">\n'
+        f'<h1 class="page-title">{html.escape(department["name"])} ({department["id"]})</h1>\n'
+        '<div class="courses">\n' + '\n'.join(blocks) + '\n</div>\n</div>\n</div>\n'
+        '<div id="footer"><p>&#169; University of Texas at Arlington</p></div>\n</body>\n</html>\n'
+    )
+
+""" Generate a catalog a multiple of the real catalog's size
+Parameters: scale -> float: 1 is about UTA's size, 10 and 100 look for scaling cliffs
+            seed -> int: same seed, same catalog
+Return: list of department dicts, list of course dicts
+"""
+def generate_scaled_catalog(scale, seed=0):
+    # More departments rather than longer ones, real department pages don't grow with the university
+    return generate_catalog(max(int(UTA_DEPARTMENTS * scale), 1), UTA_COURSES_PER_DEPARTMENT, seed)
+
+""" Render the catalog index page, the sitemap that links every department page
+Parameters: departments -> list of department records
+Return: str of HTML
+"""
+def render_index_page(departments):
+    links = '\n'.join(f'<li><a href="/coursedescriptions/{d["id"].lower()}/">{html.escape(d["name"])} ({d["id"]})</a></li>'
+        for d in departments)
+    return (
+        '<!DOCTYPE html>\n<html lang="en">\n<head><title>Course Descriptions</title></head>\n<body>\n'
+        f'<div id="content">\n<div class="sitemap">\n<ul>\n{links}\n</ul>\n</div>\n</div>\n</body>\n</html>\n'
+    )
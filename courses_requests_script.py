@@ -1,18 +1,29 @@
 #!usr/bin/env python3
 
+import argparse
 import requests
-import json
+
+from utils.catalog_io import batched, read_records
 
 BASE = 'http://127.0.0.1:5000/'
+DEFAULT_BATCH_SIZE = 1000
 
 if __name__ == '__main__':
-    with open('courses.json', 'r') as f:
-        data = json.load(f)
-    courses = data['courses']
-    
-    for c in courses:
+    parser = argparse.ArgumentParser(description='Load courses.json into the API.')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+        help=f'Courses sent per bulk request (default: {DEFAULT_BATCH_SIZE}).')
+    parser.add_argument('--file', default='courses.json',
+        help='Scraped courses to load, .json or .ndjson (read one line at a time) (default: courses.json).')
+    args = parser.parse_args()
+
+    courses = read_records(args.file, 'courses')
+
+    for batch in batched(courses, args.batch_size):
         try:
-            r = requests.put(BASE + '/course/' + c['id'], c)
+            r = requests.post(BASE + '/course/_bulk', json=batch)
             r.raise_for_status()
         except:
-            raise SystemExit(f"Error on {c['id']}.")
\ No newline at end of file
+            raise SystemExit(f"Error on courses {batch[0]['id']} to {batch[-1]['id']}.")
+        result = r.json()
+        if result['errors']:
+            raise SystemExit(f"Error on {', '.join(str(e['id']) for e in result['errors'])}: {result['errors']}")
@@ -0,0 +1,63 @@
+#!usr/bin/env python3
+
+import requests
+import json
+import sys
+
+from utils.catalog_diff import DEFAULT_DELTA_FILE, summarize_delta
+
+BASE = 'http://127.0.0.1:5000/'
+
+""" URL of a single department
+Parameters: id -> str: department ID as scraped
+Return: str
+"""
+def department_url(id):
+    # BSAD/BUSA - the '/' can't be part of the URL path
+    return BASE + '/department/' + id.replace('/', '-')
+
+""" URL of a single course
+Parameters: id -> str: course ID
+Return: str
+"""
+def course_url(id):
+    return BASE + '/course/' + id
+
+""" Send one request of the delta, exiting on the first failure
+Parameters: method -> str: 'put', 'patch' or 'delete'
+            url -> str: resource URL
+            id -> str: record ID, for the error message
+            record -> dict: request body, None for deletes
+Return: None
+"""
+def send(method, url, id, record=None):
+    try:
+        r = requests.request(method, url, json=record)
+        r.raise_for_status()
+    except:
+        raise SystemExit(f"Error on {method.upper()} {id}.")
+
+if __name__ == '__main__':
+    delta_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DELTA_FILE
+    with open(delta_file, 'r') as f:
+        delta = json.load(f)
+    departments = delta['departments']
+    courses = delta['courses']
+
+    print(summarize_delta(delta))
+
+    # Departments have to exist before their courses are added, and their courses have to be gone before they're removed
+    for d in departments['added']:
+        send('put', department_url(d['record']['id']), d['record']['id'], d['record'])
+    for d in departments['changed']:
+        send('patch', department_url(d['record']['id']), d['record']['id'], d['record'])
+
+    for c in courses['removed']:
+        send('delete', course_url(c['id']), c['id'])
+    for c in courses['added']:
+        send('put', course_url(c['record']['id']), c['record']['id'], c['record'])
+    for c in courses['changed']:
+        send('patch', course_url(c['record']['id']), c['record']['id'], c['record'])
+
+    for d in departments['removed']:
+        send('delete', department_url(d['id']), d['id'])
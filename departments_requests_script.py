@@ -1,21 +1,32 @@
 #!usr/bin/env python3
 
+import argparse
 import requests
-import json
+
+from utils.catalog_io import batched, read_records
 
 BASE = 'http://127.0.0.1:5000/'
+DEFAULT_BATCH_SIZE = 1000
 
 if __name__ == '__main__':
-    with open('departments.json', 'r') as f:
-        data = json.load(f)
-    departments = data['departments']
-    
-    for d in departments:
+    parser = argparse.ArgumentParser(description='Load departments.json into the API.')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+        help=f'Departments sent per bulk request (default: {DEFAULT_BATCH_SIZE}).')
+    parser.add_argument('--file', default='departments.json',
+        help='Scraped departments to load, .json or .ndjson (read one line at a time) (default: departments.json).')
+    args = parser.parse_args()
+
+    departments = read_records(args.file, 'departments')
+
+    # BSAD/BUSA - stored as BSAD-BUSA, same as its URL
+    departments = (dict(d, id=d['id'].replace('/', '-')) for d in departments)
+
+    for batch in batched(departments, args.batch_size):
         try:
-            if d['id'] == 'BSAD/BUSA':
-                r = requests.put(BASE + '/department/' + d['id'].replace('/', '-'), d)
-            else:
-                r = requests.put(BASE + '/department/' + d['id'], d)
+            r = requests.post(BASE + '/department/_bulk', json=batch)
             r.raise_for_status()
         except:
-            raise SystemExit(f"Error on {d['id']}")
\ No newline at end of file
+            raise SystemExit(f"Error on departments {batch[0]['id']} to {batch[-1]['id']}.")
+        result = r.json()
+        if result['errors']:
+            raise SystemExit(f"Error on {', '.join(str(e['id']) for e in result['errors'])}: {result['errors']}")
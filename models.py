@@ -0,0 +1,127 @@
+#!usr/bin/env python3
+
+from flask_restful import fields
+from flask_sqlalchemy import SQLAlchemy
+
+# Tables and response fields shared by api.py and async_api.py. Importing this module has no side effects:
+# db isn't bound to an app (api.py calls db.init_app()), and async_api.py only builds Core statements from the tables.
+
+MAX_DEPT_ID_LENGTH = 10
+MAX_DEPT_NAME_LENGTH = 100
+MAX_COURSE_ID_LENGTH = 20
+MAX_COURSE_NAME_LENGTH = 200
+MAX_COURSE_DESC_LENGTH = 1000
+MAX_COURSE_PREREQ_LENGTH = 200
+
+STREAM_BATCH_SIZE = 500 # Rows fetched from the DB cursor (and written to the client) at a time
+MAX_PAGE_SIZE = 1000 # Largest 'limit' accepted by the list endpoints
+
+db = SQLAlchemy()
+
+department_resource_fields = {
+    'id': fields.String,
+    'name': fields.String,
+    'num_of_courses': fields.Integer
+}
+
+course_resource_fields = {
+    'id': fields.String,
+    'course_num': fields.Integer,
+    'name': fields.String,
+    'description': fields.String,
+    'num_of_hours': fields.Integer,
+    'prerequisites': fields.String,
+    'tccn_id': fields.String,
+    'department_model_id': fields.String
+}
+
+class DepartmentModel(db.Model):
+    id = db.Column(db.String(MAX_DEPT_ID_LENGTH), primary_key=True)
+    name = db.Column(db.String(MAX_DEPT_NAME_LENGTH), nullable=False)
+    num_of_courses = db.Column(db.Integer, nullable=False)
+    courses = db.relationship('CourseModel', backref='department_model') # One-to-many relationship
+
+    def __repr__(self):
+        return f'Department name = {self.name}, number of courses = {self.num_of_courses}'
+
+    def to_json(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'num_of_courses': int(self.num_of_courses)
+        }
+
+class CourseModel(db.Model):
+    id = db.Column(db.String(MAX_COURSE_ID_LENGTH), primary_key=True)
+    course_num = db.Column(db.Integer, nullable=False, index=True)
+    name = db.Column(db.String(MAX_COURSE_NAME_LENGTH), nullable=False)
+    description = db.Column(db.String(MAX_COURSE_DESC_LENGTH), nullable=False)
+    num_of_hours = db.Column(db.Integer, nullable=False, index=True)
+    prerequisites = db.Column(db.String(MAX_COURSE_PREREQ_LENGTH), nullable=False)
+    tccn_id = db.Column(db.String(MAX_COURSE_ID_LENGTH), nullable=False)
+    department_model_id = db.Column(db.String(MAX_DEPT_ID_LENGTH), db.ForeignKey('department_model.id'), nullable=False)
+    # Table name of DepartmentModel -> department_model
+    # Serves /department/<id>/course/<num>, and (as its leading column) every lookup by department
+    __table_args__ = (db.Index('ix_course_model_department_model_id_course_num', 'department_model_id', 'course_num'),)
+    
+    def __repr__(self):
+        return f'Course name = {self.name}'
+
+    def to_json(self):
+        return {
+            'id': self.id,
+            'course_num': int(self.course_num),
+            'name': self.name,
+            'description': self.description,
+            'num_of_hours': int(self.num_of_hours),
+            'prerequisites': self.prerequisites,
+            'tccn_id': self.tccn_id,
+            'department_model_id': self.department_model_id
+        }
+
+# Prerequisite graph - direct edges parsed from CourseModel.prerequisites, plus their transitive closure.
+# No foreign keys, a prerequisite may reference a course that isn't in the catalog (reported as dangling).
+class PrerequisiteModel(db.Model):
+    course_id = db.Column(db.String(MAX_COURSE_ID_LENGTH), primary_key=True)
+    prerequisite_id = db.Column(db.String(MAX_COURSE_ID_LENGTH), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f'{self.course_id} requires {self.prerequisite_id}'
+
+class PrerequisiteClosureModel(db.Model):
+    course_id = db.Column(db.String(MAX_COURSE_ID_LENGTH), primary_key=True)
+    ancestor_id = db.Column(db.String(MAX_COURSE_ID_LENGTH), primary_key=True, index=True)
+    depth = db.Column(db.Integer, nullable=False) # Shortest number of prerequisite steps between the two
+
+    def __repr__(self):
+        return f'{self.course_id} requires {self.ancestor_id} ({self.depth} steps)'
+
+# Department aggregates - updated in the same transaction as every course write (see apply_stats_delta), so
+# /department/<id>/stats is a primary key lookup. Keyed by the courses' department_model_id, no foreign keys.
+class DepartmentStatsModel(db.Model):
+    department_id = db.Column(db.String(MAX_DEPT_ID_LENGTH), primary_key=True)
+    course_count = db.Column(db.Integer, nullable=False)
+    total_hours = db.Column(db.Integer, nullable=False)
+    min_hours = db.Column(db.Integer) # NULL once the department has no courses
+    max_hours = db.Column(db.Integer)
+    with_prerequisites = db.Column(db.Integer, nullable=False) # Courses with non-empty prerequisites
+
+    def __repr__(self):
+        return f'{self.department_id}: {self.course_count} courses, {self.total_hours} hours'
+
+    def to_json(self):
+        return {
+            'course_count': int(self.course_count),
+            'total_hours': int(self.total_hours),
+            'min_hours': self.min_hours,
+            'max_hours': self.max_hours,
+            'with_prerequisites': int(self.with_prerequisites)
+        }
+
+class DepartmentLevelModel(db.Model):
+    department_id = db.Column(db.String(MAX_DEPT_ID_LENGTH), primary_key=True)
+    level = db.Column(db.Integer, primary_key=True) # course_num rounded down to the thousand, 3318 -> 3000
+    course_count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'{self.department_id} {self.level}: {self.course_count} courses'
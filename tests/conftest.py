@@ -0,0 +1,46 @@
+#!usr/bin/env python3
+
+import os
+import tempfile
+
+import pytest
+
+from benchmarks.synthetic import generate_catalog
+
+# api reads its settings at import time, so they're set before any test imports it
+TEST_DIRECTORY = tempfile.mkdtemp()
+os.environ['CATALOG_DATABASE_URI'] = f"sqlite:///{os.path.join(TEST_DIRECTORY, 'test.db')}"
+for name in ('CATALOG_READ_DATABASE_URI', 'CATALOG_SNAPSHOT', 'CATALOG_PROFILE_SLOW_MS'):
+    os.environ.pop(name, None)
+
+""" The api module over an empty database, with nothing left in the read cache
+Parameters: None
+Return: module
+"""
+@pytest.fixture
+def api():
+    import api as api_module
+    with api_module.app.app_context():
+        api_module.db.drop_all()
+        api_module.init_db()
+    api_module.catalog_version.bump()
+    api_module.resource_cache.clear()
+    api_module.list_cache.clear()
+    return api_module
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+""" A small synthetic catalog loaded through the bulk upload path
+Parameters: None
+Return: list of department dicts, list of course dicts
+"""
+@pytest.fixture
+def catalog(api):
+    departments, courses = generate_catalog(4, 12)
+    with api.app.app_context():
+        api.bulk_upsert(api.DepartmentModel, {d['id']: d for d in departments})
+        api.bulk_upsert(api.CourseModel, {c['id']: c for c in courses})
+        api.commit_catalog()
+    return departments, courses
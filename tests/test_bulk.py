@@ -0,0 +1,46 @@
+#!usr/bin/env python3
+
+import pytest
+
+COURSE = {
+    'id': 'CSE1310',
+    'course_num': 1310,
+    'name': 'INTRODUCTION TO COMPUTERS & PROGRAMMING',
+    'description': 'Introduction to computers, programming, and problem solving.',
+    'num_of_hours': 3,
+    'prerequisites': '',
+    'tccn_id': '',
+    'department_model_id': 'CSE'
+}
+
+@pytest.fixture
+def department(client):
+    r = client.post('/department/_bulk', json=[{'id': 'CSE', 'name': 'Computer Science and Engineering'}])
+    assert r.status_code == 200
+    return 'CSE'
+
+@pytest.mark.parametrize('field', sorted(COURSE))
+def test_null_course_field_is_a_row_error(client, department, field):
+    broken = dict(COURSE, id='CSE1320', course_num=1320)
+    broken[field] = None
+    rows = [dict(COURSE), broken, dict(COURSE, id='CSE1325', course_num=1325)]
+    r = client.post('/course/_bulk', json=rows)
+    assert r.status_code == 200
+    result = r.get_json()
+    assert result['inserted'] == 2
+    assert [e['index'] for e in result['errors']] == [1]
+
+    ids = [c['id'] for c in client.get('/course').get_json()]
+    assert ids == ['CSE1310', 'CSE1325']
+
+def test_null_department_name_is_a_row_error(client):
+    r = client.post('/department/_bulk', json=[{'id': 'CSE', 'name': None}, {'id': 'MATH', 'name': 'Mathematics'}])
+    assert r.status_code == 200
+    result = r.get_json()
+    assert result['inserted'] == 1
+    assert [(e['index'], e['id']) for e in result['errors']] == [(0, 'CSE')]
+
+def test_null_field_in_a_put_is_a_bad_request(client, department):
+    r = client.put('/course/CSE1310', json=dict(COURSE, name=None))
+    assert r.status_code == 400
+    assert client.get('/course/CSE1310').status_code == 409
@@ -0,0 +1,138 @@
+#!usr/bin/env python3
+
+import random
+
+import pytest
+
+DEPARTMENTS = ['AAA', 'BBB', 'CCC']
+
+""" Course record for a PUT or bulk upload
+Parameters: number -> int: course number, also used for the ID
+            department -> str: department ID
+            hours -> int: credit hours
+            prerequisites -> str
+Return: dict
+"""
+def course(number, department='AAA', hours=3, prerequisites=''):
+    return {'id': f'{department}{number}', 'course_num': number, 'name': 'COURSE', 'description': '', 'num_of_hours': hours,
+        'prerequisites': prerequisites, 'tccn_id': '', 'department_model_id': department}
+
+""" Assert the incrementally maintained aggregates match a full recount of the courses
+Parameters: api -> the api module
+Return: None
+"""
+def assert_consistent(api):
+    with api.app.app_context():
+        report = api.rebuild_department_stats(check_only=True)
+    assert report['mismatches'] == []
+    assert report['num_of_courses_mismatches'] == []
+
+""" GET a department's aggregates
+Parameters: client -> Flask test client
+            department -> str: department ID
+Return: dict
+"""
+def stats(client, department='AAA'):
+    return client.get(f'/department/{department}/stats').get_json()
+
+@pytest.fixture
+def departments(client):
+    r = client.post('/department/_bulk', json=[{'id': id, 'name': id} for id in DEPARTMENTS])
+    assert r.status_code == 200
+    return DEPARTMENTS
+
+def test_put_widens_min_and_max(api, client, departments):
+    for number, hours in [(1310, 3), (2315, 1), (4311, 6)]:
+        assert client.put(f'/course/AAA{number}', json=course(number, hours=hours, prerequisites='AAA 1310' if hours != 3 else '')).status_code == 201
+    s = stats(client)
+    assert (s['course_count'], s['total_hours'], s['min_hours'], s['max_hours'], s['with_prerequisites']) == (3, 10, 1, 6, 2)
+    assert s['levels'] == {'1000': 1, '2000': 1, '4000': 1}
+    assert_consistent(api)
+
+def test_delete_looks_min_and_max_up_again(api, client, departments):
+    for number, hours in [(1310, 3), (2315, 1), (4311, 6)]:
+        client.put(f'/course/AAA{number}', json=course(number, hours=hours))
+    assert client.delete('/course/AAA4311').status_code == 204
+    assert (stats(client)['min_hours'], stats(client)['max_hours']) == (1, 3)
+    assert_consistent(api)
+
+    client.delete('/course/AAA1310')
+    client.delete('/course/AAA2315')
+    s = stats(client)
+    assert (s['course_count'], s['min_hours'], s['max_hours'], s['levels']) == (0, None, None, {})
+    assert client.get('/department/AAA').get_json()['num_of_courses'] == 0
+    assert_consistent(api)
+
+def test_patch_lowering_the_max_looks_it_up_again(api, client, departments):
+    client.put('/course/AAA1310', json=course(1310, hours=3))
+    client.put('/course/AAA2315', json=course(2315, hours=6))
+    assert client.patch('/course/AAA2315', json={'num_of_hours': 2, 'course_num': 3315}).status_code == 200
+    s = stats(client)
+    assert (s['total_hours'], s['min_hours'], s['max_hours'], s['levels']) == (5, 2, 3, {'1000': 1, '3000': 1})
+    assert_consistent(api)
+
+def test_patch_moving_a_course_updates_both_departments(api, client, departments):
+    client.put('/course/AAA1310', json=course(1310, hours=1))
+    client.put('/course/AAA2315', json=course(2315, hours=4))
+    client.put('/course/BBB1310', json=course(1310, 'BBB', hours=3))
+    assert client.patch('/course/AAA2315', json={'department_model_id': 'BBB'}).status_code == 200
+
+    a, b = stats(client, 'AAA'), stats(client, 'BBB')
+    assert (a['course_count'], a['min_hours'], a['max_hours']) == (1, 1, 1)
+    assert (b['course_count'], b['min_hours'], b['max_hours']) == (2, 3, 4)
+    assert client.get('/department/BBB').get_json()['num_of_courses'] == 2
+    assert_consistent(api)
+
+def test_bulk_replacing_courses(api, client, departments):
+    client.post('/course/_bulk', json=[course(1310, hours=3), course(2315, hours=6), course(3310, hours=1)])
+    # The 6-hour course moves to another department and the 1-hour one gets more hours, in one upload
+    r = client.post('/course/_bulk', json=[dict(course(2315, hours=6), department_model_id='CCC'), course(3310, hours=4), course(4310, 'BBB', hours=2)])
+    assert r.get_json() == {'inserted': 1, 'updated': 2, 'errors': []}
+    a = stats(client, 'AAA')
+    assert (a['course_count'], a['total_hours'], a['min_hours'], a['max_hours']) == (2, 7, 3, 4)
+    assert_consistent(api)
+
+def test_courses_loaded_before_their_department(api, client):
+    client.post('/course/_bulk', json=[course(1310, 'DDD'), course(2310, 'DDD')])
+    assert client.put('/department/DDD', json={'id': 'DDD', 'name': 'DDD'}).status_code == 201
+    assert client.get('/department/DDD').get_json()['num_of_courses'] == 2
+    assert_consistent(api)
+
+def test_random_writes_keep_the_aggregates_exact(api, client, departments):
+    rng = random.Random(7)
+    live = set()
+    next_number = iter(range(1000, 10000, 7))
+
+    def random_course(number):
+        return course(number, rng.choice(DEPARTMENTS), rng.randint(0, 6), rng.choice(['', 'AAA 1000']))
+
+    for step in range(200):
+        op = rng.random()
+        if op < 0.3 or not live:
+            number = next(next_number)
+            c = random_course(number)
+            assert client.put(f"/course/{c['id']}", json=c).status_code == 201
+            live.add(c['id'])
+        elif op < 0.55:
+            id = rng.choice(sorted(live))
+            changes = {k: v for k, v in random_course(rng.choice([1100, 2200, 3300, 4400])).items()
+                if k in ('course_num', 'num_of_hours', 'prerequisites', 'department_model_id') and rng.random() < 0.5}
+            assert client.patch(f'/course/{id}', json=changes).status_code == 200
+        elif op < 0.7:
+            id = rng.choice(sorted(live))
+            assert client.delete(f'/course/{id}').status_code == 204
+            live.remove(id)
+        else:
+            # Bulk uploads replace some existing courses (keeping their ID) and add new ones
+            rows = []
+            for _ in range(rng.randint(1, 20)):
+                if live and rng.random() < 0.5:
+                    id = rng.choice(sorted(live))
+                    rows.append(dict(random_course(0), id=id, course_num=rng.randint(1000, 6999)))
+                else:
+                    rows.append(random_course(next(next_number)))
+            assert client.post('/course/_bulk', json=rows).get_json()['errors'] == []
+            live.update(r['id'] for r in rows)
+        if step % 20 == 0:
+            assert_consistent(api)
+    assert_consistent(api)
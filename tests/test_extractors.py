@@ -0,0 +1,60 @@
+#!usr/bin/env python3
+
+import pytest
+from bs4 import BeautifulSoup
+
+from benchmarks.recorded import load_department_pages
+from benchmarks.synthetic import generate_catalog, render_department_page
+from utils.extractors import LxmlExtractor, SoupExtractor, etree
+from utils.scraper_functions import extract_course_records
+
+PAGES = load_department_pages()
+EXTRACTORS = [
+    SoupExtractor,
+    pytest.param(LxmlExtractor, marks=pytest.mark.skipif(etree is None, reason='lxml is not installed'))
+]
+
+""" Records from the original extraction path, a full html.parser tree with no strainer
+Parameters: html -> str: department page
+            id -> str: department ID
+Return: list of course dicts
+"""
+def baseline_records(html, id):
+    return extract_course_records(BeautifulSoup(html, 'html.parser'), id)
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+@pytest.mark.parametrize('name, id, html', PAGES, ids=[name for name, _, _ in PAGES])
+def test_recorded_pages_match_baseline(extractor, name, id, html):
+    records = extractor().extract(html, id)
+    assert records # An empty page would match trivially
+    assert records == baseline_records(html, id)
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+def test_synthetic_pages_match_baseline(extractor):
+    departments, courses = generate_catalog(5, 8)
+    for department in departments:
+        department_courses = [c for c in courses if c['department_model_id'] == department['id']]
+        html = render_department_page(department, department_courses)
+        records = extractor().extract(html, department['id'])
+        assert [r['id'] for r in records] == [c['id'] for c in department_courses]
+        assert records == baseline_records(html, department['id'])
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+def test_asl_page(extractor):
+    # ASL has no 'courses' container, its courses are paragraphs in 'textcontainer'
+    html = dict((id, html) for _, id, html in PAGES)['ASL']
+    records = extractor().extract(html, 'ASL')
+    assert [r['id'] for r in records] == ['ASL1441', 'ASL1442']
+    assert records[0]['name'] == 'BEGINNING AMERICAN SIGN LANGUAGE I'
+    assert records[0]['num_of_hours'] == 4
+    assert records[1]['description'] == 'Continuation of ASL 1441.'
+    assert records[1]['prerequisites'] == 'ASL 1441'
+
+@pytest.mark.parametrize('extractor', EXTRACTORS)
+def test_bsad_busa_page(extractor):
+    # BSAD/BUSA has bare 'courseblock's, and each course keeps the prefix it's listed under
+    html = dict((id, html) for _, id, html in PAGES)['BSAD/BUSA']
+    records = extractor().extract(html, 'BSAD/BUSA')
+    assert [r['id'] for r in records] == ['BSAD1300', 'BUSA3300']
+    assert [r['department_model_id'] for r in records] == ['BSAD', 'BUSA']
+    assert records[1]['prerequisites'] == 'BSAD 1300 and junior standing'
@@ -0,0 +1,86 @@
+#!usr/bin/env python3
+
+import gzip
+import json
+
+import pytest
+
+from utils.read_cache import LRUCache
+
+def test_lru_cache_is_bounded_by_bytes():
+    cache = LRUCache(100, max_bytes=10)
+    cache.put('a', 'a', 4)
+    cache.put('b', 'b', 4)
+    cache.get('a') # 'b' is now the least recently used
+    cache.put('c', 'c', 4)
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.total_bytes == 8
+
+    cache.put('a', 'a', 7) # Replacing an entry counts its new size only
+    assert list(cache.entries) == ['a']
+    assert cache.total_bytes == 7
+
+    cache.put('d', 'd', 11) # Never fits, and doesn't push anything out
+    assert list(cache.entries) == ['a']
+
+""" GET a path and read the whole body, so a streamed response is finished before the next request
+Parameters: client -> Flask test client
+            path -> str
+            headers -> dict
+Return: response, bytes of the body as sent
+"""
+def fetch(client, path, headers=None):
+    r = client.get(path, headers=headers or {})
+    body = r.get_data()
+    r.close()
+    return r, body
+
+def test_unknown_query_parameters_share_an_entry(api, client, catalog):
+    first, first_body = fetch(client, '/course?limit=5')
+    for i in range(10):
+        r, body = fetch(client, f'/course?limit=5&junk={i}')
+        assert body == first_body
+        assert r.headers['ETag'] == first.headers['ETag']
+        assert 'junk' not in r.headers['Link']
+    assert len(api.list_cache.entries) == 1
+
+def test_list_cache_stays_under_its_byte_limit(api, client, catalog, monkeypatch):
+    monkeypatch.setattr(api.list_cache, 'max_bytes', 4096)
+    for limit in range(1, 40):
+        for encoding in ('identity', 'gzip'):
+            assert fetch(client, f'/course?limit={limit}', {'Accept-Encoding': encoding})[0].status_code == 200
+            assert api.list_cache.total_bytes <= 4096
+    assert api.list_cache.total_bytes == sum(len(body) + sum(len(v) for v in variants.values())
+        for body, _, _, variants in api.list_cache.entries.values())
+
+def test_large_streamed_lists_are_not_kept(api, client, catalog, monkeypatch):
+    monkeypatch.setattr(api, 'MAX_CACHED_LIST_BYTES', 256)
+    for encoding in ('identity', 'gzip'):
+        headers = {'Accept-Encoding': encoding}
+        first, first_body = fetch(client, '/course', headers)
+        second, second_body = fetch(client, '/course', headers)
+        assert not api.list_cache.entries # Built again, not served from the cache
+        assert first_body == second_body
+        assert first.headers['ETag'] == second.headers['ETag']
+        assert fetch(client, '/course', dict(headers, **{'If-None-Match': first.headers['ETag']}))[0].status_code == 304
+
+@pytest.mark.parametrize('path', ['/course', '/department?expand=courses', '/course?limit=5', '/course?department=NONE'])
+def test_an_etag_always_names_the_same_bytes(client, catalog, path):
+    bodies = {} # ETag -> bytes sent with it
+    for encoding in ('gzip', 'identity'):
+        headers = {'Accept-Encoding': encoding}
+        # The first request builds (and streams) the body, the second is served from the cache
+        for _ in range(2):
+            r, body = fetch(client, path, headers)
+            assert r.status_code == 200
+            assert 'Accept-Encoding' in r.vary
+            assert bodies.setdefault(r.headers['ETag'], body) == body
+            if r.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            assert json.loads(body) is not None
+
+        r, body = fetch(client, path, dict(headers, **{'If-None-Match': r.headers['ETag']}))
+        assert r.status_code == 304
+        assert body == b''
+        assert 'Accept-Encoding' in r.vary
+    assert len(bodies) == 2 # One representation per encoding
@@ -0,0 +1,28 @@
+#!usr/bin/env python3
+
+import pytest
+
+COURSE_FIELDS = ['course_num', 'name', 'description', 'num_of_hours', 'prerequisites', 'tccn_id', 'department_model_id']
+
+@pytest.mark.parametrize('field', COURSE_FIELDS)
+def test_null_course_field_is_a_bad_request(client, catalog, field):
+    _, courses = catalog
+    course = courses[0]
+    before = client.get(f"/course/{course['id']}").get_json()
+
+    r = client.patch(f"/course/{course['id']}", json={field: None})
+    assert r.status_code == 400
+    assert client.get(f"/course/{course['id']}").get_json() == before
+
+def test_null_department_name_is_a_bad_request(client, catalog):
+    departments, _ = catalog
+    r = client.patch(f"/department/{departments[0]['id']}", json={'name': None})
+    assert r.status_code == 400
+    assert client.get(f"/department/{departments[0]['id']}").get_json()['name'] == departments[0]['name']
+
+def test_fields_that_are_sent_are_still_updated(client, catalog):
+    _, courses = catalog
+    course = courses[0]
+    r = client.patch(f"/course/{course['id']}", json={'num_of_hours': 4})
+    assert r.status_code == 200
+    assert client.get(f"/course/{course['id']}").get_json()['num_of_hours'] == 4
@@ -0,0 +1,120 @@
+#!usr/bin/env python3
+
+import random
+
+COURSE_IDS = [f'AAA{n}' for n in range(1000, 1030)] + [f'BBB{n}' for n in range(1000, 1015)]
+
+""" Course record for a PUT or bulk upload
+Parameters: id -> str: course ID, department initials followed by the course number
+            prerequisites -> str
+Return: dict
+"""
+def course(id, prerequisites=''):
+    return {'id': id, 'course_num': int(id[-4:]), 'name': 'COURSE', 'description': '', 'num_of_hours': 3,
+        'prerequisites': prerequisites, 'tccn_id': '', 'department_model_id': id[:-4]}
+
+""" Prerequisite text naming some courses the way the catalog does ("AAA 1000 and BBB 1001")
+Parameters: ids -> list of course IDs
+            joiner -> str: ' and ' or ' or '
+Return: str
+"""
+def requires(ids, joiner=' and '):
+    return joiner.join(f'{id[:-4]} {id[-4:]}' for id in ids)
+
+""" Contents of the edge and closure tables
+Parameters: api -> the api module
+Return: set of (course, prerequisite) edges, set of (course, ancestor, depth) closure rows
+"""
+def graph_tables(api):
+    with api.app.app_context():
+        edges = {(r.course_id, r.prerequisite_id) for r in api.PrerequisiteModel.query}
+        closure = {(r.course_id, r.ancestor_id, r.depth) for r in api.PrerequisiteClosureModel.query}
+    return edges, closure
+
+""" Assert the incrementally maintained graph is what a full rebuild from the courses produces
+Parameters: api -> the api module
+Return: set of edges, set of closure rows
+"""
+def assert_matches_rebuild(api):
+    incremental = graph_tables(api)
+    with api.app.app_context():
+        api.build_prerequisite_graph()
+    assert incremental == graph_tables(api)
+    return incremental
+
+def test_chain_and_removal(api, client):
+    client.put('/course/AAA1000', json=course('AAA1000'))
+    client.put('/course/AAA2000', json=course('AAA2000', requires(['AAA1000'])))
+    client.put('/course/AAA3000', json=course('AAA3000', requires(['AAA2000'])))
+    _, closure = assert_matches_rebuild(api)
+    assert ('AAA3000', 'AAA1000', 2) in closure
+
+    r = client.get('/course/AAA3000/prerequisites?transitive=true').get_json()
+    assert r['courses'] == [{'id': 'AAA2000', 'depth': 1}, {'id': 'AAA1000', 'depth': 2}]
+    r = client.get('/course/AAA1000/unlocks?transitive=true').get_json()
+    assert r['courses'] == [{'id': 'AAA2000', 'depth': 1}, {'id': 'AAA3000', 'depth': 2}]
+
+    # The middle of the chain goes away, AAA3000 still names it
+    assert client.delete('/course/AAA2000').status_code == 204
+    _, closure = assert_matches_rebuild(api)
+    assert ('AAA3000', 'AAA1000', 2) not in closure
+
+def test_course_added_back_after_others_referenced_it(api, client):
+    client.put('/course/AAA1000', json=course('AAA1000'))
+    client.put('/course/AAA3000', json=course('AAA3000', requires(['AAA2000']))) # AAA2000 doesn't exist yet
+    client.put('/course/AAA4000', json=course('AAA4000', requires(['AAA3000'])))
+    assert_matches_rebuild(api)
+
+    client.put('/course/AAA2000', json=course('AAA2000', requires(['AAA1000'])))
+    _, closure = assert_matches_rebuild(api)
+    assert {('AAA3000', 'AAA1000', 2), ('AAA4000', 'AAA1000', 3)} <= closure
+
+def test_prerequisite_changes(api, client):
+    client.post('/course/_bulk', json=[course('AAA1000'), course('AAA1001'), course('AAA2000', requires(['AAA1000'])),
+        course('AAA3000', requires(['AAA2000', 'AAA1001'], ' or '))])
+    assert_matches_rebuild(api)
+
+    # A shorter path appears, then the old one is cut
+    assert client.patch('/course/AAA3000', json={'prerequisites': requires(['AAA2000', 'AAA1000'])}).status_code == 200
+    _, closure = assert_matches_rebuild(api)
+    assert ('AAA3000', 'AAA1000', 1) in closure
+    assert client.patch('/course/AAA2000', json={'prerequisites': ''}).status_code == 200
+    assert_matches_rebuild(api)
+
+    # A change to another field leaves the graph alone
+    assert client.patch('/course/AAA3000', json={'name': 'RENAMED'}).status_code == 200
+    assert_matches_rebuild(api)
+
+def test_cycle(api, client):
+    client.post('/course/_bulk', json=[course('AAA1000', requires(['AAA2000'])), course('AAA2000', requires(['AAA1000']))])
+    assert_matches_rebuild(api)
+    client.put('/course/AAA3000', json=course('AAA3000', requires(['AAA1000'])))
+    assert_matches_rebuild(api)
+    client.delete('/course/AAA2000')
+    assert_matches_rebuild(api)
+
+def test_random_writes_match_a_full_rebuild(api, client):
+    rng = random.Random(11)
+
+    def random_prerequisites():
+        return requires(rng.sample(COURSE_IDS, rng.randint(0, 3)), rng.choice([' and ', ' or ']))
+
+    for step in range(150):
+        op = rng.random()
+        id = rng.choice(COURSE_IDS)
+        if op < 0.3:
+            # Deleted and added back, courses that name it may already be in the table
+            client.delete(f'/course/{id}')
+            assert client.put(f'/course/{id}', json=course(id, random_prerequisites())).status_code == 201
+        elif op < 0.55:
+            assert client.patch(f'/course/{id}', json={'prerequisites': random_prerequisites()}).status_code in (200, 409)
+        elif op < 0.7:
+            assert client.delete(f'/course/{id}').status_code in (204, 409)
+        elif op < 0.8:
+            assert client.patch(f'/course/{id}', json={'name': 'RENAMED'}).status_code in (200, 409)
+        else:
+            rows = [course(rng.choice(COURSE_IDS), random_prerequisites()) for _ in range(rng.randint(1, 15))]
+            assert client.post('/course/_bulk', json=rows).get_json()['errors'] == []
+        if step % 25 == 24:
+            assert_matches_rebuild(api)
+    assert_matches_rebuild(api)
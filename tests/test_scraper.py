@@ -0,0 +1,123 @@
+#!usr/bin/env python3
+
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.recorded import load_department_pages
+from benchmarks.synthetic import generate_catalog, render_department_page, render_index_page
+from utils.extractors import SoupExtractor
+
+SCRAPER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uta_scraper.py')
+CATALOG_PATH = '/coursedescriptions/'
+WORKER_COUNTS = [1, 4, 16]
+MAX_DELAY = 0.02 # Seconds a department page may be held back, so concurrent scrapes finish out of order
+
+# Recorded pages that aren't at the lowercase department URL, like get_department_html() expects
+FIXTURE_URLS = {
+    'BSAD/BUSA': 'bsad'
+}
+
+""" Catalog pages served by the test server, the recorded departments listed along with synthetic ones
+Parameters: None
+Return: dict of URL path -> html, list of department dicts in index order
+"""
+def catalog_pages():
+    recorded = load_department_pages()
+    departments, courses = generate_catalog(20, 4)
+    by_department = {}
+    for c in courses:
+        by_department.setdefault(c['department_model_id'], []).append(c)
+
+    pages = {CATALOG_PATH + FIXTURE_URLS.get(id, id.lower()): html for _, id, html in recorded}
+    for d in departments:
+        pages[CATALOG_PATH + d['id'].lower()] = render_department_page(d, by_department.get(d['id'], []))
+
+    listed = [{'id': id, 'name': name} for name, id, _ in recorded] + departments
+    pages[CATALOG_PATH] = render_index_page(listed)
+    return pages, listed
+
+PAGES, LISTED = catalog_pages()
+
+class CatalogHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path if self.path == CATALOG_PATH else self.path.rstrip('/')
+        if path not in PAGES:
+            self.send_response(404)
+            self.end_headers()
+            return
+        if path != CATALOG_PATH:
+            time.sleep(random.uniform(0, MAX_DELAY))
+        body = PAGES[path].encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture(scope='module')
+def catalog_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CatalogHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}{CATALOG_PATH}"
+    server.shutdown()
+    server.server_close()
+
+""" Run uta_scraper.py against the test server in its own folder
+Parameters: directory -> pathlib.Path: working directory, the catalog files are written here
+            url -> str: catalog root
+            workers -> int
+            format -> str: 'json' or 'ndjson'
+Return: None
+"""
+def run_scraper(directory, url, workers, format):
+    directory.mkdir()
+    result = subprocess.run([sys.executable, SCRAPER, '--base-url', url, '--workers', str(workers), '--rate-limit', '0',
+        '--no-cache', '--format', format], cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, timeout=300)
+    assert result.returncode == 0, result.stdout
+
+""" Courses the scraper should write, every department's courses in index order
+Parameters: None
+Return: list of course dicts
+"""
+def expected_courses():
+    courses = []
+    extractor = SoupExtractor()
+    for d in LISTED:
+        courses.extend(extractor.extract(PAGES[CATALOG_PATH + FIXTURE_URLS.get(d['id'], d['id'].lower())], d['id']))
+    return courses
+
+def test_json_output_is_identical_for_any_worker_count(catalog_url, tmp_path):
+    outputs = []
+    for workers in WORKER_COUNTS:
+        directory = tmp_path / f"workers-{workers}"
+        run_scraper(directory, catalog_url, workers, 'json')
+        outputs.append(((directory / 'departments.json').read_bytes(), (directory / 'courses.json').read_bytes()))
+
+    assert all(output == outputs[0] for output in outputs[1:])
+    departments, courses = (json.loads(body) for body in outputs[0])
+    assert [d['id'] for d in departments['departments']] == [d['id'] for d in LISTED]
+    assert courses['courses'] == expected_courses()
+
+def test_ndjson_output_is_identical_for_any_worker_count(catalog_url, tmp_path):
+    outputs = []
+    for workers in WORKER_COUNTS:
+        directory = tmp_path / f"workers-{workers}"
+        run_scraper(directory, catalog_url, workers, 'ndjson')
+        outputs.append(((directory / 'departments.ndjson').read_bytes(), (directory / 'courses.ndjson').read_bytes()))
+
+    assert all(output == outputs[0] for output in outputs[1:])
+    departments, courses = ([json.loads(line) for line in body.splitlines()] for body in outputs[0])
+    assert [d['id'] for d in departments] == [d['id'] for d in LISTED]
+    assert courses == expected_courses()
@@ -1,12 +1,190 @@
 #!usr/bin/env python3
 
+import argparse
 import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import utils.scraper_functions as scraper_functions
+from utils.catalog_diff import DEFAULT_DELTA_FILE, diff_catalog, load_snapshot, summarize_delta
+from utils.catalog_io import read_records, write_ndjson_record
+from utils.department_urls import DEFAULT_URL_MAP_FILE
+from utils.extractors import EXTRACTORS, get_extractor
+from utils.page_cache import DEFAULT_CACHE_DIR
+from utils.scrape_checkpoint import DEFAULT_CHECKPOINT_FILE, ScrapeCheckpoint
+from utils.scrape_report import DEFAULT_REPORT_FILE, ScrapeReport
 from utils.scraper_functions import *
 
+DEFAULT_WORKERS = 8
+
+NEW_DEPARTMENTS_NDJSON = 'departments.partial.ndjson'
+NEW_COURSES_NDJSON = 'courses.partial.ndjson'
+
+""" Scrape every course on one department's catalog page
+Parameters: dept -> dict: department 'id' and 'name'
+            extractor -> utils.extractors extractor used to pull the courses out of the page
+            report -> utils.scrape_report.ScrapeReport: records the fetch/parse timings, None to skip
+Return: list of course dicts, in page order
+"""
+def scrape_department(dept, extractor, report=None):
+    print(f"Processing {dept['name']} page...")
+
+    start = time.perf_counter()
+    page = get_department_html(dept['id'])
+    fetched = time.perf_counter()
+
+    # Page hasn't changed since the last run (304), reuse what was extracted from it back then
+    reused = page.not_modified and page.records is not None
+    if reused:
+        department_courses = page.records
+    else:
+        department_courses = extractor.extract(page.text, dept['id'])
+        save_page_records(page.url, department_courses)
+
+    if report is not None:
+        report.record_department(dept, page.url, fetched - start, time.perf_counter() - fetched, page.bytes_received,
+            len(department_courses), reused, page.retries)
+
+    return department_courses
+
+""" Courses of one department from the checkpoint, or scraped and checkpointed, or None if it failed
+Parameters: dept -> dict: department 'id' and 'name'
+            extractor -> utils.extractors extractor used to pull the courses out of the page
+            report -> utils.scrape_report.ScrapeReport: records timings and failures, None to skip
+            checkpoint -> utils.scrape_checkpoint.ScrapeCheckpoint: departments finished so far, None to skip
+Return: list of course dicts or None
+"""
+def scrape_or_skip(dept, extractor, report=None, checkpoint=None):
+    if checkpoint is not None and dept['id'] in checkpoint.completed:
+        department_courses = checkpoint.completed[dept['id']]
+        if report is not None:
+            report.record_resumed(dept, len(department_courses))
+        return department_courses
+
+    try:
+        department_courses = scrape_department(dept, extractor, report)
+    except Exception as e:
+        # One department that keeps failing (or whose page can't be parsed) doesn't throw away the rest of the run
+        print(f"Skipping {dept['name']}: {e}")
+        if report is not None:
+            report.record_failure(dept, f"{type(e).__name__}: {e}")
+        return None
+
+    if checkpoint is not None:
+        checkpoint.record(dept['id'], department_courses)
+    return department_courses
+
+""" Scrape every department, handing back results in department order as soon as they're ready
+Parameters: all_departments -> list: department dicts, 'num_of_courses' is filled in on each
+            workers -> int: number of pages fetched at the same time
+            extractor -> utils.extractors extractor used to pull the courses out of each page
+            report -> utils.scrape_report.ScrapeReport: records per department timings and failures, None to skip
+            checkpoint -> utils.scrape_checkpoint.ScrapeCheckpoint: departments already finished are replayed from it
+                and new ones are saved to it, None to skip
+Return: iterator of (department dict, list of its course dicts), departments that failed are left out
+"""
+def scrape_all(all_departments, workers, extractor, report=None, checkpoint=None):
+    # Fetching all courses in each department ~~~
+    # map() yields results in department order no matter which page finishes first,
+    # so the output files are the same for any number of workers
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        results = executor.map(lambda dept: scrape_or_skip(dept, extractor, report, checkpoint), all_departments)
+
+        for dept, department_courses in zip(all_departments, results):
+            if department_courses is None:
+                continue
+
+            # Add number of courses to department JSON
+            dept.update({'num_of_courses': len(department_courses)})
+
+            print(f"Adding {dept} to department list.\n")
+
+            yield dept, department_courses
+
+""" Read the command line options
+Parameters: None
+Return: argparse.Namespace
+"""
+def parse_args():
+    parser = argparse.ArgumentParser(description='Scrape the UTA course catalog into departments.json and courses.json.')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+        help=f'Number of department pages fetched at the same time (default: {DEFAULT_WORKERS}).')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+        help=f'Max requests per second to the catalog host, 0 disables limiting (default: {DEFAULT_REQUESTS_PER_SECOND}).')
+    parser.add_argument('--base-url', default=BASE,
+        help='Catalog root to scrape, e.g. a local server replaying saved pages.')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+        help=f'Folder for cached pages used in conditional GETs (default: {DEFAULT_CACHE_DIR}).')
+    parser.add_argument('--no-cache', action='store_true',
+        help='Always download and parse every page.')
+    parser.add_argument('--offline', action='store_true',
+        help='Replay pages from the cache only, without any network requests.')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+        help=f'Times a request is sent again after a connection error, timeout or 429/5xx response (default: {DEFAULT_RETRIES}).')
+    parser.add_argument('--backoff', type=float, default=DEFAULT_BACKOFF,
+        help=f'Seconds the first retry waits at most, doubled for every retry after it (default: {DEFAULT_BACKOFF}).')
+    parser.add_argument('--resume', action='store_true',
+        help='Continue the last run that failed or was interrupted, only departments missing from its checkpoint are scraped.')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_FILE,
+        help=f'Where finished departments are saved while the run goes, removed once it completes (default: {DEFAULT_CHECKPOINT_FILE}).')
+    parser.add_argument('--parser', choices=sorted(EXTRACTORS), default='soup',
+        help='Backend that extracts courses from department pages, lxml is faster but needs the lxml package (default: soup).')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+        help='json writes departments.json/courses.json at the end, ndjson streams departments.ndjson/courses.ndjson '
+            'one record per line as each department finishes (default: json).')
+    parser.add_argument('--delta-file', default=DEFAULT_DELTA_FILE,
+        help=f'Where to write the changes since the previous scrape (default: {DEFAULT_DELTA_FILE}).')
+    parser.add_argument('--report', default=DEFAULT_REPORT_FILE,
+        help=f'Where to write the run report with per department fetch/parse times, bytes and course counts (default: {DEFAULT_REPORT_FILE}).')
+    parser.add_argument('--metrics-file',
+        help='Also write the run metrics in the Prometheus text format, e.g. for a node exporter textfile collector.')
+    return parser.parse_args()
+
+""" Write the run report (and metrics file)
+Parameters: report -> utils.scrape_report.ScrapeReport
+            args -> argparse.Namespace: command line options
+            all_departments -> list: department dicts, in catalog order
+Return: None
+"""
+def write_report(report, args, all_departments):
+    report.write(args.report, [d['id'] for d in all_departments])
+    if args.metrics_file:
+        report.write_metrics(args.metrics_file)
+    print(f"Run report written to {args.report}.")
+
+""" Stop before the catalog files are replaced if any department was skipped
+A catalog missing those departments would show up as their removal in the delta, so the previous files are kept and the
+finished departments wait in the checkpoint until a run with --resume scrapes the rest
+Parameters: report -> utils.scrape_report.ScrapeReport
+            args -> argparse.Namespace: command line options
+            all_departments -> list: department dicts, in catalog order
+            checkpoint -> utils.scrape_checkpoint.ScrapeCheckpoint
+Return: None, exits if any department failed
+"""
+def check_failures(report, args, all_departments, checkpoint):
+    if not report.failures:
+        return
+    checkpoint.close()
+    write_report(report, args, all_departments)
+    raise SystemExit(f"{len(report.failures)} departments failed ({', '.join(sorted(report.failures))}), see {args.report}. "
+        f"The rest are saved in {args.checkpoint}, run again with --resume to retry only the failed ones.")
+
 if __name__ == '__main__':
+    args = parse_args()
+
     try:
-        # URLs that use uppercase in the GET requests, regular method won't work
-        uppercase_depts = ['UNIV-AT', 'UNIV-BU', 'UNIV-EN', 'UNIV-HN', 'UNIV-SC', 'UNIV-SW']
+        # Every worker shares one keep-alive connection pool
+        scraper_functions.BASE = args.base_url
+        configure_session(pool_size=max(args.workers, 1), requests_per_second=args.rate_limit, retries=args.retries, backoff=args.backoff)
+
+        if args.offline and args.no_cache:
+            raise SystemError("--offline needs the page cache, it can't be combined with --no-cache.")
+        configure_cache(None if args.no_cache else args.cache_dir, offline=args.offline)
+        configure_url_map(None if args.no_cache else os.path.join(args.cache_dir, DEFAULT_URL_MAP_FILE))
+
+        extractor = get_extractor(args.parser)
+        report = ScrapeReport(vars(args))
 
         # Returns ResultSet containing all department 'a' containers and their own catalog links
         departments = setup_department_catalogs()
@@ -14,83 +192,54 @@ if __name__ == '__main__':
         # Returns list of dicts containing department initials and names
         all_departments = get_departments_list(departments)
 
-        all_courses = [] # Final list of dicts that will contain all offered courses
-        course_counter = 0 # Index for keeping track of which department has a number of courses
-
-        # Fetching all courses in each department ~~~
-        for dept in all_departments:
-            asl_flag = False # Explicit flag used since HTML of entire department page is different from the rest
-            num_of_courses = 0
-
-            print(f"Processing {dept['name']} page...")
-
-            department_page, uppercase_depts = get_department_page(dept['id'], uppercase_depts)
-
-            courses, asl_flag = get_departments_course_catalog(department_page, dept['id'], asl_flag)
-            
-            # Extracting all course data
-            for c in courses:
-                num_of_courses += 1
-                tccn_id = ""
-
-                # NOTE: can find by class name here as well, but description text is wrapped in a 'strong' tag.
-                # There's only 1 'strong' tag per course block, so find by 'strong' instead to cut down on a
-                # few lines of code.
-                header_block = c.find('strong')
-
-                # Originally gave '\xa0' instead of ' '
-                header = unicodedata.normalize("NFKD", str(header_block.string))
-
-                # Separating the course ID (and TCCN ID, if there is one) from the rest of the header
-                # '.'s act as delimiters
-                header_info = header.split('.', maxsplit=1)
-                department_model_id = header_info[0].split(' ')[0]
-                course_num = int(header_info[0].split(' ')[1])
-                
-                header_info = header_info[1].rsplit('.', maxsplit=2)
-                num_of_hours = int(header_info[1].strip().split(' ')[0])
-
-                name = header_info[0].strip()
-
-                if header_info[2]:
-                    tccn_id = get_course_tccn_id(header_info[2])
-                
-                # NOTE: Course descriptions are in a <p> inside of c, but ASL doesn't have the same <p> description format. For ease
-                # of processing both in the same function, just send the whole c instead of c.find('p', class_='courseblockdesc').
-                description = get_course_description(c, asl_flag)
-                prerequisites = get_course_prerequisites(description)
-
-                # Removing redundant "Prerequisite" section from description
-                if description:
-                    description = description.split("Prerequisite")[0].rstrip()
-
-                # Add course to catalog
-                all_courses.append({                                        # Example:
-                    'id': department_model_id + str(course_num),            # "CSE1325"
-                    'course_num': course_num,                               # 1325
-                    'name': name,                                           # "OBJECT-ORIENTED PROGRAMMING"
-                    'description': description,                             # "Object-oriented concepts, ...""
-                    'num_of_hours': num_of_hours,                           # 3
-                    'prerequisites': prerequisites,                         # "CSE 1320"
-                    'tccn_id': tccn_id,                                     # ''
-                    'department_model_id': department_model_id              # "CSE"
-                })
-            
-            # Add number of courses to department JSON
-            all_departments[course_counter].update({'num_of_courses': num_of_courses})
-            course_counter = course_counter + 1
-
-            print(f"Adding {dept} to department list.\n")
-
-        departments_json = {'departments': all_departments}
-        departments_json_string = json.dumps(departments_json, indent=4)
-        with open('departments.json', 'w') as outfile:
-            outfile.write(departments_json_string)
-
-        courses_json = {'courses': all_courses}
-        courses_json_string = json.dumps(courses_json, indent=4)
-        with open('courses.json', 'w') as outfile:
-            outfile.write(courses_json_string)
+        checkpoint = ScrapeCheckpoint(args.checkpoint, scraper_functions.BASE, resume=args.resume)
+        if checkpoint.completed:
+            print(f"Resuming, {len(checkpoint.completed)} departments were already scraped.")
+
+        if args.format == 'ndjson':
+            # Records are written out as each department finishes, so the full course list is never held in memory.
+            # They go to temporary files first, the previous scrape is still needed to diff against.
+            with open(NEW_DEPARTMENTS_NDJSON, 'w') as departments_out, open(NEW_COURSES_NDJSON, 'w') as courses_out:
+                for dept, department_courses in scrape_all(all_departments, args.workers, extractor, report, checkpoint):
+                    write_ndjson_record(departments_out, dept)
+                    for c in department_courses:
+                        write_ndjson_record(courses_out, c)
+            check_failures(report, args, all_departments, checkpoint)
+
+            delta = diff_catalog(load_snapshot('departments.ndjson', 'departments'), read_records(NEW_DEPARTMENTS_NDJSON, 'departments'),
+                load_snapshot('courses.ndjson', 'courses'), read_records(NEW_COURSES_NDJSON, 'courses'))
+            with open(args.delta_file, 'w') as outfile:
+                outfile.write(json.dumps(delta, indent=4))
+            print(summarize_delta(delta))
+
+            os.replace(NEW_DEPARTMENTS_NDJSON, 'departments.ndjson')
+            os.replace(NEW_COURSES_NDJSON, 'courses.ndjson')
+        else:
+            all_courses = [] # Final list of dicts that will contain all offered courses
+
+            for dept, department_courses in scrape_all(all_departments, args.workers, extractor, report, checkpoint):
+                all_courses.extend(department_courses)
+            check_failures(report, args, all_departments, checkpoint)
+
+            # Diff against the previous scrape before its files get overwritten
+            delta = diff_catalog(load_snapshot('departments.json', 'departments'), all_departments,
+                load_snapshot('courses.json', 'courses'), all_courses)
+            with open(args.delta_file, 'w') as outfile:
+                outfile.write(json.dumps(delta, indent=4))
+            print(summarize_delta(delta))
+
+            departments_json = {'departments': all_departments}
+            departments_json_string = json.dumps(departments_json, indent=4)
+            with open('departments.json', 'w') as outfile:
+                outfile.write(departments_json_string)
+
+            courses_json = {'courses': all_courses}
+            courses_json_string = json.dumps(courses_json, indent=4)
+            with open('courses.json', 'w') as outfile:
+                outfile.write(courses_json_string)
+
+        checkpoint.remove()
+        write_report(report, args, all_departments)
     except Exception as e:
         print(e)
-        raise SystemExit("Some error occurred in main().")
\ No newline at end of file
+        raise SystemExit("Some error occurred in main().")
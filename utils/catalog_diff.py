@@ -0,0 +1,79 @@
+#!usr/bin/env python3
+
+import hashlib
+import json
+
+from utils.catalog_io import read_records_if_exists
+
+DEFAULT_DELTA_FILE = 'catalog_delta.json'
+
+""" Content hash of a single department/course record
+Parameters: record -> dict: department or course as written by the scraper
+Return: hex digest string, the same for any two records with equal contents
+"""
+def record_hash(record):
+    canonical = json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+""" Load the records of a previous scrape, if there was one
+Parameters: path -> str: departments/courses .json or .ndjson file
+            key -> str: top level key holding the records ('departments' or 'courses')
+Return: iterator of record dicts, empty if the file doesn't exist yet
+"""
+def load_snapshot(path, key):
+    return read_records_if_exists(path, key)
+
+""" Compare two scrapes of the same kind of record
+Parameters: old_records -> iterable of dicts from the previous scrape
+            new_records -> iterable of dicts from the current scrape
+Return: dict with 'added', 'changed' and 'removed' lists plus an 'unchanged' count
+"""
+def diff_records(old_records, new_records):
+    # Only hashes of the old snapshot are kept around, the old records themselves aren't needed
+    old_hashes = {r['id']: record_hash(r) for r in old_records}
+
+    added = []
+    changed = []
+    unchanged = 0
+    seen = set()
+
+    for r in new_records:
+        h = record_hash(r)
+        seen.add(r['id'])
+        if r['id'] not in old_hashes:
+            added.append({'hash': h, 'record': r})
+        elif old_hashes[r['id']] != h:
+            changed.append({'hash': h, 'previous_hash': old_hashes[r['id']], 'record': r})
+        else:
+            unchanged += 1
+
+    removed = [{'id': id, 'previous_hash': h} for id, h in old_hashes.items() if id not in seen]
+
+    return {
+        'added': added,
+        'changed': changed,
+        'removed': removed,
+        'unchanged': unchanged
+    }
+
+""" Build the delta between the previous and current catalog
+Parameters: old_departments, new_departments, old_courses, new_courses -> iterables of record dicts
+Return: dict with a diff_records() result for 'departments' and for 'courses'
+"""
+def diff_catalog(old_departments, new_departments, old_courses, new_courses):
+    return {
+        'departments': diff_records(old_departments, new_departments),
+        'courses': diff_records(old_courses, new_courses)
+    }
+
+""" Short human readable summary of a delta
+Parameters: delta -> dict: result of diff_catalog()
+Return: str
+"""
+def summarize_delta(delta):
+    lines = []
+    for kind in ('departments', 'courses'):
+        d = delta[kind]
+        lines.append(f"{kind}: {len(d['added'])} added, {len(d['changed'])} changed, "
+            f"{len(d['removed'])} removed, {d['unchanged']} unchanged")
+    return '\n'.join(lines)
@@ -0,0 +1,52 @@
+#!usr/bin/env python3
+
+import json
+import os
+
+""" Iterate over the records of a scraped catalog file
+Parameters: path -> str: .json file ({key: [...]}) or .ndjson file (one record per line)
+            key -> str: top level key holding the records in a .json file ('departments' or 'courses')
+Return: iterator of record dicts, .ndjson files are read one line at a time
+"""
+def read_records(path, key):
+    if path.endswith('.ndjson'):
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, 'r') as f:
+            yield from json.load(f)[key]
+
+""" Iterate over a catalog file that may not exist yet
+Parameters: path -> str: .json or .ndjson file
+            key -> str: top level key holding the records in a .json file
+Return: iterator of record dicts, empty if the file doesn't exist
+"""
+def read_records_if_exists(path, key):
+    if os.path.exists(path):
+        yield from read_records(path, key)
+
+""" Write one record as a line of NDJSON
+Parameters: outfile -> file object opened for text writing
+            record -> dict
+Return: None
+"""
+def write_ndjson_record(outfile, record):
+    outfile.write(json.dumps(record, ensure_ascii=False))
+    outfile.write('\n')
+
+""" Group an iterator into lists of at most batch_size items
+Parameters: records -> iterable
+            batch_size -> int
+Return: iterator of lists
+"""
+def batched(records, batch_size):
+    batch = []
+    for r in records:
+        batch.append(r)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,66 @@
+#!usr/bin/env python3
+
+import zlib
+
+try:
+    import brotli
+except ImportError: # brotli is optional, gzip is offered without it
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024 # Smaller bodies are sent as they are, compressing them saves next to nothing
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5 # Brotli's higher qualities are too slow to run while a response is being sent
+
+""" Content encodings this process can produce, most preferred first
+Parameters: None
+Return: list of str
+"""
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+""" Incremental compressor for one response body
+Parameters: encoding -> str: 'gzip' or 'br'
+"""
+class Compressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 16 + MAX_WBITS writes a gzip header (with no timestamp, so the output is deterministic)
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        # Flushed after every chunk so a streamed body reaches the client as it's produced
+        if self.encoding == 'br':
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+""" Compress a whole body
+Parameters: body -> bytes
+            encoding -> str: 'gzip' or 'br'
+Return: bytes
+"""
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush(zlib.Z_FINISH)
+
+""" Compress a streamed body chunk by chunk
+Parameters: chunks -> iterable of str/bytes chunks
+            encoding -> str: 'gzip' or 'br'
+Return: generator of compressed bytes
+"""
+def compress_stream(chunks, encoding):
+    compressor = Compressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.finish()
@@ -0,0 +1,86 @@
+#!usr/bin/env python3
+
+import os
+import sqlite3
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_DATABASE_URI = 'sqlite:///database.db'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 20
+DEFAULT_POOL_TIMEOUT = 30 # Seconds to wait for a free pooled connection
+DEFAULT_POOL_RECYCLE = 1800 # Seconds before a pooled connection is replaced, avoids server side idle timeouts
+DEFAULT_READ_AFTER_WRITE = 5.0 # Seconds GET handlers keep reading the primary after a write, should outlast the replica's lag
+DEFAULT_BUSY_TIMEOUT = 5000 # Milliseconds SQLite waits on a locked database before giving up
+
+""" Database settings, read from environment variables so deployments don't need code changes
+Parameters: environ -> dict: defaults to os.environ
+Return: dict of settings
+"""
+def database_config(environ=os.environ):
+    return {
+        'uri': environ.get('CATALOG_DATABASE_URI', DEFAULT_DATABASE_URI),
+        # Optional replica (or read-only connection) used by GET handlers
+        'read_uri': environ.get('CATALOG_READ_DATABASE_URI') or None,
+        'read_after_write': float(environ.get('CATALOG_READ_AFTER_WRITE_SECONDS', DEFAULT_READ_AFTER_WRITE)),
+        'pool_size': int(environ.get('CATALOG_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        'max_overflow': int(environ.get('CATALOG_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW)),
+        'pool_timeout': int(environ.get('CATALOG_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT)),
+        'pool_recycle': int(environ.get('CATALOG_POOL_RECYCLE', DEFAULT_POOL_RECYCLE)),
+        'busy_timeout': int(environ.get('CATALOG_SQLITE_BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT)),
+        'sqlite_wal': environ.get('CATALOG_SQLITE_WAL', '1') != '0',
+        # Create missing tables and indexes when the API starts, turn off to manage the schema with 'flask init-db'
+        'auto_create': environ.get('CATALOG_AUTO_CREATE', '1') != '0',
+        # Read-only mode - serve single records and department course lists from this snapshot file (see utils/snapshot.py)
+        'snapshot': environ.get('CATALOG_SNAPSHOT') or None
+    }
+
+""" Keyword arguments for create_engine() (or SQLALCHEMY_ENGINE_OPTIONS) suited to the database behind a URI
+Parameters: uri -> str: SQLAlchemy database URI
+            config -> dict: result of database_config()
+Return: dict
+"""
+def engine_options(uri, config):
+    if uri.startswith('sqlite'):
+        options = {'connect_args': {'timeout': config['busy_timeout'] / 1000, 'check_same_thread': False}}
+        if ':memory:' not in uri and uri not in ('sqlite://', 'sqlite:///'):
+            # File databases get a NullPool by default, which reopens the file and reruns the PRAGMAs on every checkout
+            options.update({'poolclass': QueuePool, 'pool_size': config['pool_size'], 'max_overflow': config['max_overflow'],
+                'pool_timeout': config['pool_timeout']})
+        return options
+    return {
+        'pool_size': config['pool_size'],
+        'max_overflow': config['max_overflow'],
+        'pool_timeout': config['pool_timeout'],
+        'pool_recycle': config['pool_recycle'],
+        'pool_pre_ping': True # Drop connections the server closed instead of failing the request that gets one
+    }
+
+""" Engine for the read-only connection, if one is configured
+Parameters: config -> dict: result of database_config()
+Return: sqlalchemy Engine or None
+"""
+def create_read_engine(config):
+    if not config['read_uri']:
+        return None
+    return create_engine(config['read_uri'], **engine_options(config['read_uri'], config))
+
+""" Turn on the SQLite settings that let readers work while a writer is busy, for every new SQLite connection
+Parameters: config -> dict: result of database_config()
+            target -> sqlalchemy Engine (or the Engine class for every engine) to configure
+Return: None
+"""
+def configure_sqlite(config, target=Engine):
+    @event.listens_for(target, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        if config['sqlite_wal']:
+            # WAL - readers never block behind the writer, NORMAL sync is safe in WAL mode and skips an fsync per commit
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={config['busy_timeout']}")
+        cursor.close()
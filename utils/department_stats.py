@@ -0,0 +1,85 @@
+#!usr/bin/env python3
+
+import collections
+
+""" Level of a course from its number, e.g. 3318 -> 3000
+Parameters: course_num -> int
+Return: int
+"""
+def course_level(course_num):
+    return course_num // 1000 * 1000
+
+""" Changes to the department aggregates caused by a set of course writes, collected before they're applied in SQL
+Parameters: None
+"""
+class StatsDelta:
+    def __init__(self):
+        self.departments = {} # department ID -> change dict
+
+    def change(self, department_id):
+        if department_id not in self.departments:
+            self.departments[department_id] = {
+                'course_count': 0,
+                'total_hours': 0,
+                'with_prerequisites': 0,
+                'levels': collections.Counter(),
+                'added_hours': [], # Min/max can be widened in place
+                'removed': False # Min/max may have to be looked up again
+            }
+        return self.departments[department_id]
+
+    def add(self, course, sign=1):
+        # course -> dict with department_model_id, course_num, num_of_hours and prerequisites
+        change = self.change(course['department_model_id'])
+        change['course_count'] += sign
+        change['total_hours'] += sign * course['num_of_hours']
+        change['with_prerequisites'] += sign * (1 if course['prerequisites'] else 0)
+        change['levels'][course_level(course['course_num'])] += sign
+        if sign > 0:
+            change['added_hours'].append(course['num_of_hours'])
+        else:
+            change['removed'] = True
+
+    def remove(self, course):
+        self.add(course, -1)
+
+    def items(self):
+        return self.departments.items()
+
+""" Aggregates of a list of courses, how the rebuild (and the snapshot) computes what the incremental updates maintain
+Parameters: courses -> iterable of course dicts
+Return: stats dict, dict of level -> number of courses
+"""
+def summarize_courses(courses):
+    stats = {'course_count': 0, 'total_hours': 0, 'min_hours': None, 'max_hours': None, 'with_prerequisites': 0}
+    levels = collections.Counter()
+    for c in courses:
+        hours = c['num_of_hours']
+        stats['course_count'] += 1
+        stats['total_hours'] += hours
+        stats['min_hours'] = hours if stats['min_hours'] is None else min(stats['min_hours'], hours)
+        stats['max_hours'] = hours if stats['max_hours'] is None else max(stats['max_hours'], hours)
+        stats['with_prerequisites'] += 1 if c['prerequisites'] else 0
+        levels[course_level(c['course_num'])] += 1
+    return stats, dict(levels)
+
+""" Aggregates of one department as served by /department/<id>/stats
+Parameters: department_id -> str
+            stats -> dict with course_count, total_hours, min_hours, max_hours and with_prerequisites, None if the department has no courses
+            levels -> dict of level -> number of courses
+Return: dict
+"""
+def stats_json(department_id, stats, levels):
+    count = stats['course_count'] if stats is not None else 0
+    total = stats['total_hours'] if stats is not None else 0
+    return {
+        'id': department_id,
+        'course_count': count,
+        'total_hours': total,
+        'average_hours': round(total / count, 2) if count else None,
+        'min_hours': stats['min_hours'] if count else None,
+        'max_hours': stats['max_hours'] if count else None,
+        'with_prerequisites': stats['with_prerequisites'] if stats is not None else 0,
+        # Levels are kept as rows even when their last course goes away
+        'levels': {str(level): n for level, n in sorted(levels.items()) if n}
+    }
@@ -0,0 +1,64 @@
+#!usr/bin/env python3
+
+import json
+import os
+import re
+import tempfile
+import threading
+
+DEFAULT_URL_MAP_FILE = 'department_urls.json' # Kept in the page cache folder
+
+# Departments whose catalog page isn't at the lowercase department ID, tried first so they don't cost a 404
+KNOWN_PATHS = {
+    'UNIV-AT': 'UNIV-AT',
+    'UNIV-BU': 'UNIV-BU',
+    'UNIV-EN': 'UNIV-EN',
+    'UNIV-HN': 'UNIV-HN',
+    'UNIV-SC': 'UNIV-SC',
+    'UNIV-SW': 'UNIV-SW',
+    'BSAD/BUSA': 'bsad', # URL only uses "bsad", not "bsad/busa"
+    'NURS-HI': 'nurshi' # URL uses "nurshi", not "nurs-hi"
+}
+
+""" URL paths a department's catalog page may be at, most likely first
+Parameters: id -> str: uppercase department ID
+Return: list of str
+"""
+def candidate_paths(id):
+    paths = [id.lower(), id, re.sub(r'[^0-9a-z]', '', id.lower()), id.split('/')[0].lower()]
+    return list(dict.fromkeys(paths))
+
+""" Where each department's catalog page was found, so later runs request it there first
+Parameters: path -> str: JSON file the map is kept in, None to keep it in memory only
+"""
+class DepartmentURLMap:
+    def __init__(self, path=None):
+        self.path = path
+        self.paths = dict(KNOWN_PATHS) # department ID -> URL path, only where it isn't the lowercase ID
+        self.lock = threading.Lock()
+        if path is not None:
+            try:
+                with open(path, 'r') as f:
+                    self.paths.update(json.load(f))
+            except (OSError, ValueError):
+                pass # No map yet (or a broken one), the known paths and the fallbacks still apply
+
+    def candidates(self, id):
+        with self.lock:
+            known = self.paths.get(id)
+        return ([known] if known else []) + [p for p in candidate_paths(id) if p != known]
+
+    def resolved(self, id, path):
+        with self.lock:
+            if self.paths.get(id, id.lower()) == path:
+                return
+            self.paths[id] = path
+            if self.path is not None:
+                self.save()
+
+    def save(self):
+        # Write to a temp file first so a crash never leaves a truncated map behind
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.paths, f, indent=4, sort_keys=True)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,151 @@
+#!usr/bin/env python3
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from utils.scraper_functions import extract_course_records, make_course_record
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError: # lxml is optional, only needed for the 'lxml' backend
+    etree = None
+    lxml_html = None
+
+""" Whether an opening tag could hold courses, everything else on a department page is never built into the tree
+Parameters: name -> str: tag name
+            attrs -> dict: tag attributes as found in the markup
+Return: bool
+"""
+def is_course_container(name, attrs):
+    if name != 'div':
+        return False
+    classes = attrs.get('class') or ''
+    classes = classes.split() if isinstance(classes, str) else classes
+    # 'courses' wraps most pages, BSAD/BUSA has bare 'courseblock's, ASL only has 'textcontainer'
+    return 'courses' in classes or 'courseblock' in classes or attrs.get('id') == 'textcontainer'
+
+DEPARTMENT_PAGE_STRAINER = SoupStrainer(is_course_container)
+
+""" BeautifulSoup backend - the original extraction code, on a tree that only holds the course containers
+Parameters: None
+"""
+class SoupExtractor:
+    name = 'soup'
+
+    def extract(self, html, id):
+        department_page = BeautifulSoup(html, 'html.parser', parse_only=DEPARTMENT_PAGE_STRAINER)
+        return extract_course_records(department_page, id)
+
+""" XPath that matches elements having a class, the same way bs4's class_= does
+Parameters: cls -> str: class name
+Return: str
+"""
+def has_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+""" lxml backend - precompiled XPath over lxml's C parser, producing the same records as SoupExtractor
+Parameters: None
+"""
+class LxmlExtractor:
+    name = 'lxml'
+
+    def __init__(self):
+        if etree is None:
+            raise SystemError("The lxml parser backend needs the lxml package, install it with 'pip install lxml'.")
+        self.courses_container = etree.XPath(f"(//div[{has_class('courses')}])[1]")
+        self.courseblocks = etree.XPath(f".//div[{has_class('courseblock')}]")
+        self.asl_paragraphs = etree.XPath("(//div[@id='textcontainer'])[1]//p")
+        self.header = etree.XPath('(.//strong)[1]')
+        self.description = etree.XPath(f"(.//p[{has_class('courseblockdesc')}])[1]")
+        self.first_br = etree.XPath('(.//br)[1]')
+
+    def extract(self, html, id):
+        root = lxml_html.document_fromstring(html)
+
+        asl_flag = False
+        if id == "BSAD/BUSA":
+            # Courses are directly on the page, not inside a 'courses' container
+            courses = self.courseblocks(root)
+        else:
+            container = self.courses_container(root)
+            if container:
+                courses = self.courseblocks(container[0])
+            else:
+                # ASL department has entirely different HTML formatting
+                courses = self.asl_paragraphs(root)
+                asl_flag = True
+
+        records = []
+        for c in courses:
+            header = self.header(c)
+            header_text = str(node_string(header[0])) if header else 'None'
+            records.append(make_course_record(header_text, self.course_description(c, asl_flag)))
+        return records
+
+    def course_description(self, course, asl_flag):
+        # Same rules as get_course_description(), over lxml's text/tail model
+        description = ""
+        if asl_flag is True:
+            br = self.first_br(course)
+            for sibling in following_nodes(br[0]):
+                description += str(node_string(sibling)).strip('\n')
+        else:
+            block = self.description(course)
+            for child in child_nodes(block[0]):
+                if isinstance(child, str):
+                    if not child.isspace():
+                        description += child.strip('\n')
+                elif child.tag != 'br':
+                    description += str(node_string(child)).strip('\n')
+        return description
+
+""" Children of an lxml element in document order, text runs as str like bs4's NavigableStrings
+Parameters: element -> lxml element
+Return: list of str and elements
+"""
+def child_nodes(element):
+    nodes = [element.text] if element.text else []
+    for child in element:
+        nodes.append(child)
+        if child.tail:
+            nodes.append(child.tail)
+    return nodes
+
+""" Siblings after an lxml element in document order, like bs4's next_siblings
+Parameters: element -> lxml element
+Return: list of str and elements
+"""
+def following_nodes(element):
+    nodes = [element.tail] if element.tail else []
+    for sibling in element.itersiblings():
+        nodes.append(sibling)
+        if sibling.tail:
+            nodes.append(sibling.tail)
+    return nodes
+
+""" Equivalent of bs4's Tag.string - the only string inside a node, or None if there isn't exactly one
+Parameters: node -> str or lxml element
+Return: str or None
+"""
+def node_string(node):
+    if isinstance(node, str):
+        return node
+    if not isinstance(node.tag, str):
+        # Comments count as strings in bs4
+        return node.text
+    children = child_nodes(node)
+    if len(children) != 1:
+        return None
+    return node_string(children[0])
+
+EXTRACTORS = {
+    'soup': SoupExtractor,
+    'lxml': LxmlExtractor
+}
+
+""" Create the extraction backend with the given name
+Parameters: name -> str: a key of EXTRACTORS
+Return: extractor with an extract(html, department_id) method
+"""
+def get_extractor(name):
+    return EXTRACTORS[name]()
@@ -0,0 +1,228 @@
+#!usr/bin/env python3
+
+import bisect
+import collections
+import os
+import re
+import sys
+import threading
+import time
+
+# Seconds - from well under a cached response up to a slow full catalog stream
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100, 250)
+
+DEFAULT_PROFILE_DIR = 'profiles'
+DEFAULT_PROFILE_INTERVAL_MS = 5
+
+""" Settings of the slow request profiler, read from environment variables like the database settings
+Parameters: environ -> dict: defaults to os.environ
+Return: dict of settings, 'slow_ms' is None when profiling is off
+"""
+def profiler_config(environ=os.environ):
+    slow_ms = environ.get('CATALOG_PROFILE_SLOW_MS')
+    return {
+        # Requests slower than this are written out as folded stacks, unset turns the profiler off
+        'slow_ms': float(slow_ms) if slow_ms else None,
+        'directory': environ.get('CATALOG_PROFILE_DIR', DEFAULT_PROFILE_DIR),
+        'interval_ms': float(environ.get('CATALOG_PROFILE_INTERVAL_MS', DEFAULT_PROFILE_INTERVAL_MS))
+    }
+
+""" Number in the Prometheus text format
+Parameters: value -> int or float
+Return: str
+"""
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+""" Label set in the Prometheus text format
+Parameters: labels -> tuple of (name, value) pairs
+Return: str, empty if there are no labels
+"""
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"' for name, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+""" Monotonic count, one value per label set
+Parameters: name -> str: metric name
+            help -> str: description shown in /metrics
+"""
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {} # sorted label pairs -> value
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, labels, value) for labels, value in sorted(self.values.items())]
+
+""" Distribution of observed values in fixed buckets, one set of buckets per label set
+Parameters: name -> str: metric name
+            help -> str: description shown in /metrics
+            buckets -> tuple: upper bounds, ascending
+"""
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series = {} # sorted label pairs -> [per bucket counts (last one is +Inf), sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        # Counts are kept per bucket and only made cumulative when rendered, so an observation is one increment
+        position = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    samples.append((self.name + '_bucket', labels + (('le', format_value(bound)),), cumulative))
+                samples.append((self.name + '_sum', labels, total))
+                samples.append((self.name + '_count', labels, count))
+        return samples
+
+""" Metric whose values are read from somewhere else (e.g. cache counters) when /metrics is rendered
+Parameters: name -> str: metric name
+            help -> str: description shown in /metrics
+            type -> str: 'counter' or 'gauge'
+            function -> function returning a list of (labels dict, value)
+"""
+class CallbackMetric:
+    def __init__(self, name, help, type, function):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.function = function
+
+    def samples(self):
+        return [(self.name, tuple(sorted(labels.items())), value) for labels, value in self.function()]
+
+""" Set of metrics rendered together in the Prometheus text format
+Parameters: None
+"""
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help):
+        return self.register(Counter(name, help))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, buckets))
+
+    def callback(self, name, help, type, function):
+        return self.register(CallbackMetric(name, help, type, function))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+""" One frame stack in the folded format flamegraph tools read, outermost call first
+Parameters: frame -> frame object: innermost frame of the stack
+Return: str, e.g. "api.py:get;api.py:cached_resource;json/encoder.py:encode"
+"""
+def fold_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        # Keep the last two path parts, enough to tell api.py from flask/app.py
+        filename = '/'.join(filename.replace('\\', '/').split('/')[-2:])
+        names.append(f'{filename}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+""" Samples the stacks of threads that are serving a request, from one background thread
+Parameters: interval -> float: seconds between samples
+"""
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.active = {} # thread ident -> collections.Counter of folded stacks
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            self.active[threading.get_ident()] = collections.Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def stop(self):
+        with self.lock:
+            return self.active.pop(threading.get_ident(), collections.Counter())
+
+    def run(self):
+        own = threading.get_ident()
+        while True:
+            with self.lock:
+                idle = not self.active
+                if idle:
+                    self.wakeup.clear()
+            if idle:
+                # Nothing is being profiled, sleep until a request starts instead of polling
+                self.wakeup.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for ident, stacks in self.active.items():
+                    frame = frames.get(ident)
+                    if frame is not None and ident != own:
+                        stacks[fold_stack(frame)] += 1
+
+""" Write sampled stacks in the folded format ("stack count" per line), e.g. for flamegraph.pl or speedscope
+Parameters: directory -> str: folder for profiles, created if needed
+            name -> str: describes the request, made safe for a file name
+            stacks -> collections.Counter of folded stacks
+Return: str: path of the written file
+"""
+def write_folded(directory, name, stacks):
+    os.makedirs(directory, exist_ok=True)
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_')
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}.folded")
+    with open(path, 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    return path
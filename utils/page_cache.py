@@ -0,0 +1,74 @@
+#!usr/bin/env python3
+
+import hashlib
+import json
+import os
+import tempfile
+
+DEFAULT_CACHE_DIR = '.catalog_cache'
+
+""" A catalog page as returned by the cache-aware fetch
+Parameters: url -> str: URL the page was requested from
+            text -> str: page body (replayed from disk on a 304 or in offline mode)
+            not_modified -> bool: True if the server (or offline replay) confirmed the cached copy is current
+            records -> list or None: course records previously extracted from this exact body
+            bytes_received -> int: response body bytes read from the network, 0 when the body came from the cache
+            retries -> int: times the request was sent again before it got this response
+"""
+class CachedPage:
+    def __init__(self, url, text, not_modified=False, records=None, bytes_received=0, retries=0):
+        self.url = url
+        self.text = text
+        self.not_modified = not_modified
+        self.records = records
+        self.bytes_received = bytes_received
+        self.retries = retries
+
+""" On-disk response cache keyed by URL, used for conditional GETs
+Parameters: directory -> str: folder holding one JSON file per cached URL
+            offline -> bool: never touch the network, only replay what is on disk
+"""
+class PageCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, offline=False):
+        self.directory = directory
+        self.offline = offline
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, url):
+        try:
+            with open(self._path(url), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # Missing or half-written entries are treated as a cache miss
+            return None
+
+    def save(self, url, body, etag=None, last_modified=None, records=None):
+        entry = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': body,
+            'records': records
+        }
+        # Write to a temp file first so a crash never leaves a truncated entry behind
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, self._path(url))
+
+    def save_records(self, url, records):
+        entry = self.load(url)
+        if entry is not None:
+            self.save(url, entry['body'], entry['etag'], entry['last_modified'], records)
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
@@ -0,0 +1,70 @@
+#!usr/bin/env python3
+
+import json
+
+try:
+    import orjson
+except ImportError: # orjson is optional, it only makes serializing faster
+    orjson = None
+
+# Body formats of the list endpoints, picked with ?format= (or Accept, for NDJSON)
+LIST_FORMATS = ('json', 'ndjson', 'columnar')
+MIMETYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'columnar': 'application/json'
+}
+
+""" Serialize a JSON value without whitespace, the same bytes whether orjson is installed or not
+Parameters: value -> dict/list/str/int/float/None
+Return: bytes
+"""
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+""" Body of a list response, built a batch of rows at a time so it can be streamed
+'json' is an array of objects, 'ndjson' one object per line, and 'columnar' sends the field names once:
+{"fields":["id","name"],"rows":[["CSE","Computer Science"],...]}
+Parameters: format -> str: one of LIST_FORMATS
+            fields -> list of str: column names, the columnar header when there are no rows to take it from
+"""
+class ListEncoder:
+    def __init__(self, format, fields=()):
+        self.format = format
+        self.fields = list(fields)
+        self.started = False # Whether a row (and the columnar header) was written
+
+    def start(self):
+        return b'[' if self.format == 'json' else b''
+
+    def header(self, fields):
+        return b'{"fields":' + dumps(fields) + b',"rows":['
+
+    def batch(self, rows):
+        # rows -> list of dicts, all with the same keys in the same order
+        if not rows:
+            return b''
+        if self.format == 'ndjson':
+            self.started = True
+            return b'\n'.join(dumps(r) for r in rows) + b'\n'
+        if self.format == 'columnar':
+            chunk = b',' if self.started else self.header(list(rows[0]))
+            items = [dumps(list(r.values())) for r in rows]
+        else:
+            chunk = b',' if self.started else b''
+            items = [dumps(r) for r in rows]
+        self.started = True
+        return chunk + b','.join(items)
+
+    def end(self):
+        if self.format == 'json':
+            return b']'
+        if self.format == 'columnar':
+            return (b'' if self.started else self.header(self.fields)) + b']}'
+        return b''
+
+    def encode(self, rows):
+        # Whole body at once, for pages that aren't streamed
+        return self.start() + self.batch(rows) + self.end()
@@ -0,0 +1,231 @@
+#!usr/bin/env python3
+
+import re
+import unicodedata
+
+# Course references ("CSE 1320"), bare course numbers that reuse the last department ("CSE 1310 or 1311"),
+# and/or, parentheses, list commas and sentence breaks. Everything else ("C or better in", "Admission to") is skipped.
+TOKEN_PATTERN = re.compile(
+    r'(?P<ref>\b[A-Z]{2,5}(?:-[A-Z]{2})?\s+\d{4}\b)'
+    r'|(?P<num>\b\d{4}\b)'
+    r'|(?P<op>\b(?i:and|or)\b)'
+    r'|(?P<open>\()'
+    r'|(?P<close>\))'
+    r'|(?P<comma>,)'
+    r'|(?P<stop>;|\.(?=\s|$))'
+)
+
+""" Split prerequisite text into course references and connectives
+Parameters: text -> str: prerequisites as scraped
+Return: list of (kind, value) tuples, kind is 'ref', 'and', 'or', '(' or ')'
+"""
+def tokenize(text):
+    raw = []
+    department = None
+    for match in TOKEN_PATTERN.finditer(unicodedata.normalize('NFKD', text or '')):
+        kind = match.lastgroup
+        value = match.group()
+        if kind == 'ref':
+            department, num = value.split()
+            raw.append(('ref', department + num))
+        elif kind == 'num':
+            # Only a continuation of a list of courses ("CSE 1310 or 1311"), not e.g. a year
+            if department is not None and raw and raw[-1][0] in ('and', 'or', ','):
+                raw.append(('ref', department + value))
+        elif kind == 'op':
+            raw.append((value.lower(), None))
+        elif kind == 'open':
+            raw.append(('(', None))
+        elif kind == 'close':
+            raw.append((')', None))
+        elif kind == 'comma':
+            raw.append((',', None))
+        else:
+            # Separate sentences are separate requirements
+            raw.append(('and', None))
+
+    # A comma takes the connective that ends its list ("A, B, or C"), 'and' if there isn't one
+    tokens = []
+    for i, (kind, value) in enumerate(raw):
+        if kind == ',':
+            kind = next((k for k, _ in raw[i + 1:] if k in ('and', 'or', '(', ')')), 'and')
+            kind = kind if kind in ('and', 'or') else 'and'
+        tokens.append((kind, value))
+
+    # Connectives only count between two operands, runs like "C or better and" keep their last one
+    cleaned = []
+    for kind, value in tokens:
+        if kind in ('and', 'or'):
+            if not cleaned or cleaned[-1][0] == '(':
+                continue
+            if cleaned[-1][0] in ('and', 'or'):
+                cleaned[-1] = (kind, value)
+                continue
+        elif kind in ('ref', '(') and cleaned and cleaned[-1][0] in ('ref', ')'):
+            # Two operands in a row with nothing between them are both required
+            cleaned.append(('and', None))
+        elif kind == ')' and cleaned and cleaned[-1][0] in ('and', 'or'):
+            cleaned.pop()
+        cleaned.append((kind, value))
+    while cleaned and cleaned[-1][0] in ('and', 'or'):
+        cleaned.pop()
+    return cleaned
+
+""" Recursive descent over tokenize() output - 'or' binds tighter than 'and', so "A and B or C" is A and (B or C)
+Parameters: tokens -> list: output of tokenize()
+"""
+class PrerequisiteParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def parse(self):
+        tree = self.parse_group('and', self.parse_or)
+        if self.position != len(self.tokens):
+            raise ValueError('Unbalanced parentheses.')
+        return tree
+
+    def parse_or(self):
+        return self.parse_group('or', self.parse_atom)
+
+    def parse_group(self, op, parse_operand):
+        args = [parse_operand()]
+        while self.peek() == op:
+            self.position += 1
+            args.append(parse_operand())
+        args = [a for a in args if a is not None]
+        if len(args) <= 1:
+            return args[0] if args else None
+        # Flatten nested groups of the same kind, "(A or B) or C" is just A or B or C
+        flat = []
+        for a in args:
+            flat.extend(a['args'] if isinstance(a, dict) and a['op'] == op else [a])
+        return {'op': op, 'args': flat}
+
+    def parse_atom(self):
+        kind = self.peek()
+        if kind == 'ref':
+            self.position += 1
+            return self.tokens[self.position - 1][1]
+        if kind == '(':
+            self.position += 1
+            tree = self.parse_group('and', self.parse_or)
+            if self.peek() != ')':
+                raise ValueError('Unbalanced parentheses.')
+            self.position += 1
+            return tree
+        raise ValueError(f'Unexpected {kind!r} in prerequisites.')
+
+""" Parse prerequisite text into a tree of course references
+Parameters: text -> str: prerequisites as scraped, e.g. "CSE 1325 and (CSE 2315 or MATH 2330)"
+Return: course ID string, {'op': 'and'/'or', 'args': [...]} dict, or None if no courses are referenced
+"""
+def parse_prerequisites(text):
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    try:
+        return PrerequisiteParser(tokens).parse()
+    except ValueError:
+        # Text too irregular to structure, fall back to requiring every course it mentions
+        refs = list(dict.fromkeys(value for kind, value in tokens if kind == 'ref'))
+        return refs[0] if len(refs) == 1 else {'op': 'and', 'args': refs}
+
+""" Every course referenced anywhere in a prerequisite tree
+Parameters: tree -> result of parse_prerequisites()
+Return: list of course IDs in the order they appear, without duplicates
+"""
+def referenced_courses(tree):
+    if tree is None:
+        return []
+    if isinstance(tree, str):
+        return [tree]
+    refs = []
+    for arg in tree['args']:
+        refs.extend(r for r in referenced_courses(arg) if r not in refs)
+    return refs
+
+""" Transitive closure of a prerequisite graph, with cycle and dangling reference detection
+Parameters: edges -> dict: course ID -> list of direct prerequisite course IDs
+Return: dict of course ID -> {ancestor ID: shortest distance}, list of cycles (lists of course IDs),
+        sorted list of (course ID, missing prerequisite ID) tuples
+"""
+def build_closure(edges):
+    dangling = sorted((course, p) for course, prereqs in edges.items() for p in prereqs if p not in edges)
+
+    # Breadth first from every course gives the shortest distance to each ancestor
+    closure = {}
+    for course in edges:
+        distances = {}
+        frontier = [course]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                for p in edges.get(node, ()):
+                    if p not in distances:
+                        distances[p] = depth
+                        next_frontier.append(p)
+            frontier = next_frontier
+        closure[course] = distances
+
+    return closure, find_cycles(edges), dangling
+
+""" Strongly connected components with more than one course (or a course requiring itself), Tarjan's algorithm
+Parameters: edges -> dict: course ID -> list of direct prerequisite course IDs
+Return: list of cycles, each a sorted list of course IDs
+"""
+def find_cycles(edges):
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+
+    for root in edges:
+        if root in index:
+            continue
+        # Iterative so long prerequisite chains can't hit the recursion limit
+        work = [(root, iter(edges.get(root, ())))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in edges:
+                    continue
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(edges.get(child, ()))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in edges.get(node, ()):
+                    cycles.append(sorted(component))
+    return cycles
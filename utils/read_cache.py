@@ -0,0 +1,80 @@
+#!usr/bin/env python3
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+""" Thread-safe least recently used cache
+Parameters: max_size -> int: entries kept before the least recently used one is dropped
+            max_bytes -> int: total size of the entries (as given to put()) kept, None for no limit
+"""
+class LRUCache:
+    def __init__(self, max_size, max_bytes=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {} # key -> size given to put()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size=0):
+        with self.lock:
+            self.discard(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return # Would push out everything else and still not fit
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.total_bytes += size
+            while len(self.entries) > self.max_size or (self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                self.discard(next(iter(self.entries)))
+
+    def discard(self, key):
+        # Callers hold the lock
+        if key in self.entries:
+            del self.entries[key]
+            self.total_bytes -= self.sizes.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+""" Counter bumped on every catalog write, cached responses are only valid for the version they were built at
+Parameters: None
+"""
+class CatalogVersion:
+    def __init__(self):
+        # Versions restart at 0 in every process, the boot ID keeps ETags from a previous run from matching
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.value = 0
+        self.changed_at = None # time.monotonic() of the last bump
+        self.lock = threading.Lock()
+
+    def bump(self):
+        with self.lock:
+            self.value += 1
+            self.changed_at = time.monotonic()
+            return self.value
+
+    def changed_within(self, seconds):
+        changed_at = self.changed_at
+        return changed_at is not None and time.monotonic() - changed_at < seconds
+
+    def etag(self, key, version=None):
+        version = self.value if version is None else version
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return f'{self.boot_id}-{version}-{digest}'
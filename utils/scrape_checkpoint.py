@@ -0,0 +1,67 @@
+#!usr/bin/env python3
+
+import json
+import os
+import tempfile
+import threading
+
+from utils.catalog_io import write_ndjson_record
+
+DEFAULT_CHECKPOINT_FILE = 'scrape_checkpoint.ndjson'
+
+""" Departments a scraper run has finished, saved as each one completes so an interrupted or failed run can be resumed
+The file is NDJSON: a header line with the catalog root, then one {"department": ..., "courses": [...]} line per department
+Parameters: path -> str: checkpoint file
+            base -> str: catalog root being scraped, a checkpoint of another catalog isn't resumed
+            resume -> bool: keep the departments already in the file, otherwise start over
+"""
+class ScrapeCheckpoint:
+    def __init__(self, path, base, resume=False):
+        self.path = path
+        self.base = base
+        self.lock = threading.Lock()
+        self.completed = self.load() if resume else {} # department ID -> list of course dicts
+
+        # Rewritten with only the complete lines, so appending never continues a line cut off by a crash
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            write_ndjson_record(f, {'base': base})
+            for id, courses in self.completed.items():
+                write_ndjson_record(f, {'department': id, 'courses': courses})
+        os.replace(temp_path, path)
+        self.outfile = open(path, 'a')
+
+    def load(self):
+        completed = {}
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return completed
+
+        for i, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break # The line being written when the run stopped
+            if i == 0:
+                if record.get('base') != self.base:
+                    raise SystemError(f"{self.path} is a scrape of {record.get('base')}, not {self.base}. Run without --resume to start over.")
+            else:
+                completed[record['department']] = record['courses']
+        return completed
+
+    def record(self, id, courses):
+        with self.lock:
+            write_ndjson_record(self.outfile, {'department': id, 'courses': courses})
+            self.outfile.flush()
+            os.fsync(self.outfile.fileno())
+
+    def close(self):
+        with self.lock:
+            self.outfile.close()
+
+    def remove(self):
+        # The run finished, there's nothing left to resume
+        self.close()
+        os.remove(self.path)
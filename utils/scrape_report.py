@@ -0,0 +1,100 @@
+#!usr/bin/env python3
+
+import json
+import threading
+import time
+
+from utils.metrics import MetricsRegistry
+
+DEFAULT_REPORT_FILE = 'scrape_report.json'
+
+""" Timing, transfer and course counts of one scraper run, per department
+Parameters: options -> dict: command line options the run was started with
+"""
+class ScrapeReport:
+    def __init__(self, options):
+        self.options = options
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        self.start = time.perf_counter()
+        self.departments = {} # department ID -> stats dict
+        self.failures = {} # department ID -> failure dict, departments that were skipped
+        self.lock = threading.Lock()
+
+        # Same numbers in the Prometheus text format, for a textfile collector
+        self.metrics = MetricsRegistry()
+        self.fetch_time = self.metrics.histogram('catalog_scrape_fetch_seconds', 'Time to fetch one department page, rate limit waits and fallback URLs included.')
+        self.parse_time = self.metrics.histogram('catalog_scrape_parse_seconds', 'Time to extract the courses from one department page.')
+        self.bytes_received = self.metrics.counter('catalog_scrape_bytes_received_total', 'Response bytes received for department pages.')
+        self.courses = self.metrics.counter('catalog_scrape_courses_total', 'Courses extracted.')
+        self.pages = self.metrics.counter('catalog_scrape_pages_total', "Department pages by result, 'parsed', 'not_modified', 'resumed' or 'failed'.")
+        self.retries = self.metrics.counter('catalog_scrape_retries_total', 'Requests sent again after a connection error, timeout or 429/5xx response.')
+
+    def record_department(self, dept, url, fetch_seconds, parse_seconds, bytes_received, courses, not_modified, retries=0):
+        result = 'not_modified' if not_modified else 'parsed'
+        self.add_department(dept, url, result, fetch_seconds, parse_seconds, bytes_received, courses, retries)
+        self.fetch_time.observe(fetch_seconds)
+        self.parse_time.observe(parse_seconds)
+
+    def record_resumed(self, dept, courses):
+        # Courses came from the checkpoint of an earlier run, nothing was fetched
+        self.add_department(dept, None, 'resumed', 0.0, 0.0, 0, courses, 0)
+
+    def record_failure(self, dept, error):
+        with self.lock:
+            self.failures[dept['id']] = {'id': dept['id'], 'name': dept['name'], 'error': error}
+        self.pages.inc(result='failed')
+
+    def add_department(self, dept, url, result, fetch_seconds, parse_seconds, bytes_received, courses, retries):
+        with self.lock:
+            self.departments[dept['id']] = {
+                'id': dept['id'],
+                'name': dept['name'],
+                'url': url,
+                'result': result,
+                'fetch_seconds': round(fetch_seconds, 4),
+                'parse_seconds': round(parse_seconds, 4),
+                'bytes_received': bytes_received,
+                'courses': courses,
+                'retries': retries
+            }
+        self.bytes_received.inc(bytes_received)
+        self.courses.inc(courses)
+        self.pages.inc(result=result)
+        self.retries.inc(retries)
+
+    def to_dict(self, order=None):
+        with self.lock:
+            # Listed in catalog order (workers finish in any order)
+            ids = [id for id in order if id in self.departments] if order is not None else sorted(self.departments)
+            departments = [self.departments[id] for id in ids]
+            failures = [self.failures[id] for id in (order if order is not None else sorted(self.failures)) if id in self.failures]
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': round(time.perf_counter() - self.start, 3),
+            'options': self.options,
+            'totals': {
+                'departments': len(departments),
+                'parsed': sum(1 for d in departments if d['result'] == 'parsed'),
+                'not_modified': sum(1 for d in departments if d['result'] == 'not_modified'),
+                'resumed': sum(1 for d in departments if d['result'] == 'resumed'),
+                'failed': len(failures),
+                'retries': sum(d['retries'] for d in departments),
+                'courses': sum(d['courses'] for d in departments),
+                'bytes_received': sum(d['bytes_received'] for d in departments),
+                'fetch_seconds': round(sum(d['fetch_seconds'] for d in departments), 3),
+                'parse_seconds': round(sum(d['parse_seconds'] for d in departments), 3)
+            },
+            # Slowest first, where to look when a run takes longer than it should
+            'slowest': [d['id'] for d in sorted(departments, key=lambda d: d['fetch_seconds'] + d['parse_seconds'], reverse=True)[:10]],
+            'departments': departments,
+            # Skipped after their retries ran out, a run with --resume tries only these again
+            'failed': failures
+        }
+
+    def write(self, path, order=None):
+        with open(path, 'w') as outfile:
+            outfile.write(json.dumps(self.to_dict(order), indent=4))
+
+    def write_metrics(self, path):
+        with open(path, 'w') as outfile:
+            outfile.write(self.metrics.render())
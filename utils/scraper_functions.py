@@ -1,25 +1,209 @@
 #!usr/bin/env python3
 
+import random
+import threading
+import time
 import unicodedata
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
+from utils.department_urls import DepartmentURLMap
+from utils.page_cache import CachedPage, PageCache
+from utils.prerequisites import parse_prerequisites
+
 BASE = 'https://catalog.uta.edu/coursedescriptions/'
 
+DEFAULT_POOL_SIZE = 16
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.5 # Seconds, doubled on every retry
+MAX_BACKOFF = 30.0
+REQUEST_TIMEOUT = 30 # Seconds without a response before a request counts as failed (and is retried)
+RETRY_STATUSES = (429, 500, 502, 503, 504) # Responses that may go away if the request is sent again
+
+""" Spaces out requests to the same host so concurrent workers don't hammer the catalog server
+Parameters: requests_per_second -> float: max requests per host per second, None or 0 disables limiting
+"""
+class RateLimiter:
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.next_slot = {} # host -> earliest time the next request may be sent
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        # Reserve a slot while holding the lock, then sleep outside of it so other hosts aren't blocked
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+""" How often and how long to wait before sending a failed request again
+Parameters: retries -> int: retries after the first attempt, 0 disables retrying
+            backoff -> float: seconds the first retry waits at most, doubled for every one after it
+"""
+class RetryPolicy:
+    def __init__(self, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+
+    def delay(self, attempt, retry_after=None):
+        # Full jitter, anywhere up to the exponential cap, so workers that failed together don't all retry together
+        delay = random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, MAX_BACKOFF))
+        return delay
+
+_session = None
+_rate_limiter = RateLimiter()
+_retry_policy = RetryPolicy()
+_page_cache = None
+_department_urls = DepartmentURLMap()
+
+""" Set up the shared HTTP session used for every catalog request
+Parameters: pool_size -> int: number of keep-alive connections kept per host
+            requests_per_second -> float: per-host rate limit, None or 0 disables limiting
+            retries -> int: times a request is sent again after a connection error, timeout or 429/5xx response
+            backoff -> float: seconds the first retry waits at most, doubled for every one after it
+Return: requests.Session
+"""
+def configure_session(pool_size=DEFAULT_POOL_SIZE, requests_per_second=DEFAULT_REQUESTS_PER_SECOND, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    global _session, _rate_limiter, _retry_policy
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    _session = session
+    _rate_limiter = RateLimiter(requests_per_second)
+    _retry_policy = RetryPolicy(retries, backoff)
+    return session
+
+""" Turn on the on-disk page cache used by fetch_page()
+Parameters: directory -> str: cache folder, None disables caching
+            offline -> bool: replay pages from the cache only, never hitting the network
+Return: utils.page_cache.PageCache or None
+"""
+def configure_cache(directory, offline=False):
+    global _page_cache
+
+    _page_cache = PageCache(directory, offline) if directory else None
+    return _page_cache
+
+""" Load the map of where department pages were found, get_department_html() tries those URLs first
+Parameters: path -> str: JSON file the map is read from and saved to, None keeps it in memory for this run
+Return: utils.department_urls.DepartmentURLMap
+"""
+def configure_url_map(path):
+    global _department_urls
+
+    _department_urls = DepartmentURLMap(path)
+    return _department_urls
+
+""" GET a URL through the shared session, respecting the per-host rate limit
+Parameters: url -> str: page to request
+            headers -> dict: extra request headers
+Return: requests.Response
+"""
+def fetch(url, headers=None):
+    if _session is None:
+        configure_session()
+    _rate_limiter.wait(url)
+    return _session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+
+""" Seconds a 429/503 response asks the client to wait
+Parameters: r -> requests.Response
+Return: float or None if the response doesn't say (or gives an HTTP date)
+"""
+def retry_after(r):
+    value = r.headers.get('Retry-After', '')
+    return float(value) if value.isdigit() else None
+
+""" GET a URL, sending it again with exponential backoff on errors that may go away
+Parameters: url -> str: page to request
+            headers -> dict: extra request headers
+Return: requests.Response (the last one, when a 429/5xx outlasted every retry), number of retries it took
+"""
+def fetch_with_retries(url, headers=None):
+    attempt = 0
+    while True:
+        try:
+            r = fetch(url, headers)
+            if r.status_code not in RETRY_STATUSES or attempt >= _retry_policy.retries:
+                return r, attempt
+            delay = _retry_policy.delay(attempt, retry_after(r))
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt >= _retry_policy.retries:
+                raise
+            delay = _retry_policy.delay(attempt)
+        attempt += 1
+        time.sleep(delay)
+
+""" Body bytes a response took on the wire (before any content decoding)
+Parameters: r -> requests.Response: response whose content was already read
+Return: int
+"""
+def bytes_received(r):
+    try:
+        return r.raw.tell()
+    except AttributeError:
+        return len(r.content)
+
+""" GET a page, revalidating any cached copy with If-None-Match/If-Modified-Since
+Parameters: url -> str: page to request
+Return: utils.page_cache.CachedPage, raises requests.exceptions.HTTPError on a failed request
+"""
+def fetch_page(url):
+    if _page_cache is None:
+        r, retries = fetch_with_retries(url)
+        r.raise_for_status()
+        return CachedPage(url, r.text, bytes_received=bytes_received(r), retries=retries)
+
+    entry = _page_cache.load(url)
+
+    if _page_cache.offline:
+        if entry is None:
+            raise requests.exceptions.HTTPError(f"{url} is not in the page cache.")
+        return CachedPage(url, entry['body'], not_modified=True, records=entry['records'])
+
+    r, retries = fetch_with_retries(url, headers=_page_cache.conditional_headers(entry))
+    if r.status_code == 304 and entry is not None:
+        return CachedPage(url, entry['body'], not_modified=True, records=entry['records'], retries=retries)
+    r.raise_for_status()
+
+    _page_cache.save(url, r.text, r.headers.get('ETag'), r.headers.get('Last-Modified'))
+    return CachedPage(url, r.text, bytes_received=bytes_received(r), retries=retries)
+
+""" Remember the course records extracted from a page so an unchanged page doesn't need to be parsed again
+Parameters: url -> str: page the records came from
+            records -> list: course dicts
+Return: None
+"""
+def save_page_records(url, records):
+    if _page_cache is not None and not _page_cache.offline:
+        _page_cache.save_records(url, records)
+
 """ Gets the containers with the links for each department
 Parameters: None
 Return: bs4.element.ResultSet containing a bs4.element.Tag for each department
 """
 def setup_department_catalogs():
     try:
-        r = requests.get(BASE)
-        r.raise_for_status()
+        page = fetch_page(BASE)
     except requests.exceptions.ConnectionError:
         raise SystemError(f"A Connection error occurred to {BASE}.")
     except requests.exceptions.HTTPError:
         raise SystemError(f"An HTTP error occurred to {BASE}.")
 
-    base_page = BeautifulSoup(r.text, 'html.parser')
+    base_page = BeautifulSoup(page.text, 'html.parser')
     
     # "sitemap" class - one large block with all departments and their links
     department_container = base_page.find('div', class_='sitemap')
@@ -54,41 +238,37 @@ def get_departments_list(departments):
 
 """ Access a department page
 Parameters: id -> str: uppercase department ID
-            uppercase_depts -> list: department IDs requiring uppercase URLs
-Return: bs4.BeautifulSoup object of department page, modified uppercase_depts
+Return: utils.page_cache.CachedPage of the department page
 """
-def get_department_page(id, uppercase_depts):
+def get_department_html(id):
     # NOTE: Department pages are accessed with the lowercase department ID appended in most cases.
-    # A few departments have exceptions, using uppercase or differing from the explicit ID in the department title.
-    # These edge cases have their conditions listed below.
+    # A few departments use uppercase or differ from the explicit ID in the department title. Where each page
+    # was found is kept in the URL map, which is tried first so later runs don't pay for the 404s.
 
-    try:
-        # # The expected URL
-        r = requests.get(f'{BASE}{id.lower()}')
-        r.raise_for_status()
-    except requests.exceptions.HTTPError:
+    for path in _department_urls.candidates(id):
+        url = f'{BASE}{path}'
         try:
-            if uppercase_depts and any(elem == id for elem in uppercase_depts):
-                r = requests.get(f'{BASE}{id}')
-                r.raise_for_status()
-                uppercase_depts.remove(id)
-            # BSAD/BUSA - URL only uses "bsad", not "bsad/busa"
-            if id == "BSAD/BUSA":
-                r = requests.get(f'{BASE}bsad')
-                r.raise_for_status()
-            # NURS-HI - URL uses "nurshi", not "nurs-hi"
-            if id == "NURS-HI":
-                r = requests.get(f'{BASE}nurshi')
-                r.raise_for_status()
-            # Don't think raise_for_status() can be moved here because of having to remove the uppercase department
-        except requests.exceptions.HTTPError:
-            raise SystemError("HTTPError - URL was invalid.")
-    except requests.exceptions.RequestException:
-        raise SystemError("RequestException - An unknown error has occurred.")
-
-        # TODO: handle possible ConnectionError exception as well?
-
-    return BeautifulSoup(r.text, 'html.parser'), uppercase_depts
+            page = fetch_page(url)
+        except requests.exceptions.HTTPError as e:
+            # Only a missing page means the URL is wrong (offline, a page that isn't cached has no response),
+            # anything else already outlasted its retries
+            if e.response is not None and e.response.status_code not in (404, 410):
+                raise SystemError(f"HTTPError - {url} returned {e.response.status_code}.")
+            continue
+        except requests.exceptions.RequestException as e:
+            raise SystemError(f"RequestException - {url}: {e}")
+
+        _department_urls.resolved(id, path)
+        return page
+
+    raise SystemError(f"HTTPError - No catalog page was found for {id}.")
+
+""" Access and parse a department page
+Parameters: id -> str: uppercase department ID
+Return: bs4.BeautifulSoup object of department page
+"""
+def get_department_page(id):
+    return BeautifulSoup(get_department_html(id).text, 'html.parser')
 
 """ Extract all course information from a department page
 Parameters: department_page -> bs4.BeautifulSoup: department page as nested data structure
@@ -162,6 +342,73 @@ def get_course_prerequisites(description):
 
     return prerequisites
 
+""" Build a course record from the text of its header and description
+Parameters: header -> str: text of the course's 'strong' header, e.g. "CSE 1325.  OBJECT-ORIENTED PROGRAMMING.  3 Hours."
+            description -> str: course description, still including its "Prerequisite" sentence
+Return: course dict
+"""
+def make_course_record(header, description):
+    tccn_id = ""
+
+    # Originally gave '\xa0' instead of ' '
+    header = unicodedata.normalize("NFKD", header)
+
+    # Separating the course ID (and TCCN ID, if there is one) from the rest of the header
+    # '.'s act as delimiters
+    header_info = header.split('.', maxsplit=1)
+    department_model_id = header_info[0].split(' ')[0]
+    course_num = int(header_info[0].split(' ')[1])
+
+    header_info = header_info[1].rsplit('.', maxsplit=2)
+    num_of_hours = int(header_info[1].strip().split(' ')[0])
+
+    name = header_info[0].strip()
+
+    if header_info[2]:
+        tccn_id = get_course_tccn_id(header_info[2])
+
+    prerequisites = get_course_prerequisites(description)
+
+    # Removing redundant "Prerequisite" section from description
+    if description:
+        description = description.split("Prerequisite")[0].rstrip()
+
+    return {                                                        # Example:
+        'id': department_model_id + str(course_num),                # "CSE1325"
+        'course_num': course_num,                                   # 1325
+        'name': name,                                               # "OBJECT-ORIENTED PROGRAMMING"
+        'description': description,                                 # "Object-oriented concepts, ...""
+        'num_of_hours': num_of_hours,                               # 3
+        'prerequisites': prerequisites,                             # "CSE 1320"
+        'prerequisite_tree': parse_prerequisites(prerequisites),    # "CSE1320", or {'op': 'and'/'or', 'args': [...]}
+        'tccn_id': tccn_id,                                         # ''
+        'department_model_id': department_model_id                  # "CSE"
+    }
+
+""" Extract every course record from a parsed department page
+Parameters: department_page -> bs4.BeautifulSoup: department page as nested data structure
+            id -> str: uppercase department ID
+Return: list of course dicts, in page order
+"""
+def extract_course_records(department_page, id):
+    asl_flag = False # Explicit flag used since HTML of entire department page is different from the rest
+    courses, asl_flag = get_departments_course_catalog(department_page, id, asl_flag)
+
+    records = []
+    for c in courses:
+        # NOTE: can find by class name here as well, but description text is wrapped in a 'strong' tag.
+        # There's only 1 'strong' tag per course block, so find by 'strong' instead to cut down on a
+        # few lines of code.
+        header_block = c.find('strong')
+
+        # NOTE: Course descriptions are in a <p> inside of c, but ASL doesn't have the same <p> description format. For ease
+        # of processing both in the same function, just send the whole c instead of c.find('p', class_='courseblockdesc').
+        description = get_course_description(c, asl_flag)
+
+        records.append(make_course_record(str(header_block.string), description))
+
+    return records
+
 """ Get course TCCN id, if available
 Parameters: header_info -> str: tail end of course header that contains an equivalent TCCN ID
 Return: TCCN ID string
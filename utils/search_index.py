@@ -0,0 +1,98 @@
+#!usr/bin/env python3
+
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+
+# Matches in the course name count more than matches in the description or prerequisites
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'description': 1.0,
+    'prerequisites': 1.0
+}
+MAX_PREFIX_EXPANSIONS = 50 # Vocabulary words a single query prefix may expand to
+LONG_FIELDS = ('description', 'prerequisites') # Indexed, but left out of search results
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+""" Split text into lowercase search terms
+Parameters: text -> str
+Return: list of terms
+"""
+def tokenize(text):
+    # Course text has '\xa0' in places, NFKD turns it back into ' '
+    return TOKEN_PATTERN.findall(unicodedata.normalize('NFKD', text or '').lower())
+
+""" In-memory inverted index over course text, ranked with BM25
+Parameters: documents -> iterable of dicts with 'id', the FIELD_WEIGHTS fields, and anything else to return with results
+            k1 -> float: BM25 term frequency saturation
+            b -> float: BM25 document length normalization
+"""
+class SearchIndex:
+    def __init__(self, documents, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = [] # doc number -> result dict
+        self.lengths = [] # doc number -> weighted number of terms
+        self.postings = {} # term -> {doc number: weighted term frequency}
+
+        for number, doc in enumerate(documents):
+            frequencies = {}
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(doc.get(field)):
+                    frequencies[term] = frequencies.get(term, 0.0) + weight
+                    length += weight
+            for term, frequency in frequencies.items():
+                self.postings.setdefault(term, {})[number] = frequency
+            self.documents.append({k: v for k, v in doc.items() if k not in LONG_FIELDS})
+            self.lengths.append(length)
+
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        # BM25 length normalization only depends on the document, so it's worked out once here instead of per query
+        # Every document may be empty (no name, description or prerequisites), which would leave an average of 0
+        average_length = self.average_length or 1.0
+        self.norms = [k1 * (1 - b + b * length / average_length) for length in self.lengths]
+        # Sorted vocabulary, so every word starting with a prefix is one contiguous slice
+        self.vocabulary = sorted(self.postings)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def expand(self, term):
+        # The word itself (if indexed) plus the most common words it's a prefix of
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        matches = self.vocabulary[start:end]
+        if len(matches) > MAX_PREFIX_EXPANSIONS:
+            longer = heapq.nlargest(MAX_PREFIX_EXPANSIONS, (t for t in matches if t != term), key=lambda t: len(self.postings[t]))
+            matches = ([term] if term in self.postings else []) + longer
+        return matches
+
+    def idf(self, term):
+        n = len(self.postings[term])
+        return math.log(1 + (len(self.documents) - n + 0.5) / (n + 0.5))
+
+    def search(self, query, limit=10, offset=0):
+        scores = {}
+        for query_term in set(tokenize(query)):
+            # A document matching several expansions of one query term only counts its best one
+            term_scores = {}
+            for term in self.expand(query_term):
+                weight = self.idf(term) * (self.k1 + 1)
+                # Prefix matches rank below whole-word matches
+                if term != query_term:
+                    weight *= 0.5
+                norms = self.norms
+                for number, frequency in self.postings[term].items():
+                    score = weight * frequency / (frequency + norms[number])
+                    if score > term_scores.get(number, 0.0):
+                        term_scores[number] = score
+            for number, score in term_scores.items():
+                scores[number] = scores.get(number, 0.0) + score
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        results = [dict(self.documents[number], score=round(score, 4)) for number, score in top[offset:]]
+        return len(scores), results
@@ -0,0 +1,146 @@
+#!usr/bin/env python3
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+from utils.payloads import dumps
+
+DEFAULT_SNAPSHOT_FILE = 'catalog.snapshot'
+
+# File layout (little endian, every offset is from the start of the file):
+#   header                 magic, format version, sha256 of the record blobs, then count and table offset for each table
+#   department table       one DEPARTMENT_ENTRY per department, sorted by ID
+#   course table           one COURSE_ENTRY per course, sorted by ID
+#   data                   IDs and pre-encoded JSON, referenced by (offset, length) pairs in the tables
+MAGIC = b'CATSNAP\x00'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sI32sIQIQ')
+DEPARTMENT_ENTRY = struct.Struct('<QIQIQI') # ID, department JSON, JSON array of the department's courses
+COURSE_ENTRY = struct.Struct('<QIQI') # ID, course JSON
+
+""" Encode a record the same way the API serializes single resources
+Parameters: record -> dict
+Return: bytes
+"""
+def encode_record(record):
+    return dumps(record)
+
+""" Compile departments and courses into a snapshot file, replacing any previous one atomically
+Parameters: path -> str: snapshot file to write
+            departments -> iterable of department dicts (in the API's field order)
+            courses -> iterable of course dicts (in the API's field order)
+Return: dict with the number of departments and courses written and the content digest
+"""
+def write_snapshot(path, departments, courses):
+    departments = sorted(departments, key=lambda d: d['id'].encode('utf-8'))
+    courses = sorted(courses, key=lambda c: c['id'].encode('utf-8'))
+
+    data = bytearray()
+    digest = hashlib.sha256()
+
+    def append(blob):
+        # Offsets are filled in relative to the data section, then shifted once the table sizes are known
+        offset = len(data)
+        data.extend(blob)
+        return offset, len(blob)
+
+    course_entries = []
+    course_blobs = {} # department ID -> list of encoded courses, in ID order
+    for c in courses:
+        blob = encode_record(c)
+        digest.update(blob)
+        course_entries.append(append(c['id'].encode('utf-8')) + append(blob))
+        course_blobs.setdefault(c['department_model_id'], []).append(blob)
+
+    department_entries = []
+    for d in departments:
+        blob = encode_record(d)
+        digest.update(blob)
+        # Same body as GET /course?department=<id>, ready to send as is
+        listing = b'[' + b','.join(course_blobs.get(d['id'], [])) + b']'
+        department_entries.append(append(d['id'].encode('utf-8')) + append(blob) + append(listing))
+
+    department_table = HEADER.size
+    course_table = department_table + DEPARTMENT_ENTRY.size * len(department_entries)
+    data_start = course_table + COURSE_ENTRY.size * len(course_entries)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, digest.digest(), len(department_entries), department_table,
+                len(course_entries), course_table))
+            for key_offset, key_length, record_offset, record_length, list_offset, list_length in department_entries:
+                f.write(DEPARTMENT_ENTRY.pack(data_start + key_offset, key_length, data_start + record_offset, record_length,
+                    data_start + list_offset, list_length))
+            for key_offset, key_length, record_offset, record_length in course_entries:
+                f.write(COURSE_ENTRY.pack(data_start + key_offset, key_length, data_start + record_offset, record_length))
+            f.write(data)
+        # Workers that already mapped the old file keep reading it until they reopen the path
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return {'departments': len(department_entries), 'courses': len(course_entries), 'digest': digest.hexdigest()}
+
+""" Read-only view of a snapshot file, mapped into memory so every process serving it shares the same pages
+Parameters: path -> str: file written by write_snapshot()
+"""
+class CatalogSnapshot:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            # The mapping stays valid after the file is closed (or replaced by a newer export)
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.map) < HEADER.size:
+            raise ValueError(f'{path} is not a catalog snapshot.')
+        magic, version, digest, self.department_count, self.department_table, self.course_count, self.course_table = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a catalog snapshot.')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'{path} is snapshot format {version}, expected {FORMAT_VERSION}. Export it again.')
+        self.digest = digest.hex()
+
+    def __len__(self):
+        return self.course_count
+
+    def find(self, table, entry, count, id):
+        # Binary search over the fixed size entries, only the probed IDs are read from the mapping
+        key = id.encode('utf-8')
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            fields = entry.unpack_from(self.map, table + middle * entry.size)
+            probe = self.map[fields[0]:fields[0] + fields[1]]
+            if probe == key:
+                return fields
+            if probe < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def course(self, id):
+        fields = self.find(self.course_table, COURSE_ENTRY, self.course_count, id)
+        return None if fields is None else self.map[fields[2]:fields[2] + fields[3]]
+
+    def department(self, id):
+        fields = self.find(self.department_table, DEPARTMENT_ENTRY, self.department_count, id)
+        return None if fields is None else self.map[fields[2]:fields[2] + fields[3]]
+
+    def department_courses(self, id):
+        fields = self.find(self.department_table, DEPARTMENT_ENTRY, self.department_count, id)
+        return None if fields is None else self.map[fields[4]:fields[4] + fields[5]]
+
+    def etag(self, key):
+        # Same snapshot, same ETags - in every worker and across restarts
+        return f"snap-{self.digest[:16]}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+
+    def close(self):
+        self.map.close()